@@ -1,8 +1,49 @@
 
 from move import Move
 from constants import *
+from zobrist import get_zobrist_hash
 import pst
 
+# Each (color, piece type) owns a 4-bit counter inside the material key, so the
+# key can be updated incrementally in make_move and used as a dictionary key.
+MATERIAL_WEIGHTS = [0] * 23
+for _color_index, _color in enumerate((WHITE, BLACK)):
+    for _piece_type in (PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING):
+        MATERIAL_WEIGHTS[_color | _piece_type] = 1 << (4 * (_color_index * 6 + _piece_type - 1))
+
+# Castling rights packed into one integer for compact storage (see to_array)
+CASTLING_BITS = {'K': 1, 'Q': 2, 'k': 4, 'q': 8}
+
+# Static exchange evaluation: piece values indexed by piece type, and the
+# rays with the slider types that attack along them
+SEE_VALUES = [0] + [pst.get_piece_value(piece_type) for piece_type in range(PAWN, KING + 1)]
+SEE_RAYS = [((drow, dcol), (BISHOP, QUEEN)) for drow, dcol in ((-1, -1), (-1, 1), (1, -1), (1, 1))] + \
+           [((drow, dcol), (ROOK, QUEEN)) for drow, dcol in ((-1, 0), (1, 0), (0, -1), (0, 1))]
+KNIGHT_OFFSETS = [(-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1)]
+
+# Slider rays and king steps, in the order the move generators use
+SLIDER_DIRECTIONS = {
+    BISHOP: [(-1, -1), (-1, 1), (1, -1), (1, 1)],
+    ROOK: [(-1, 0), (1, 0), (0, -1), (0, 1)],
+    QUEEN: [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)],
+}
+KING_OFFSETS = SLIDER_DIRECTIONS[QUEEN]
+
+def material_signature_key(signature):
+    """
+    Convert a material signature such as 'KRvK' (White pieces, 'v', Black
+    pieces) into the integer key maintained by Board.material_key.
+    """
+    piece_map = {'P': PAWN, 'N': KNIGHT, 'B': BISHOP, 'R': ROOK, 'Q': QUEEN, 'K': KING}
+    white_pieces, black_pieces = signature.upper().split('V')
+
+    key = 0
+    for char in white_pieces:
+        key += MATERIAL_WEIGHTS[WHITE | piece_map[char]]
+    for char in black_pieces:
+        key += MATERIAL_WEIGHTS[BLACK | piece_map[char]]
+    return key
+
 class Board:
     def __init__(self):
         # 8x8 board, index [0][0] is a1, [7][7] is h8
@@ -22,6 +63,12 @@ class Board:
         self.halfmove_clock = 0
         self.fullmove_number = 1
         
+        # Zobrist key of the position, updated in make_move, and the keys
+        # of the positions before each move in move_stack
+        self.zobrist = get_zobrist_hash()
+        self.hash = 0
+        self.key_history = []
+        
         self.setup_initial_position()
     
     def setup_initial_position(self):
@@ -42,6 +89,47 @@ class Board:
 
         self.pst = 0
         self.value = 0
+        self.compute_material()
+        self.reset_hash()
+
+    def compute_material(self):
+        """Recompute the piece count and material key from scratch."""
+        self.piece_count = 0
+        self.material_key = 0
+        for row in self.board:
+            for piece in row:
+                if piece != EMPTY:
+                    self.piece_count += 1
+                    self.material_key += MATERIAL_WEIGHTS[piece]
+    
+    def reset_hash(self):
+        """Hash the position from scratch and start a new key history."""
+        self.hash = self.zobrist.hash_position(self)
+        self.key_history = []
+    
+    def is_repetition(self, count=1):
+        """
+        Check whether the current position occurred count times before.
+        Only positions since the last capture or pawn move can repeat, so
+        the search stops at the halfmove clock, and only every second one
+        has the same side to move.
+        """
+        history = self.key_history
+        limit = min(self.halfmove_clock, len(history))
+        found = 0
+        # The position two plies back cannot be the same one
+        for index in range(4, limit + 1, 2):
+            if history[-index] == self.hash:
+                found += 1
+                if found >= count:
+                    return True
+        return False
+    
+    def is_fifty_move_draw(self):
+        """Fifty-move rule: 100 plies without a capture or pawn move, unless mated."""
+        if self.halfmove_clock < 100:
+            return False
+        return not (self.is_in_check(self.to_move) and not self.generate_legal_moves())
     
     def piece_at(self, row, col):
         """Get the piece at a given square."""
@@ -235,6 +323,181 @@ class Board:
         
         return moves
     
+    def generate_captures(self):
+        """
+        Generate the pseudo-legal captures and queen promotions, the moves
+        a quiescence search looks at. Only squares holding an enemy piece
+        are visited, so no quiet moves are built.
+        """
+        board = self.board
+        color = self.to_move
+        moves = []
+        
+        for row in range(8):
+            for col in range(8):
+                piece = board[row][col]
+                if piece == EMPTY or (piece & 24) != color:
+                    continue
+                
+                piece_type = piece & 7
+                if piece_type == PAWN:
+                    direction = 1 if color == WHITE else -1
+                    new_row = row + direction
+                    promotion = new_row == (7 if color == WHITE else 0)
+                    if promotion and board[new_row][col] == EMPTY:
+                        moves.append(Move(row, col, new_row, col, promotion=QUEEN))
+                    for new_col in (col - 1, col + 1):
+                        if not 0 <= new_col < 8:
+                            continue
+                        target = board[new_row][new_col]
+                        if target != EMPTY and (target & 24) != color:
+                            if promotion:
+                                for promo_piece in [QUEEN, ROOK, BISHOP, KNIGHT]:
+                                    moves.append(Move(row, col, new_row, new_col,
+                                                      promotion=promo_piece))
+                            else:
+                                moves.append(Move(row, col, new_row, new_col))
+                        if self.en_passant_square == (new_row, new_col):
+                            moves.append(Move(row, col, new_row, new_col,
+                                              is_en_passant=True))
+                
+                elif piece_type == KNIGHT or piece_type == KING:
+                    offsets = KNIGHT_OFFSETS if piece_type == KNIGHT else KING_OFFSETS
+                    for drow, dcol in offsets:
+                        new_row, new_col = row + drow, col + dcol
+                        if 0 <= new_row < 8 and 0 <= new_col < 8:
+                            target = board[new_row][new_col]
+                            if target != EMPTY and (target & 24) != color:
+                                moves.append(Move(row, col, new_row, new_col))
+                
+                else:
+                    for drow, dcol in SLIDER_DIRECTIONS[piece_type]:
+                        new_row, new_col = row + drow, col + dcol
+                        while 0 <= new_row < 8 and 0 <= new_col < 8:
+                            target = board[new_row][new_col]
+                            if target != EMPTY:
+                                if (target & 24) != color:
+                                    moves.append(Move(row, col, new_row, new_col))
+                                break
+                            new_row += drow
+                            new_col += dcol
+        
+        return moves
+    
+    def generate_piece_moves(self, row, col, moves):
+        """Generate pseudo-legal moves for the single piece on a square."""
+        piece_type = self.board[row][col] & 7
+
+        if piece_type == PAWN:
+            self.generate_pawn_moves(row, col, moves)
+        elif piece_type == KNIGHT:
+            self.generate_knight_moves(row, col, moves)
+        elif piece_type == BISHOP:
+            self.generate_bishop_moves(row, col, moves)
+        elif piece_type == ROOK:
+            self.generate_rook_moves(row, col, moves)
+        elif piece_type == QUEEN:
+            self.generate_queen_moves(row, col, moves)
+        elif piece_type == KING:
+            self.generate_king_moves(row, col, moves)
+
+    def find_move(self, from_row, from_col, to_row, to_col, promotion=None):
+        """
+        Return the legal Move between two squares, or None if there isn't one.
+        Only the moving piece's moves are generated, which is much cheaper
+        than generate_legal_moves() when validating a single move.
+        """
+        piece = self.board[from_row][from_col]
+        if piece == EMPTY or (piece & 24) != self.to_move:
+            return None
+
+        moves = []
+        self.generate_piece_moves(from_row, from_col, moves)
+        for move in moves:
+            if (move.to_row == to_row and move.to_col == to_col and
+                    move.promotion == promotion):
+                return move if self.is_legal_move(move) else None
+
+        return None
+
+    def find_origins(self, to_row, to_col, piece_type):
+        """
+        Return the squares of the side to move's pieces of piece_type that
+        can pseudo-legally move to (to_row, to_col), castling excluded.
+        Works backwards from the destination like is_square_attacked, so no
+        moves are generated. Pins are not checked.
+        """
+        color = self.to_move
+        piece = color | piece_type
+        target = self.board[to_row][to_col]
+        if target != EMPTY and (target & 24) == color:
+            return []
+
+        origins = []
+
+        if piece_type == PAWN:
+            direction = 1 if color == WHITE else -1
+            from_row = to_row - direction
+            if not 0 <= from_row < 8:
+                return origins
+
+            if target != EMPTY or self.en_passant_square == (to_row, to_col):
+                # Captures come from the diagonals behind the destination
+                for from_col in (to_col - 1, to_col + 1):
+                    if 0 <= from_col < 8 and self.board[from_row][from_col] == piece:
+                        origins.append((from_row, from_col))
+            elif self.board[from_row][to_col] == piece:
+                origins.append((from_row, to_col))
+            elif (self.board[from_row][to_col] == EMPTY and
+                    from_row == (2 if color == WHITE else 5) and
+                    self.board[from_row - direction][to_col] == piece):
+                # Double push from the starting rank
+                origins.append((from_row - direction, to_col))
+
+        elif piece_type == KNIGHT:
+            for drow, dcol in [(-2, -1), (-2, 1), (-1, -2), (-1, 2),
+                               (1, -2), (1, 2), (2, -1), (2, 1)]:
+                from_row, from_col = to_row + drow, to_col + dcol
+                if 0 <= from_row < 8 and 0 <= from_col < 8:
+                    if self.board[from_row][from_col] == piece:
+                        origins.append((from_row, from_col))
+
+        elif piece_type == KING:
+            king_row, king_col = self.find_king(color)
+            if max(abs(king_row - to_row), abs(king_col - to_col)) == 1:
+                origins.append((king_row, king_col))
+
+        else:
+            directions = []
+            if piece_type in (BISHOP, QUEEN):
+                directions += [(-1, -1), (-1, 1), (1, -1), (1, 1)]
+            if piece_type in (ROOK, QUEEN):
+                directions += [(-1, 0), (1, 0), (0, -1), (0, 1)]
+
+            # Walk each ray out from the destination to the first piece
+            for drow, dcol in directions:
+                from_row, from_col = to_row + drow, to_col + dcol
+                while 0 <= from_row < 8 and 0 <= from_col < 8:
+                    found = self.board[from_row][from_col]
+                    if found != EMPTY:
+                        if found == piece:
+                            origins.append((from_row, from_col))
+                        break
+                    from_row += drow
+                    from_col += dcol
+
+        return origins
+
+    def may_be_pinned(self, row, col):
+        """
+        Cheap pin pre-test: True if the piece on (row, col) shares a rank,
+        file or diagonal with its own king. Only those pieces need a full
+        legality check when the move is otherwise known to be valid.
+        """
+        king_row, king_col = self.find_king(self.board[row][col] & 24)
+        drow, dcol = row - king_row, col - king_col
+        return drow == 0 or dcol == 0 or abs(drow) == abs(dcol)
+
     def make_move(self, move):
         """Make a move on the board and return information needed to unmake it."""
         # Store state for unmaking
@@ -242,25 +505,41 @@ class Board:
             'captured_piece': self.board[move.to_row][move.to_col],
             'castling_rights': self.castling_rights.copy(),
             'en_passant_square': self.en_passant_square,
-            'halfmove_clock': self.halfmove_clock
+            'halfmove_clock': self.halfmove_clock,
+            'piece_count': self.piece_count,
+            'material_key': self.material_key,
+            'hash': self.hash
         }
         
         self.move_stack.append((move,undo_info))
+        self.key_history.append(self.hash)
 
         piece = self.board[move.from_row][move.from_col]
         piece_type = piece & 7
+        # The en passant key depends on the whole position, so swap it out now
+        hash_value = self.hash
+        if self.en_passant_square:
+            hash_value ^= self.zobrist.ep_hash(self)
         
         # Move the piece
         self.board[move.to_row][move.to_col] = piece
         self.board[move.from_row][move.from_col] = EMPTY
         
+        # Update piece count and material key for captures
+        if undo_info['captured_piece'] != EMPTY:
+            self.piece_count -= 1
+            self.material_key -= MATERIAL_WEIGHTS[undo_info['captured_piece']]
+        
         # Handle promotion
         if move.promotion:
             self.board[move.to_row][move.to_col] = (piece & 24) | move.promotion
+            self.material_key += MATERIAL_WEIGHTS[(piece & 24) | move.promotion] - MATERIAL_WEIGHTS[piece]
         
         # Handle en passant capture
         if move.is_en_passant:
             capture_row = move.from_row
+            self.piece_count -= 1
+            self.material_key -= MATERIAL_WEIGHTS[self.board[capture_row][move.to_col]]
             self.board[capture_row][move.to_col] = EMPTY
         
         # Handle castling
@@ -300,7 +579,18 @@ class Board:
                     self.castling_rights['q'] = False
                 elif move.from_row == 7 and move.from_col == 7:
                     self.castling_rights['k'] = False
-        
+
+        # Capturing a rook on its starting corner removes that castling right
+        if (undo_info['captured_piece'] & 7) == ROOK:
+            if (move.to_row, move.to_col) == (0, 0):
+                self.castling_rights['Q'] = False
+            elif (move.to_row, move.to_col) == (0, 7):
+                self.castling_rights['K'] = False
+            elif (move.to_row, move.to_col) == (7, 0):
+                self.castling_rights['q'] = False
+            elif (move.to_row, move.to_col) == (7, 7):
+                self.castling_rights['k'] = False
+
         # Update halfmove clock
         if piece_type == PAWN or undo_info['captured_piece'] != EMPTY:
             self.halfmove_clock = 0
@@ -329,11 +619,14 @@ class Board:
             self.value += piece_value
             undo_info['piece_value'] = piece_value
         
+        self.hash = self.zobrist.update_hash(self, hash_value, move, piece, undo_info)
+        
         return undo_info
     
     def unmake_move(self, move, undo_info):
         """Unmake a move and restore the previous position."""
         self.move_stack.pop()
+        self.key_history.pop()
 
         # Switch back to the side that made the move
         self.to_move = BLACK if self.to_move == WHITE else WHITE
@@ -377,6 +670,9 @@ class Board:
         self.castling_rights = undo_info['castling_rights']
         self.en_passant_square = undo_info['en_passant_square']
         self.halfmove_clock = undo_info['halfmove_clock']
+        self.piece_count = undo_info['piece_count']
+        self.material_key = undo_info['material_key']
+        self.hash = undo_info['hash']
 
         self.pst -= undo_info.get('pst_change',0)
         self.value -= undo_info.get('piece_value',0)
@@ -513,6 +809,118 @@ class Board:
         
         return False
     
+    def see_attackers(self, row, col):
+        """
+        Attackers of a square for static exchange evaluation.
+        
+        Returns:
+            Tuple of (direct, rays). direct is a list of (value, color) for
+            the knights, pawns and kings that attack the square. rays holds
+            one list per line through the square of the (value, color)
+            pieces that attack along it, nearest first: each one can only
+            capture once the ones in front of it have (x-rays).
+        """
+        board = self.board
+        direct = []
+        
+        for drow, dcol in KNIGHT_OFFSETS:
+            new_row, new_col = row + drow, col + dcol
+            if 0 <= new_row < 8 and 0 <= new_col < 8:
+                piece = board[new_row][new_col]
+                if piece & 7 == KNIGHT:
+                    direct.append((SEE_VALUES[KNIGHT], piece & 24))
+        
+        rays = []
+        for (drow, dcol), sliders in SEE_RAYS:
+            ray = []
+            new_row, new_col = row + drow, col + dcol
+            while 0 <= new_row < 8 and 0 <= new_col < 8:
+                piece = board[new_row][new_col]
+                if piece != EMPTY:
+                    piece_type = piece & 7
+                    color = piece & 24
+                    if piece_type in sliders:
+                        ray.append((SEE_VALUES[piece_type], color))
+                    elif not ray and piece_type == KING and abs(new_row - row) <= 1 and abs(new_col - col) <= 1:
+                        direct.append((SEE_VALUES[KING], color))
+                        break
+                    elif (not ray and piece_type == PAWN and dcol != 0
+                          and new_row - row == (-1 if color == WHITE else 1)
+                          and abs(new_col - col) == 1):
+                        # A pawn in front of a bishop or queen on the diagonal
+                        ray.append((SEE_VALUES[PAWN], color))
+                    else:
+                        break
+                new_row += drow
+                new_col += dcol
+            if ray:
+                rays.append(ray)
+        
+        return direct, rays
+    
+    def see(self, move):
+        """
+        Static exchange evaluation: the material the side to move wins by
+        move if both sides then keep recapturing on the target square with
+        their least valuable attacker, each free to stop when recapturing
+        would lose. Pieces behind a capturing slider or pawn join in as
+        they are uncovered. Pins and checks are ignored.
+        
+        Returns:
+            Material balance in centipawns (negative for a losing capture)
+        """
+        board = self.board
+        piece = board[move.from_row][move.from_col]
+        color = piece & 24
+        
+        if move.is_en_passant:
+            gain = SEE_VALUES[PAWN]
+        else:
+            gain = SEE_VALUES[board[move.to_row][move.to_col] & 7]
+        on_square = SEE_VALUES[piece & 7]
+        if move.promotion:
+            gain += SEE_VALUES[move.promotion] - SEE_VALUES[PAWN]
+            on_square = SEE_VALUES[move.promotion]
+        
+        # The moving piece leaves its square, uncovering what is behind it
+        board[move.from_row][move.from_col] = EMPTY
+        direct, rays = self.see_attackers(move.to_row, move.to_col)
+        board[move.from_row][move.from_col] = piece
+        
+        gains = [gain]
+        side = BLACK if color == WHITE else WHITE
+        while True:
+            # Least valuable attacker of the side to capture
+            best = None
+            for index, (value, attacker_color) in enumerate(direct):
+                if attacker_color == side and (best is None or value < best[0]):
+                    best = (value, direct, index)
+            for ray in rays:
+                if ray and ray[0][1] == side and (best is None or ray[0][0] < best[0]):
+                    best = (ray[0][0], ray, 0)
+            if best is None:
+                break
+            
+            value, source, index = best
+            source.pop(index)
+            if value == SEE_VALUES[KING]:
+                # The king can only capture if nothing recaptures
+                opponent = BLACK if side == WHITE else WHITE
+                if any(c == opponent for _, c in direct) or any(r and r[0][1] == opponent for r in rays):
+                    break
+            
+            gains.append(on_square - gains[-1])
+            on_square = value
+            side = BLACK if side == WHITE else WHITE
+            # Neither side can improve on standing pat any more
+            if max(-gains[-2], gains[-1]) < 0:
+                break
+        
+        # Each side stops capturing when that is better for it
+        for index in range(len(gains) - 1, 0, -1):
+            gains[index - 1] = -max(-gains[index - 1], gains[index])
+        return gains[0]
+    
     def find_king(self, color):
         """Find the king's position for a given color."""
         return self.white_king_pos if color == WHITE else self.black_king_pos
@@ -561,6 +969,76 @@ class Board:
         pseudo_legal = self.generate_pseudo_legal_moves()
         return [move for move in pseudo_legal if self.is_legal_move(move)]
     
+    def perft(self, depth, cache=None):
+        """
+        Count the leaf nodes of the legal move tree to a given depth.
+
+        The last ply is bulk counted: the number of legal moves is used
+        instead of making each of them.
+
+        Args:
+            depth: Depth in plies
+            cache: Optional dict of (zobrist key, depth) -> count. When given,
+                subtrees reached by transposition are only counted once.
+                The dict can be reused across calls.
+        """
+        if cache is None:
+            return self._perft(depth)
+
+        return self._perft_hashed(depth, self.hash, self.zobrist, cache)
+
+    def _perft(self, depth):
+        if depth == 0:
+            return 1
+
+        moves = self.generate_legal_moves()
+        if depth == 1:
+            return len(moves)
+
+        count = 0
+        for move in moves:
+            undo_info = self.make_move(move)
+            count += self._perft(depth - 1)
+            self.unmake_move(move, undo_info)
+
+        return count
+
+    def _perft_hashed(self, depth, hash_value, zobrist, cache):
+        if depth == 0:
+            return 1
+
+        key = (hash_value, depth)
+        count = cache.get(key)
+        if count is not None:
+            return count
+
+        moves = self.generate_legal_moves()
+        if depth == 1:
+            count = len(moves)
+        else:
+            count = 0
+            for move in moves:
+                child_hash, undo_info = zobrist.make_move(self, hash_value, move)
+                count += self._perft_hashed(depth - 1, child_hash, zobrist, cache)
+                self.unmake_move(move, undo_info)
+
+        cache[key] = count
+        return count
+
+    def perft_divide(self, depth, cache=None):
+        """
+        Perft split by root move, for finding move generation bugs.
+
+        Returns:
+            Dict of UCI move -> leaf count below it
+        """
+        divide = {}
+        for move in self.generate_legal_moves():
+            undo_info = self.make_move(move)
+            divide[str(move)] = self.perft(depth - 1, cache) if depth > 1 else 1
+            self.unmake_move(move, undo_info)
+        return divide
+
     def from_fen(self, fen):
         """Load a position from FEN notation."""
         parts = fen.split()
@@ -622,6 +1100,89 @@ class Board:
         # Parse move counters
         self.halfmove_clock = int(parts[4])
         self.fullmove_number = int(parts[5])
+
+        # The new position has no move history
+        self.move_stack = []
+        self.compute_material()
+        self.reset_hash()
+    
+    @classmethod
+    def from_array(cls, squares, to_move=WHITE, castling=0, ep_square=-1,
+                   halfmove_clock=0, fullmove_number=1):
+        """
+        Create a board from the columnar dataset encoding (see to_array).
+        Much cheaper than parsing a FEN string.
+
+        Args:
+            squares: 64 piece codes, index row * 8 + col (a1 = 0)
+            to_move: WHITE or BLACK
+            castling: CASTLING_BITS flags
+            ep_square: En passant square index, or -1 for none
+        """
+        # Skip __init__: the start position and its hash would only be
+        # overwritten. load_array sets every other field.
+        board = cls.__new__(cls)
+        board.board = [[EMPTY] * 8 for _ in range(8)]
+        board.num_moves_generated = 0
+        board.white_king_pos = None
+        board.black_king_pos = None
+        board.zobrist = get_zobrist_hash()
+        board.load_array(squares, to_move, castling, ep_square,
+                         halfmove_clock, fullmove_number)
+        return board
+
+    def load_array(self, squares, to_move=WHITE, castling=0, ep_square=-1,
+                   halfmove_clock=0, fullmove_number=1):
+        """Load a position from the columnar dataset encoding into this board."""
+        self.move_stack = []
+        self.value = 0
+        self.pst = 0
+
+        for index, piece in enumerate(squares):
+            piece = int(piece)
+            row, col = divmod(index, 8)
+            self.board[row][col] = piece
+            if piece == EMPTY:
+                continue
+
+            if piece == (WHITE | KING):
+                self.white_king_pos = (row, col)
+            elif piece == (BLACK | KING):
+                self.black_king_pos = (row, col)
+
+            is_white = (piece & 24) == WHITE
+            piece_sign = 1 if is_white else -1
+            self.pst += pst.get_piece_square_value(piece & 7, row, col, is_white, False) * piece_sign
+            self.value += pst.get_piece_value(piece & 7) * piece_sign
+
+        self.to_move = int(to_move)
+        castling = int(castling)
+        self.castling_rights = {right: bool(castling & bit) for right, bit in CASTLING_BITS.items()}
+        ep_square = int(ep_square)
+        self.en_passant_square = divmod(ep_square, 8) if ep_square >= 0 else None
+        self.halfmove_clock = int(halfmove_clock)
+        self.fullmove_number = int(fullmove_number)
+
+        self.compute_material()
+        self.reset_hash()
+
+    def to_array(self):
+        """
+        Encode the position for the columnar dataset.
+
+        Returns:
+            Tuple of (64 piece codes as bytes, to_move, castling flags,
+            en passant square index or -1)
+        """
+        squares = bytes(piece for row in self.board for piece in row)
+        castling = 0
+        for right, bit in CASTLING_BITS.items():
+            if self.castling_rights[right]:
+                castling |= bit
+        ep_square = -1
+        if self.en_passant_square:
+            ep_square = self.en_passant_square[0] * 8 + self.en_passant_square[1]
+        return squares, self.to_move, castling, ep_square
     
     def to_fen(self):
         """Convert the current position to FEN notation."""
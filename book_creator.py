@@ -1,20 +1,99 @@
+import os
 import struct
-from collections import defaultdict
-from zobrist import ZobristHash
+import tempfile
+from collections import Counter, defaultdict
+from functools import partial
+from zobrist import get_zobrist_hash
 from board import Board
 from constants import *
+from opening_book import ENTRY_SIZE
 import pgn
 
+try:
+    import numpy as np
+except ImportError:
+    # Without NumPy entries stay in memory and books are written with struct
+    np = None
+
+if np is not None:
+    from opening_book import POLYGLOT_ENTRY
+
+    # Spilled run record: one aggregated (position, move) count, native order
+    RUN_RECORD = np.dtype([('key', '<u8'), ('move', '<u2'), ('count', '<u4')])
+
+# Polyglot promotion codes
+PROMOTION_CODES = {KNIGHT: 1, BISHOP: 2, ROOK: 3, QUEEN: 4}
+
+# Largest weight a Polyglot entry can hold
+MAX_WEIGHT = 0xFFFF
+
+def _game_book_moves(games, hash_scheme='random', max_ply=21):
+    """
+    Process pool worker: replay each game on one board and count the
+    (position_hash, encoded_move) pairs of its first max_ply moves.
+    """
+    creator = BookCreator(hash_scheme)
+    parser = pgn.PGNParser()
+    board = Board()
+    counts = Counter()
+
+    for game in games:
+        game_board = board
+        if 'FEN' in game.headers:
+            game_board = Board()
+            game_board.from_fen(game.headers['FEN'])
+
+        # Lazily converted: add_moves makes each move before asking for the
+        # next one, so every UCI string is read against the right position
+        moves = (parser.uci_to_move(game_board, move_uci)
+                 for move_uci in game.uci_moves[:max_ply])
+        creator.add_moves(game_board, moves, counts=counts)
+
+    return counts
+
 class BookCreator:
     """
     Create Polyglot opening books from manual position entry.
     Build your own opening repertoire!
+
+    Entries are counted in memory until run_size distinct (position, move)
+    pairs have been collected. They are then sorted and spilled to a run
+    file on disk. save_book merges the runs (and optionally other books)
+    into the final .bin, so memory use doesn't grow with the book size.
+    Without NumPy nothing is spilled and the book is written from memory.
     """
-    
-    def __init__(self):
-        self.positions = defaultdict(lambda: defaultdict(int))
-        self.zobrist = ZobristHash()
-    
+
+    def __init__(self, hash_scheme='random', run_size=1_000_000, temp_dir=None):
+        """
+        Args:
+            hash_scheme: Zobrist scheme for the book keys. 'random' matches
+                the bundled books, 'polyglot' writes books that other
+                Polyglot readers understand.
+            run_size: Distinct entries to hold in memory before spilling
+            temp_dir: Where to put run files (None = system temp dir)
+        """
+        self.hash_scheme = hash_scheme
+        self.zobrist = get_zobrist_hash(hash_scheme)
+
+        self.run_size = run_size
+        self.temp_dir = temp_dir
+        self.merge_block = 65536  # Records read from each source at a time
+        self.counts = Counter()   # (position_hash, encoded_move) -> weight
+        self._run_dir = None
+        self._runs = []
+
+    @property
+    def positions(self):
+        """
+        Entries held in memory as {position_hash: {move_uci: weight}}, the
+        layout of the old in-memory book. A snapshot: entries are added
+        with add_position and add_moves.
+        """
+        positions = defaultdict(dict)
+        for (position_hash, move_int), weight in self.counts.items():
+            positions[position_hash][self._decode_move(move_int)] = weight
+        return positions
+
     def add_position(self, fen, move_uci, weight=1):
         """
         Manually add a position and move to the book.
@@ -30,10 +109,90 @@ class BookCreator:
         
         # Get position hash
         position_hash = self.zobrist.hash_position(board)
+
+        # Polyglot writes castling as the king capturing its own rook
+        if self.hash_scheme == 'polyglot':
+            move_uci = self._polyglot_castling(board, move_uci)
         
         # Add move with weight
-        self.positions[position_hash][move_uci] += weight
-    
+        self._add(position_hash, self._encode_move(move_uci), weight)
+
+    def add_moves(self, board, moves, weight=1, counts=None):
+        """
+        Add every position and move along a line of native moves.
+
+        The moves are replayed on the given board with incremental hashing
+        and then taken back, so the board is left as it was.
+
+        Args:
+            board: Board at the start of the line
+            moves: Legal Move objects to play in order
+            weight: Weight added for each move
+            counts: Counter to add to instead of this book (used by workers)
+        """
+        position_hash = self.zobrist.hash_position(board)
+        played = 0
+
+        try:
+            for move in moves:
+                entry = (position_hash, self.encode_move(board, move))
+                if counts is not None:
+                    counts[entry] += weight
+                else:
+                    self._add(entry[0], entry[1], weight)
+
+                position_hash, _ = self.zobrist.make_move(board, position_hash, move)
+                played += 1
+        finally:
+            for _ in range(played):
+                board.pop()
+
+    def _add(self, position_hash, move_int, weight):
+        """Count one entry, spilling a run when the buffer is full."""
+        self.counts[(position_hash, move_int)] += weight
+        if np is not None and len(self.counts) >= self.run_size:
+            self._spill_run()
+
+    def _spill_run(self):
+        """Write the buffered entries to disk as a run sorted by (key, move)."""
+        if not self.counts:
+            return
+
+        run = np.empty(len(self.counts), dtype=RUN_RECORD)
+        run['key'] = np.fromiter((key for key, _ in self.counts), dtype=np.uint64, count=len(run))
+        run['move'] = np.fromiter((move for _, move in self.counts), dtype=np.uint16, count=len(run))
+        run['count'] = np.fromiter(self.counts.values(), dtype=np.uint32, count=len(run))
+        run = run[np.lexsort((run['move'], run['key']))]
+
+        if self._run_dir is None:
+            self._run_dir = tempfile.TemporaryDirectory(prefix='book_runs_', dir=self.temp_dir)
+        path = os.path.join(self._run_dir.name, f'run{len(self._runs):05d}.bin')
+        run.tofile(path)
+
+        self._runs.append(path)
+        self.counts.clear()
+
+    def _polyglot_castling(self, board, move_uci):
+        """Convert e1g1/e1c1/e8g8/e8c8 king moves to e1h1/e1a1/e8h8/e8a8."""
+        if move_uci in ('e1g1', 'e1c1', 'e8g8', 'e8c8'):
+            row = int(move_uci[1]) - 1
+            if board.board[row][4] & 7 == KING:
+                return move_uci[:2] + ('h' if move_uci[2] == 'g' else 'a') + move_uci[3]
+        return move_uci
+
+    def encode_move(self, board, move):
+        """Encode a native Move to Polyglot format without going through UCI."""
+        to_col = move.to_col
+        if move.is_castling and self.hash_scheme == 'polyglot':
+            # King "captures" its own rook
+            to_col = 7 if move.to_col == 6 else 0
+
+        from_square = move.from_row * 8 + move.from_col
+        to_square = move.to_row * 8 + to_col
+        promo = PROMOTION_CODES.get(move.promotion, 0)
+
+        return to_square | (from_square << 6) | (promo << 12)
+
     def _encode_move(self, move_uci):
         """
         Encode UCI move to Polyglot format.
@@ -62,48 +221,190 @@ class BookCreator:
         
         # Encode: to | (from << 6) | (promo << 12)
         return to_square | (from_square << 6) | (promo << 12)
-    
-    def save_book(self, output_path: str):
+
+    def _decode_move(self, move_int):
+        """Decode a Polyglot move back to UCI (inverse of _encode_move)."""
+        files = 'abcdefgh'
+        to_square = move_int & 0x3F
+        from_square = (move_int >> 6) & 0x3F
+        promo = (move_int >> 12) & 0x7
+
+        move_uci = (files[from_square % 8] + str(from_square // 8 + 1) +
+                    files[to_square % 8] + str(to_square // 8 + 1))
+        if promo:
+            move_uci += ' nbrq'[promo]
+        return move_uci
+
+    def save_book(self, output_path: str, min_count=1, books=()):
         """
         Save the book in Polyglot binary format.
-        
+
+        The spilled runs are k-way merged a block at a time. Weights of the
+        same (position, move) are summed across runs and books, entries
+        below min_count are dropped and weights are capped at 65535.
+
         Args:
             output_path: Path for output .bin file
+            min_count: Minimum total weight for an entry to be kept
+            books: Existing Polyglot books to merge in
         """
-        entries = []
-        
-        # Convert all positions and moves to binary entries
-        for position_hash, moves in self.positions.items():
-            for move_uci, weight in moves.items():
-                move_int = self._encode_move(move_uci)
-                entries.append((position_hash, move_int, weight, 0))
-        
-        # Sort entries by position hash (required for binary search)
-        entries.sort(key=lambda e: e[0])
-        
-        # Write to binary file
-        with open(output_path, 'wb') as f:
-            for position_hash, move_int, weight, learn in entries:
-                # Pack as big-endian: Q (8 bytes), H (2 bytes), H (2 bytes), I (4 bytes)
-                packed = struct.pack('>QHHI', position_hash, move_int, weight, learn)
-                f.write(packed)
-        
+        if np is None:
+            positions, entries = self._write_entries(output_path, min_count, books)
+            self._print_summary(output_path, positions, entries)
+            return
+
+        self._spill_run()
+
+        sources = []
+        for path in self._runs:
+            sources.append((np.memmap(path, dtype=RUN_RECORD, mode='r'), 'count'))
+        for path in books:
+            entry_count = os.path.getsize(path) // POLYGLOT_ENTRY.itemsize
+            if entry_count:
+                sources.append((np.memmap(path, dtype=POLYGLOT_ENTRY, mode='r',
+                                          shape=(entry_count,)), 'weight'))
+
+        positions, entries = self._merge_sources(sources, output_path, min_count)
+        self._print_summary(output_path, positions, entries)
+
+    def _print_summary(self, output_path, positions, entries):
         print(f"\n{'='*60}")
         print(f"Book saved to: {output_path}")
-        print(f"Unique positions: {len(self.positions)}")
-        print(f"Total entries: {len(entries)}")
+        print(f"Unique positions: {positions}")
+        print(f"Total entries: {entries}")
         print(f"{'='*60}")
 
-    def encode_games(self,pgn_file):
-        parser = pgn.PGNParser()
-        games = parser.parse_file(pgn_file)
+    def _write_entries(self, output_path, min_count, books):
+        """
+        Write the entries held in memory, plus those of books, with struct.
+        Same output as _merge_sources, for when NumPy isn't available.
+
+        Returns:
+            Tuple of (unique positions, entries written)
+        """
+        counts = Counter(self.counts)
+        for path in books:
+            with open(path, 'rb') as f:
+                data = f.read()
+            data = data[:len(data) - len(data) % ENTRY_SIZE]
+            for key, move, weight, _ in struct.iter_unpack('>QHHI', data):
+                counts[(key, move)] += weight
+
+        # Sorted by key, and within a position the most played move first
+        entries = sorted((key, -count, move) for (key, move), count in counts.items()
+                         if count >= min_count)
+        with open(output_path, 'wb') as f:
+            for key, count, move in entries:
+                f.write(struct.pack('>QHHI', key, move, min(-count, MAX_WEIGHT), 0))
+
+        positions = len({key for key, _, _ in entries})
+        return positions, len(entries)
+
+    def merge_books(self, book_paths, output_path, min_count=1):
+        """
+        Merge existing Polyglot books (and anything added to this creator)
+        into one book, summing the weights of identical entries.
+        """
+        self.save_book(output_path, min_count=min_count, books=book_paths)
+
+    def _merge_sources(self, sources, output_path, min_count):
+        """
+        K-way merge of key-sorted sources into a Polyglot file.
+
+        Each step reads a block from every source and takes all records
+        with keys below the smallest key that ends a block. No records for
+        those keys can be left in later blocks, so each step's entries are
+        complete and can be aggregated and written straight away.
 
-        for current_game in games:
-            board = Board()
+        Returns:
+            Tuple of (unique positions, entries written)
+        """
+        cursors = [0] * len(sources)
+        block_sizes = [self.merge_block] * len(sources)
+        positions = 0
+        entries = 0
 
-            for index, move in enumerate(current_game.uci_moves):
-                if index > 20:
+        with open(output_path, 'wb') as f:
+            while True:
+                active = [i for i, (array, _) in enumerate(sources) if cursors[i] < len(array)]
+                if not active:
                     break
 
-                self.add_position(board.to_fen(),move)
-                board.push_uci(move)
+                # Smallest last key among blocks that don't reach the end
+                bound = None
+                for i in active:
+                    end = cursors[i] + block_sizes[i]
+                    if end < len(sources[i][0]):
+                        key = sources[i][0]['key'][end - 1]
+                        bound = key if bound is None else min(bound, key)
+
+                keys, moves, counts = [], [], []
+                for i in active:
+                    array, count_field = sources[i]
+                    block = array[cursors[i]:cursors[i] + block_sizes[i]]
+                    block_keys = block['key'].astype(np.uint64)
+
+                    take = len(block)
+                    if bound is not None:
+                        take = int(block_keys.searchsorted(np.uint64(bound), 'left'))
+
+                    keys.append(block_keys[:take])
+                    moves.append(block['move'][:take].astype(np.uint16))
+                    counts.append(block[count_field][:take].astype(np.uint64))
+                    cursors[i] += take
+
+                keys = np.concatenate(keys)
+                if len(keys) == 0:
+                    # A block holds nothing but the bound key; read further
+                    for i in active:
+                        end = cursors[i] + block_sizes[i]
+                        if end < len(sources[i][0]) and sources[i][0]['key'][end - 1] == bound:
+                            block_sizes[i] *= 2
+                    continue
+                moves = np.concatenate(moves)
+                counts = np.concatenate(counts)
+
+                # Sum the counts of identical (key, move) pairs
+                order = np.lexsort((moves, keys))
+                keys, moves, counts = keys[order], moves[order], counts[order]
+                starts = np.flatnonzero(np.concatenate((
+                    [True], (keys[1:] != keys[:-1]) | (moves[1:] != moves[:-1]))))
+                keys, moves = keys[starts], moves[starts]
+                counts = np.add.reduceat(counts, starts)
+
+                keep = counts >= min_count
+                keys, moves, counts = keys[keep], moves[keep], counts[keep]
+                if len(keys) == 0:
+                    continue
+
+                # Within a position, list the most played move first
+                order = np.lexsort((-counts.astype(np.int64), keys))
+                out = np.zeros(len(keys), dtype=POLYGLOT_ENTRY)
+                out['key'] = keys[order]
+                out['move'] = moves[order]
+                out['weight'] = np.minimum(counts[order], MAX_WEIGHT)
+                out.tofile(f)
+
+                entries += len(out)
+                positions += int(np.count_nonzero(keys[1:] != keys[:-1])) + 1
+
+        return positions, entries
+
+    def encode_games(self, pgn_file, jobs=None, max_ply=21):
+        """
+        Add the opening moves of every game in a PGN file.
+
+        Games are parsed and replayed in a process pool (see
+        pgn.process_games); the byte-offset index saved next to the PGN
+        is reused on later runs.
+
+        Args:
+            pgn_file: Path to the PGN file
+            jobs: Number of worker processes (None = one per CPU)
+            max_ply: Number of moves to take from each game
+        """
+        worker = partial(_game_book_moves, hash_scheme=self.hash_scheme, max_ply=max_ply)
+
+        for counts in pgn.process_games(pgn_file, worker, jobs=jobs):
+            for (position_hash, move_int), weight in counts.items():
+                self._add(position_hash, move_int, weight)
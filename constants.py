@@ -9,4 +9,16 @@ KING = 6
 
 # Colors
 WHITE = 8
-BLACK = 16
\ No newline at end of file
+BLACK = 16
+
+# Mate scores: MATE_SCORE - plies from the root to the mate, so shorter
+# mates score higher. Anything beyond MATE_BOUND is a mate.
+MATE_SCORE = 20000
+MAX_PLY = 128
+MATE_BOUND = MATE_SCORE - MAX_PLY
+
+# Tablebase wins: TB_WIN_SCORE - plies from the root - the table's depth,
+# a band of its own below the mates since the depth orders the wins but
+# is not a distance to mate. Anything beyond TB_WIN_BOUND is a known win.
+TB_WIN_SCORE = MATE_BOUND - 1
+TB_WIN_BOUND = TB_WIN_SCORE - 2 * MAX_PLY
@@ -0,0 +1,319 @@
+"""
+Columnar position datasets for training, tuning and benchmarks.
+
+Positions are stored one column per field instead of one FEN string per
+row, so a whole dataset loads in milliseconds and can be memory-mapped:
+
+    boards      (N, 64) int8    piece code per square, index row * 8 + col
+    to_move     (N,)    uint8   WHITE or BLACK
+    castling    (N,)    uint8   board.CASTLING_BITS flags
+    ep_square   (N,)    int8    en passant square index, -1 for none
+    halfmove    (N,)    uint8   halfmove clock (capped at 255)
+    fullmove    (N,)    uint16  fullmove number
+    result      (N,)    int8    1 White won, 0 draw, -1 Black won
+    best_move   (N,)    uint16  Polyglot-encoded move (0 = none)
+    rating      (N,)    int16   puzzle rating (0 = none)
+    hash        (N,)    uint64  Zobrist hash ('random' scheme)
+
+A dataset is saved either as one .npz file or as a directory with one
+.npy file per column, which np.load can memory-map.
+
+Converters are provided for PGN games (every position with the move that
+was played), EPD files (bm / c9 opcodes) and Lichess puzzle CSVs.
+"""
+
+import csv
+import os
+from array import array
+from board import Board
+from zobrist import get_zobrist_hash
+from constants import *
+import pgn
+
+try:
+    import numpy as np
+except ImportError:
+    # NumPy is optional for the engine, but required for datasets
+    np = None
+
+COLUMNS = {
+    'to_move': 'uint8',
+    'castling': 'uint8',
+    'ep_square': 'int8',
+    'halfmove': 'uint8',
+    'fullmove': 'uint16',
+    'result': 'int8',
+    'best_move': 'uint16',
+    'rating': 'int16',
+    'hash': 'uint64',
+}
+
+# array module type codes matching COLUMNS
+ARRAY_CODES = {'uint8': 'B', 'int8': 'b', 'uint16': 'H', 'int16': 'h', 'uint64': 'Q'}
+
+RESULTS = {'1-0': 1, '0-1': -1, '1/2-1/2': 0}
+
+PROMOTION_CODES = {KNIGHT: 1, BISHOP: 2, ROOK: 3, QUEEN: 4}
+PROMOTION_PIECES = {code: piece for piece, code in PROMOTION_CODES.items()}
+
+
+def encode_move(move):
+    """Encode a Move as to | from << 6 | promotion << 12 (Polyglot layout)."""
+    if move is None:
+        return 0
+    from_square = move.from_row * 8 + move.from_col
+    to_square = move.to_row * 8 + move.to_col
+    return to_square | (from_square << 6) | (PROMOTION_CODES.get(move.promotion, 0) << 12)
+
+
+def decode_move(board, move_int):
+    """Return the legal Move on board for an encoded move, or None."""
+    if not move_int:
+        return None
+    to_square = move_int & 0x3F
+    from_square = (move_int >> 6) & 0x3F
+    promotion = PROMOTION_PIECES.get((move_int >> 12) & 0x7)
+    return board.find_move(from_square // 8, from_square % 8,
+                           to_square // 8, to_square % 8, promotion)
+
+
+class DatasetBuilder:
+    """
+    Collect positions into compact arrays and save them as a dataset.
+    Uses the stdlib array module, so about 80 bytes are kept per position.
+    """
+
+    def __init__(self):
+        self.boards = bytearray()
+        self.columns = {name: array(ARRAY_CODES[dtype]) for name, dtype in COLUMNS.items()}
+        self.zobrist = get_zobrist_hash('random')
+
+    def __len__(self):
+        return len(self.columns['hash'])
+
+    def add(self, board, result=0, best_move=None, rating=0, position_hash=None):
+        """
+        Add the current position of a board.
+
+        Args:
+            board: Position to store
+            result: Game result from White's point of view (1, 0, -1)
+            best_move: Move played or expected in this position
+            rating: Puzzle rating
+            position_hash: Zobrist hash if already known
+        """
+        squares, to_move, castling, ep_square = board.to_array()
+        self.boards += squares
+
+        columns = self.columns
+        columns['to_move'].append(to_move)
+        columns['castling'].append(castling)
+        columns['ep_square'].append(ep_square)
+        columns['halfmove'].append(min(board.halfmove_clock, 255))
+        columns['fullmove'].append(min(board.fullmove_number, 0xFFFF))
+        columns['result'].append(result)
+        columns['best_move'].append(encode_move(best_move))
+        columns['rating'].append(rating)
+        columns['hash'].append(position_hash if position_hash is not None
+                               else self.zobrist.hash_position(board))
+
+    def extend(self, other):
+        """Append all positions of another builder."""
+        self.boards += other.boards
+        for name, column in self.columns.items():
+            column.extend(other.columns[name])
+
+    def to_dataset(self):
+        """Convert the collected positions into a PositionDataset."""
+        if np is None:
+            raise ImportError("Position datasets need NumPy")
+
+        columns = {'boards': np.frombuffer(bytes(self.boards), dtype=np.int8).reshape(-1, 64)}
+        for name, dtype in COLUMNS.items():
+            columns[name] = np.frombuffer(self.columns[name], dtype=dtype).copy()
+        return PositionDataset(columns)
+
+    def save(self, path):
+        """Save the collected positions (see PositionDataset.save)."""
+        self.to_dataset().save(path)
+
+
+class PositionDataset:
+    """Read access to a columnar dataset."""
+
+    def __init__(self, columns):
+        self.columns = columns
+        self.boards = columns['boards']
+        for name in COLUMNS:
+            setattr(self, name, columns[name])
+
+    def __len__(self):
+        return len(self.boards)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        Load a dataset saved by save().
+
+        Args:
+            path: .npz file or directory of .npy files
+            mmap: Memory-map .npy columns instead of reading them
+        """
+        if np is None:
+            raise ImportError("Position datasets need NumPy")
+
+        if os.path.isdir(path):
+            mmap_mode = 'r' if mmap else None
+            columns = {name: np.load(os.path.join(path, name + '.npy'), mmap_mode=mmap_mode)
+                       for name in ['boards'] + list(COLUMNS)}
+        else:
+            with np.load(path) as data:
+                columns = {name: data[name] for name in data.files}
+        return cls(columns)
+
+    def save(self, path):
+        """
+        Save as a single .npz file if path ends in .npz, otherwise as a
+        directory of .npy files that load() can memory-map.
+        """
+        if path.endswith('.npz'):
+            np.savez(path, **self.columns)
+        else:
+            os.makedirs(path, exist_ok=True)
+            for name, column in self.columns.items():
+                np.save(os.path.join(path, name + '.npy'), column)
+
+    def select(self, mask):
+        """Return a dataset with the rows picked by a boolean mask or index array."""
+        return PositionDataset({name: column[mask] for name, column in self.columns.items()})
+
+    def board(self, index, board=None):
+        """
+        Build the Board for one row. Pass an existing board to reuse it
+        instead of allocating a new one.
+        """
+        args = (self.boards[index], self.to_move[index], self.castling[index],
+                self.ep_square[index], self.halfmove[index], self.fullmove[index])
+        if board is None:
+            return Board.from_array(*args)
+        board.load_array(*args)
+        return board
+
+    def move(self, index, board):
+        """Return the stored best move of a row as a Move on its board."""
+        return decode_move(board, int(self.best_move[index]))
+
+    def evaluate(self, evaluator, indices=None):
+        """
+        Evaluate many rows with one reused board.
+
+        Returns:
+            NumPy array of scores from the side to move's point of view
+        """
+        if indices is None:
+            indices = range(len(self))
+        board = Board()
+        scores = np.empty(len(indices), dtype=np.int32)
+        for i, index in enumerate(indices):
+            self.board(index, board)
+            scores[i] = evaluator.evaluate_relative(board)
+        return scores
+
+
+def _game_positions(games):
+    """Process pool worker: every position of each finished game."""
+    builder = DatasetBuilder()
+    parser = pgn.PGNParser()
+    zobrist = builder.zobrist
+
+    for game in games:
+        result = RESULTS.get(game.result)
+        if result is None:
+            continue
+
+        board = Board()
+        if 'FEN' in game.headers:
+            board.from_fen(game.headers['FEN'])
+        position_hash = zobrist.hash_position(board)
+
+        for move_uci in game.uci_moves:
+            move = parser.uci_to_move(board, move_uci)
+            builder.add(board, result, move, position_hash=position_hash)
+            position_hash, _ = zobrist.make_move(board, position_hash, move)
+
+    return builder
+
+
+def from_pgn(pgn_file, jobs=None):
+    """
+    Convert every position of the finished games in a PGN file, with the
+    move that was played and the game result. Uses pgn.process_games.
+    """
+    builder = DatasetBuilder()
+    for part in pgn.process_games(pgn_file, _game_positions, jobs=jobs):
+        builder.extend(part)
+    return builder.to_dataset()
+
+
+def from_epd(epd_file):
+    """
+    Convert an EPD file. The bm opcode (SAN) becomes the best move and a
+    c9 opcode ("1-0", "0-1", "1/2-1/2") the result.
+    """
+    builder = DatasetBuilder()
+    parser = pgn.PGNParser()
+    board = Board()
+
+    with open(epd_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            fields = line.split(None, 4)
+            if len(fields) < 4:
+                continue
+
+            board.from_fen(' '.join(fields[:4]) + ' 0 1')
+            best_move = None
+            result = 0
+
+            operations = fields[4] if len(fields) > 4 else ''
+            for operation in operations.split(';'):
+                parts = operation.split(None, 1)
+                if len(parts) != 2:
+                    continue
+                opcode, operand = parts[0], parts[1].strip().strip('"')
+                if opcode == 'bm':
+                    best_move = parser._san_to_move(board, operand.split()[0])
+                elif opcode == 'c9':
+                    result = RESULTS.get(operand, 0)
+                elif opcode == 'hmvc':
+                    board.halfmove_clock = int(operand)
+                elif opcode == 'fmvn':
+                    board.fullmove_number = int(operand)
+
+            builder.add(board, result, best_move)
+
+    return builder.to_dataset()
+
+
+def from_puzzle_csv(csv_file, min_moves=2):
+    """
+    Convert a Lichess puzzle CSV (FEN, Moves, Rating columns). The first
+    move is the opponent's and is played before storing the position; the
+    second is the best move.
+    """
+    builder = DatasetBuilder()
+    parser = pgn.PGNParser()
+
+    with open(csv_file, 'r', encoding='utf-8', newline='') as f:
+        for row in csv.DictReader(f):
+            moves = row['Moves'].split()
+            if len(moves) < min_moves:
+                continue
+
+            board = Board()
+            board.from_fen(row['FEN'])
+            board.make_move(parser.uci_to_move(board, moves[0]))
+            best_move = parser.uci_to_move(board, moves[1])
+
+            builder.add(board, 0, best_move, rating=int(row.get('Rating') or 0))
+
+    return builder.to_dataset()
@@ -285,10 +285,9 @@ class Evaluator:
         Complete position evaluation.
         Returns score from White's perspective.
         """
-        # 0. Is checkmate
-        moves = board.generate_legal_moves()
-        if len(moves) == 0 and board.is_in_check(board.to_move):
-            return 20000
+        # 0. Is checkmate (the check test is cheap, so it goes first)
+        if board.is_in_check(board.to_move) and not board.generate_legal_moves():
+            return -MATE_SCORE if board.to_move == WHITE else MATE_SCORE
 
         score = 0
         is_endgame = self.is_endgame(board)
@@ -460,41 +460,120 @@ class KRKTablebase:
         
         key = self.encode_position(wk_sq, wr_sq, bk_sq, white_to_move)
         return self.table.get(key)
-    
-    def probe_from_board(self, board):
+
+    def probe_best_move(self, wk_sq, wr_sq, bk_sq, white_to_move):
         """
-        Probe the tablebase from a Board object.
-        Only works if the position is a KRK endgame.
+        Look up a position and choose the best move in one call.
+
+        Child positions are built directly from the square triple, so no
+        board or legal move generation is needed.
+
+        Returns: (outcome, depth, (from_sq, to_sq)) or None if the position
+        is illegal/not in tablebase. The move is None if the side to move
+        has no legal moves.
         """
-        # Count pieces
-        white_king = None
-        white_rook = None
-        black_king = None
-        piece_count = 0
-        
+        result = self.probe(wk_sq, wr_sq, bk_sq, white_to_move)
+        if result is None:
+            return None
+
+        outcome, dtm = result
+        best_move = None
+
+        if white_to_move:
+            # Winning: quickest mate that doesn't leave the rook hanging
+            best_dtm = float('inf')
+
+            children = [(wk_sq, sq, sq, wr_sq, bk_sq)
+                        for sq in self.generate_king_moves(wk_sq, {wr_sq, bk_sq})
+                        if not self.is_attacked_by_king(bk_sq, sq)]
+            children += [(wr_sq, sq, wk_sq, sq, bk_sq)
+                         for sq in self.generate_rook_moves(wr_sq, {wk_sq, bk_sq})]
+
+            for from_sq, to_sq, new_wk, new_wr, new_bk in children:
+                if (self.is_attacked_by_king(new_bk, new_wr) and
+                        not self.is_attacked_by_king(new_wk, new_wr)):
+                    continue
+
+                child = self.probe(new_wk, new_wr, new_bk, False)
+                if child is None:
+                    continue
+
+                if best_move is None:
+                    best_move = (from_sq, to_sq)
+                if child[0] == self.WHITE_WIN and child[1] < best_dtm:
+                    best_dtm = child[1]
+                    best_move = (from_sq, to_sq)
+        else:
+            # Defending: capture a loose rook, otherwise resist as long as possible
+            best_dtm = -1
+
+            for to_sq in self.generate_king_moves(bk_sq, {wk_sq}):
+                if self.is_attacked_by_king(wk_sq, to_sq):
+                    continue
+
+                if to_sq == wr_sq:
+                    # Rook is undefended (checked above) - bare kings draw
+                    return (outcome, dtm, (bk_sq, to_sq))
+
+                if self.is_attacked_by_rook(wr_sq, to_sq, wk_sq):
+                    continue
+
+                child = self.probe(wk_sq, wr_sq, to_sq, True)
+                if child is None:
+                    continue
+
+                if child[0] == self.DRAW:
+                    return (outcome, dtm, (bk_sq, to_sq))
+                if child[1] > best_dtm:
+                    best_dtm = child[1]
+                    best_move = (bk_sq, to_sq)
+
+        return (outcome, dtm, best_move)
+
+    def squares_from_board(self, board, strong_side=WHITE):
+        """
+        Extract the (king, rook, defending king, strong side to move) tuple
+        from a Board whose material is already known to be KRK.
+
+        When Black has the rook the board is mirrored vertically and the
+        colors swapped, so the same White-to-win table serves both sides.
+        """
+        rook = strong_side | ROOK
+        rook_sq = None
         for row in range(8):
             for col in range(8):
-                piece = board.board[row][col]
-                if piece == EMPTY:
-                    continue
-                
-                piece_count += 1
-                piece_type = piece & 7
-                color = piece & 24
-                
-                if piece == (WHITE | KING):
-                    white_king = self.coords_to_square(row, col)
-                elif piece == (WHITE | ROOK):
-                    white_rook = self.coords_to_square(row, col)
-                elif piece == (BLACK | KING):
-                    black_king = self.coords_to_square(row, col)
-        
-        # Must be exactly 3 pieces: WK, WR, BK
-        if piece_count != 3 or white_king is None or white_rook is None or black_king is None:
+                if board.board[row][col] == rook:
+                    rook_sq = row * 8 + col
+                    break
+            if rook_sq is not None:
+                break
+
+        if rook_sq is None:
             return None
-        
-        white_to_move = (board.to_move == WHITE)
-        return self.probe(white_king, white_rook, black_king, white_to_move)
+
+        if strong_side == WHITE:
+            king_row, king_col = board.white_king_pos
+            defender_row, defender_col = board.black_king_pos
+            return (king_row * 8 + king_col, rook_sq,
+                    defender_row * 8 + defender_col, board.to_move == WHITE)
+
+        king_row, king_col = board.black_king_pos
+        defender_row, defender_col = board.white_king_pos
+        return ((7 - king_row) * 8 + king_col, rook_sq ^ 56,
+                (7 - defender_row) * 8 + defender_col, board.to_move == BLACK)
+
+    def probe_from_board(self, board, strong_side=WHITE):
+        """
+        Probe the tablebase from a Board object.
+        Only works if the position is a KRK endgame; the caller is expected
+        to have checked the board's material key. WHITE_WIN in the result
+        means the side with the rook (strong_side) wins.
+        """
+        squares = self.squares_from_board(board, strong_side)
+        if squares is None:
+            return None
+
+        return self.probe(*squares)
     
     def save(self, filename):
         """Save tablebase to file."""
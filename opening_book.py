@@ -1,39 +1,116 @@
+import mmap
+import os
 import struct
 import random
+from collections import OrderedDict
 from typing import Optional, List, Tuple
-from zobrist import ZobristHash
+from zobrist import get_zobrist_hash
+from move import Move
 from constants import *
 
+try:
+    import numpy as np
+except ImportError:
+    # NumPy is optional - without it lookups bisect the mapped file directly
+    np = None
+
+# Polyglot entry: 8 byte key, 2 byte move, 2 byte weight, 4 byte learn (big-endian)
+ENTRY_SIZE = 16
+
+# Hash of the starting position under the standard Polyglot keys
+POLYGLOT_START_KEY = 0x463b96181691fc9c
+if np is not None:
+    POLYGLOT_ENTRY = np.dtype([('key', '>u8'), ('move', '>u2'),
+                               ('weight', '>u2'), ('learn', '>u4')])
+
 class OpeningBook:
     """
     Reader for Polyglot opening book format (.bin files).
+
+    The book file is memory-mapped once when the book is opened, and the
+    results of recent lookups are kept in a small LRU cache.
     """
     
-    def __init__(self, book_path: Optional[str] = None):
+    def __init__(self, book_path: Optional[str] = None, cache_size: int = 256,
+                 hash_scheme: Optional[str] = None):
         """
         Initialize opening book.
         
         Args:
             book_path: Path to Polyglot .bin file (None = no book)
+            cache_size: Number of recent position lookups to remember
+            hash_scheme: Zobrist scheme the book was built with ('random' or
+                'polyglot'). None detects it from the starting position.
         """
         self.book_path = book_path
         self.book_enabled = book_path is not None
         self.max_book_ply = 20  # Stay in book for first 20 plies
-        self.zobrist = ZobristHash()
+        self.hash_scheme = hash_scheme if hash_scheme else 'random'
+        self.zobrist = get_zobrist_hash(self.hash_scheme)
+
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._file = None
+        self._mmap = None
+        self.entry_count = 0
+        self.entries = None  # Zero-copy structured view of the mapped file
+        self.keys = None     # Zero-copy big-endian view of the entry keys
+        self._key_index = None
         
         if self.book_enabled:
             try:
-                # Test that we can open the book
-                with open(book_path, 'rb') as f:
-                    # Try reading one entry
-                    entry = f.read(16)
-                    if len(entry) == 16:
-                        print(f"✓ Opening book loaded: {book_path}")
-                    else:
-                        raise ValueError("Invalid book format")
+                self._open(book_path)
+                if hash_scheme is None:
+                    self._detect_hash_scheme()
+                print(f"✓ Opening book loaded: {book_path}")
             except Exception as e:
                 print(f"✗ Could not load opening book: {e}")
+                self.close()
                 self.book_enabled = False
+
+    def _open(self, book_path):
+        """Memory-map the book file and build the key index."""
+        self._file = open(book_path, 'rb')
+        file_size = os.fstat(self._file.fileno()).st_size
+        if file_size < ENTRY_SIZE:
+            raise ValueError("Invalid book format")
+
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.entry_count = file_size // ENTRY_SIZE
+
+        if np is not None:
+            self.entries = np.frombuffer(self._mmap, dtype=POLYGLOT_ENTRY,
+                                         count=self.entry_count)
+            self.keys = self.entries['key']
+            # searchsorted would byte-swap and copy the strided big-endian
+            # column on every call, so keep one native-order copy to search.
+            self._key_index = self.keys.astype(np.uint64)
+
+    def _detect_hash_scheme(self):
+        """
+        Switch to the standard Polyglot keys if the book contains the
+        Polyglot hash of the starting position. Our own bundled books
+        use the 'random' keys.
+        """
+        if self._search(POLYGLOT_START_KEY):
+            self.hash_scheme = 'polyglot'
+            self.zobrist = get_zobrist_hash('polyglot')
+            self._cache.clear()
+
+    def close(self):
+        """Release the memory map and file handle."""
+        # NumPy views hold the mmap buffer open, so drop them first
+        self.entries = None
+        self.keys = None
+        self._key_index = None
+        self._cache.clear()
+
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
     
     def _decode_move(self, move_int):
         """
@@ -72,77 +149,164 @@ class OpeningBook:
     
     def _find_entries(self, position_hash):
         """
-        Find all book entries for a position using binary search.
-        
-        The book file is sorted by hash, so we use binary search
-        to find the first matching entry, then read all consecutive matches.
+        Find all book entries for a position.
+
+        Recent results are served from an LRU cache, so calling is_in_book
+        and then get_book_move only searches the book once.
         
         Returns:
             List of (move_tuple, weight) entries
         """
         if not self.book_enabled:
             return []
-        
+
+        entries = self._cache.get(position_hash)
+        if entries is not None:
+            self._cache.move_to_end(position_hash)
+            return entries
+
+        try:
+            entries = self._search(position_hash)
+        except Exception as e:
+            print(f"Book lookup error: {e}")
+            return []
+
+        self._cache[position_hash] = entries
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+        return entries
+
+    def _search(self, position_hash):
+        """
+        Binary search the mapped book for every entry with this hash.
+        The book file is sorted by hash, so matches are consecutive.
+        """
+        if self._key_index is not None:
+            key = np.uint64(position_hash)
+            first = int(self._key_index.searchsorted(key, 'left'))
+            last = int(self._key_index.searchsorted(key, 'right'))
+
+            matches = self.entries[first:last]
+            return [(self._decode_move(int(move_int)), int(weight))
+                    for move_int, weight in zip(matches['move'], matches['weight'])]
+
+        # Find the first entry whose hash is >= position_hash
+        left, right = 0, self.entry_count
+        while left < right:
+            mid = (left + right) // 2
+            entry_hash = struct.unpack_from('>Q', self._mmap, mid * ENTRY_SIZE)[0]
+            if entry_hash < position_hash:
+                left = mid + 1
+            else:
+                right = mid
+
         entries = []
+        for index in range(left, self.entry_count):
+            # Unpack entry: Q=8 bytes hash, H=2 bytes move, H=2 bytes weight, I=4 bytes learn
+            entry_hash, move_int, weight, learn = struct.unpack_from(
+                '>QHHI', self._mmap, index * ENTRY_SIZE)
+
+            # Stop when we hit a different position
+            if entry_hash != position_hash:
+                break
+
+            entries.append((self._decode_move(move_int), weight))
+
+        return entries
+    
+    def _in_book_range(self, board, move_number: int) -> bool:
+        """Check if we're still within max_book_ply."""
+        ply = (move_number - 1) * 2 + (0 if board.to_move == WHITE else 1)
+        return ply < self.max_book_ply
+
+    def _select(self, entries, selection_mode: str):
+        """
+        Pick one of a list of (item, weight) entries.
+
+        Args:
+            selection_mode: "best" (highest weight), "weighted" (probabilistic
+                by weight) or "random" (ignores weights)
+        """
+        if selection_mode == "best":
+            # Choose highest weighted move
+            item, weight = max(entries, key=lambda e: e[1])
         
-        try:
-            with open(self.book_path, 'rb') as f:
-                # Get file size and entry count
-                f.seek(0, 2)  # Seek to end
-                file_size = f.tell()
-                entry_count = file_size // 16
-                
-                if entry_count == 0:
-                    return []
-                
-                # Binary search for first occurrence of this hash
-                left, right = 0, entry_count - 1
-                first_match = -1
-                
-                while left <= right:
-                    mid = (left + right) // 2
-                    f.seek(mid * 16)
-                    
-                    # Read hash from entry
-                    entry_hash = struct.unpack('>Q', f.read(8))[0]
-                    
-                    if entry_hash < position_hash:
-                        left = mid + 1
-                    elif entry_hash > position_hash:
-                        right = mid - 1
-                    else:
-                        # Found a match, but keep searching left for first occurrence
-                        first_match = mid
-                        right = mid - 1
-                
-                # If no match found, return empty
-                if first_match == -1:
-                    return []
-                
-                # Read all consecutive entries with matching hash
-                f.seek(first_match * 16)
-                
-                while f.tell() < file_size:
-                    entry_data = f.read(16)
-                    if len(entry_data) < 16:
-                        break
-                    
-                    # Unpack entry: Q=8 bytes hash, H=2 bytes move, H=2 bytes weight, I=4 bytes learn
-                    entry_hash, move_int, weight, learn = struct.unpack('>QHHI', entry_data)
-                    
-                    # Stop when we hit a different position
-                    if entry_hash != position_hash:
+        elif selection_mode == "weighted":
+            # Probabilistic selection based on weights
+            total_weight = sum(w for _, w in entries)
+            if total_weight == 0:
+                # All weights are zero, choose randomly
+                item, weight = random.choice(entries)
+            else:
+                # Weighted random selection
+                r = random.uniform(0, total_weight)
+                cumulative = 0
+                item = entries[0][0]
+                for m, w in entries:
+                    cumulative += w
+                    if r <= cumulative:
+                        item = m
                         break
-                    
-                    # Decode move and add to list
-                    move_tuple = self._decode_move(move_int)
-                    entries.append((move_tuple, weight))
         
-        except Exception as e:
-            print(f"Book lookup error: {e}")
+        else:  # random
+            item, weight = random.choice(entries)
+
+        return item
+
+    def probe(self, board) -> List[Tuple[Move, int]]:
+        """
+        Look up the position once and return its book moves as native moves.
+
+        Each decoded entry is validated with Board.find_move, which only
+        generates moves for the piece on the from-square.
+        
+        Returns:
+            List of (Move, weight) tuples, sorted by weight descending
+        """
+        if not self.book_enabled:
             return []
+
+        position_hash = self.zobrist.hash_position(board)
+        candidates = []
+
+        for move_tuple, weight in self._find_entries(position_hash):
+            from_row, from_col, to_row, to_col, promotion = move_tuple
+
+            # Polyglot stores castling as the king capturing its own rook
+            piece = board.board[from_row][from_col]
+            if ((piece & 7) == KING and from_col == 4 and to_row == from_row and
+                    board.board[to_row][to_col] == (piece & 24) | ROOK):
+                to_col = 6 if to_col == 7 else 2
+
+            move = board.find_move(from_row, from_col, to_row, to_col, promotion)
+            if move is not None:
+                candidates.append((move, weight))
+
+        candidates.sort(key=lambda c: -c[1])
+        return candidates
+
+    def select_move(self, board, move_number: int,
+                    selection_mode: str = "weighted") -> Optional[Move]:
+        """
+        Choose a book move for the position as a native Move.
         
-        return entries
+        Args:
+            board: Current board position
+            move_number: Current move number (for max_book_ply check)
+            selection_mode: "best", "weighted" or "random" (see get_book_move)
+        
+        Returns:
+            Move or None if not in book
+        """
+        if not self.book_enabled or not self._in_book_range(board, move_number):
+            return None
+
+        candidates = self.probe(board)
+        if not candidates:
+            return None
+
+        return self._select(candidates, selection_mode)
     
     def get_book_move(self, board, move_number: int, 
                       selection_mode: str = "weighted") -> Optional[str]:
@@ -164,8 +328,7 @@ class OpeningBook:
             return None
         
         # Check if we're still in book range
-        ply = (move_number - 1) * 2 + (0 if board.to_move == WHITE else 1)
-        if ply >= self.max_book_ply:
+        if not self._in_book_range(board, move_number):
             return None
         
         # Get position hash
@@ -178,29 +341,7 @@ class OpeningBook:
             return None
         
         # Select move based on mode
-        if selection_mode == "best":
-            # Choose highest weighted move
-            move_tuple, weight = max(entries, key=lambda e: e[1])
-        
-        elif selection_mode == "weighted":
-            # Probabilistic selection based on weights
-            total_weight = sum(w for _, w in entries)
-            if total_weight == 0:
-                # All weights are zero, choose randomly
-                move_tuple, weight = random.choice(entries)
-            else:
-                # Weighted random selection
-                r = random.uniform(0, total_weight)
-                cumulative = 0
-                move_tuple = entries[0][0]
-                for m, w in entries:
-                    cumulative += w
-                    if r <= cumulative:
-                        move_tuple = m
-                        break
-        
-        else:  # random
-            move_tuple, weight = random.choice(entries)
+        move_tuple = self._select(entries, selection_mode)
         
         # Convert move tuple to UCI format
         from_row, from_col, to_row, to_col, promotion = move_tuple
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Perft: move generator correctness check and benchmark.
+
+Counts the leaf nodes of the legal move tree and compares them with the
+published numbers for the standard test positions. Any change to move
+generation or make/unmake should leave this suite passing.
+
+Usage:
+    python perft.py                         # Standard suite, default depths
+    python perft.py --depth 4               # Standard suite to depth 4
+    python perft.py --hash                  # Use the (key, depth) cache
+    python perft.py --jobs 4 --depth 5      # Split root moves over 4 processes
+    python perft.py --fen "<FEN>" --depth 3 --divide
+"""
+
+import argparse
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from board import Board
+
+START_FEN = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+
+# (name, FEN, leaf counts for depth 1, 2, ..., default depth)
+PERFT_SUITE = [
+    ('Start position', START_FEN,
+     [20, 400, 8902, 197281, 4865609, 119060324], 4),
+    ('Kiwipete', 'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1',
+     [48, 2039, 97862, 4085603, 193690690], 3),
+    ('Position 3', '8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1',
+     [14, 191, 2812, 43238, 674624, 11030083], 4),
+    ('Position 4', 'r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1',
+     [6, 264, 9467, 422333, 15833292], 3),
+    ('Position 5', 'rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8',
+     [44, 1486, 62379, 2103487, 89941194], 3),
+    ('Position 6', 'r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10',
+     [46, 2079, 89890, 3894594, 164075551], 3),
+]
+
+
+def _move_key(move):
+    """Picklable (from_row, from_col, to_row, to_col, promotion) for a Move."""
+    return (move.from_row, move.from_col, move.to_row, move.to_col, move.promotion)
+
+
+def _perft_task(fen, line, depth, hashed):
+    """
+    Process pool worker: rebuild the position from FEN, play a line of
+    moves (as _move_key tuples) from it and count the rest of the tree.
+    """
+    board = Board()
+    board.from_fen(fen)
+    for key in line:
+        board.make_move(board.find_move(*key))
+    return board.perft(depth - len(line), {} if hashed else None)
+
+
+def parallel_divide(fen, depth, jobs=None, hashed=False):
+    """
+    Perft divide with the subtrees counted in a process pool.
+
+    Root moves are the units of work. When there are too few of them to
+    keep every worker busy, the depth 2 subtrees are split out instead.
+    Each worker has its own hash cache when hashed is set.
+
+    Returns:
+        Dict of UCI root move -> leaf count
+    """
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+
+    board = Board()
+    board.from_fen(fen)
+    root_moves = board.generate_legal_moves()
+    if depth <= 1:
+        return {str(move): 1 for move in root_moves}
+
+    names = {_move_key(move): str(move) for move in root_moves}
+    lines = [(key,) for key in names]
+    if len(lines) < jobs * 4 and depth > 2:
+        lines = []
+        for move in root_moves:
+            undo_info = board.make_move(move)
+            lines.extend((_move_key(move), _move_key(reply))
+                         for reply in board.generate_legal_moves())
+            board.unmake_move(move, undo_info)
+
+    # Root moves without replies (mate or stalemate) still count as 0
+    divide = defaultdict(int, {name: 0 for name in names.values()})
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        counts = executor.map(_perft_task, [fen] * len(lines), lines,
+                              [depth] * len(lines), [hashed] * len(lines))
+        for line, count in zip(lines, counts):
+            divide[names[line[0]]] += count
+
+    return dict(divide)
+
+
+def run_perft(fen, depth, hashed=False, jobs=1):
+    """
+    Run perft on one position.
+
+    Args:
+        jobs: Worker processes (1 = count in this process)
+
+    Returns:
+        Tuple of (nodes, seconds)
+    """
+    start = time.perf_counter()
+    if jobs > 1:
+        nodes = sum(parallel_divide(fen, depth, jobs, hashed).values())
+        return nodes, time.perf_counter() - start
+
+    board = Board()
+    board.from_fen(fen)
+    nodes = board.perft(depth, {} if hashed else None)
+    return nodes, time.perf_counter() - start
+
+
+def run_suite(depth=None, hashed=False, jobs=1):
+    """
+    Run the standard suite and print a nodes-per-second report.
+
+    Args:
+        depth: Depth for every position (None = each position's default,
+            capped at the deepest known count)
+        hashed: Use the (key, depth) transposition cache
+        jobs: Worker processes per position
+
+    Returns:
+        True if every count matched
+    """
+    print(f"{'Position':<16}{'Depth':>6}{'Nodes':>12}{'Expected':>12}{'Time':>9}{'NPS':>10}")
+    print("-" * 65)
+
+    total_nodes = 0
+    total_time = 0.0
+    passed = True
+
+    for name, fen, counts, default_depth in PERFT_SUITE:
+        position_depth = min(depth or default_depth, len(counts))
+        nodes, seconds = run_perft(fen, position_depth, hashed, jobs)
+        expected = counts[position_depth - 1]
+
+        ok = nodes == expected
+        passed &= ok
+        total_nodes += nodes
+        total_time += seconds
+
+        nps = nodes / seconds if seconds > 0 else 0
+        status = "✓" if ok else "✗"
+        print(f"{name:<16}{position_depth:>6}{nodes:>12}{expected:>12}{seconds:>8.2f}s{nps:>10.0f} {status}")
+
+    print("-" * 65)
+    total_nps = total_nodes / total_time if total_time > 0 else 0
+    print(f"{'Total':<16}{'':>6}{total_nodes:>12}{'':>12}{total_time:>8.2f}s{total_nps:>10.0f}")
+    print("All counts match ✓" if passed else "Perft mismatch ✗")
+
+    return passed
+
+
+def print_divide(fen, depth, hashed=False, jobs=1):
+    """Print the perft count below each root move."""
+    start = time.perf_counter()
+    if jobs > 1:
+        divide = parallel_divide(fen, depth, jobs, hashed)
+    else:
+        board = Board()
+        board.from_fen(fen)
+        divide = board.perft_divide(depth, {} if hashed else None)
+    seconds = time.perf_counter() - start
+
+    for move, count in sorted(divide.items()):
+        print(f"{move}: {count}")
+
+    nodes = sum(divide.values())
+    nps = nodes / seconds if seconds > 0 else 0
+    print(f"\nMoves: {len(divide)}")
+    if jobs > 1:
+        print(f"Jobs: {jobs}")
+    print(f"Nodes: {nodes}")
+    print(f"Time: {seconds:.2f}s ({nps:.0f} nps)")
+    return divide
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="PyMinMaximus perft")
+    parser.add_argument('--depth', type=int, help="Search depth in plies")
+    parser.add_argument('--fen', help="Position to count (default: standard suite)")
+    parser.add_argument('--divide', action='store_true', help="Show counts per root move")
+    parser.add_argument('--hash', action='store_true', help="Cache (key, depth) counts")
+    parser.add_argument('--jobs', type=int, default=1,
+                        help="Worker processes (0 = one per CPU)")
+    args = parser.parse_args(argv)
+    jobs = args.jobs or os.cpu_count() or 1
+
+    if args.fen or args.divide:
+        fen = args.fen or START_FEN
+        depth = args.depth or 3
+        if args.divide:
+            print_divide(fen, depth, args.hash, jobs)
+        else:
+            nodes, seconds = run_perft(fen, depth, args.hash, jobs)
+            nps = nodes / seconds if seconds > 0 else 0
+            print(f"Nodes: {nodes}")
+            print(f"Time: {seconds:.2f}s ({nps:.0f} nps)")
+        return 0
+
+    return 0 if run_suite(args.depth, args.hash, jobs) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,8 +1,39 @@
+import os
 import re
+import struct
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from board import Board
 from move import Move
 from constants import *
 
+# Compiled once and shared by every game
+HEADER_RE = re.compile(r'\[(\w+)\s+"(.*)"\]')
+
+# One token per match. Comments, NAGs and move numbers are matched so they
+# can be skipped; parentheses are returned so variations can be skipped by
+# depth; anything else is a SAN move (possibly with !/? annotations).
+MOVETEXT_TOKEN_RE = re.compile(r"""
+      \{[^}]*\}                 # {comment}
+    | ;[^\n]*                   # ; comment to end of line
+    | \$\d+                     # NAG
+    | \d+\.+                    # move number (1. or 23...)
+    | (?P<open>\()
+    | (?P<close>\))
+    | (?P<result>1-0|0-1|1/2-1/2|\*)
+    | (?P<san>[^\s{}();$]+)
+""", re.VERBOSE)
+
+# Piece letter, optional from file/rank, optional x, destination, promotion
+SAN_RE = re.compile(r'([NBRQK])?([a-h])?([1-8])?x?([a-h][1-8])(?:=?([NBRQnbrq]))?[+#]*$')
+
+SAN_PIECES = {'N': KNIGHT, 'B': BISHOP, 'R': ROOK, 'Q': QUEEN, 'K': KING}
+
+# Game index file: magic, PGN size, PGN mtime (ns), game count, then offsets
+INDEX_MAGIC = b'PGNIDX1\0'
+INDEX_HEADER = struct.Struct('<8sQQQ')
+
 class PGNGame:
     """Represents a single chess game from a PGN file."""
     
@@ -27,43 +58,54 @@ class PGNParser:
     
     def parse_file(self, filename):
         """Parse a PGN file and extract all games."""
-        with open(filename, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        return self.parse_string(content)
+        self.games = list(self.iter_games(filename))
+        return self.games
     
     def parse_string(self, pgn_string):
         """Parse PGN content from a string."""
-        self.games = []
-        
-        # Split into individual games
-        # Games are separated by blank lines after the movetext
-        game_texts = self._split_games(pgn_string)
-        
-        for game_text in game_texts:
+        self.games = list(self._iter_parsed(pgn_string.split('\n')))
+        return self.games
+
+    def iter_games(self, filename):
+        """
+        Yield the games of a PGN file one at a time.
+
+        The file is read through a buffered line iterator and only the
+        current game is held in memory, so arbitrarily large databases
+        can be processed. Games are not stored in self.games.
+        """
+        with open(filename, 'r', encoding='utf-8') as f:
+            yield from self._iter_parsed(f)
+
+    def _iter_parsed(self, lines):
+        """Parse each game text produced from an iterable of lines."""
+        for game_text in self._iter_game_texts(lines):
             if game_text.strip():
                 game = self._parse_game(game_text)
                 if game:
-                    self.games.append(game)
-        
-        return self.games
+                    yield game
     
     def _split_games(self, content):
         """Split PGN content into individual games."""
-        games = []
+        return list(self._iter_game_texts(content.split('\n')))
+
+    def _iter_game_texts(self, lines):
+        """
+        Yield the text of each game from an iterable of lines.
+        Games are separated by blank lines after the movetext.
+        """
         current_game = []
         in_headers = False
         
-        lines = content.split('\n')
-        
         for line in lines:
+            line = line.rstrip('\n')
             stripped = line.strip()
             
             # Check if this is a header line
             if stripped.startswith('['):
                 if current_game and not in_headers:
                     # We've hit a new game
-                    games.append('\n'.join(current_game))
+                    yield '\n'.join(current_game)
                     current_game = []
                 in_headers = True
                 current_game.append(line)
@@ -76,9 +118,7 @@ class PGNParser:
         
         # Don't forget the last game
         if current_game:
-            games.append('\n'.join(current_game))
-        
-        return games
+            yield '\n'.join(current_game)
     
     def _parse_game(self, game_text):
         """Parse a single game from text."""
@@ -92,7 +132,7 @@ class PGNParser:
             line = line.strip()
             if line.startswith('['):
                 # Parse header
-                match = re.match(r'\[(\w+)\s+"(.*)"\]', line)
+                match = HEADER_RE.match(line)
                 if match:
                     key, value = match.groups()
                     game.headers[key] = value
@@ -100,8 +140,8 @@ class PGNParser:
                 # This is part of the movetext
                 movetext_lines.append(line)
         
-        # Parse movetext
-        movetext = ' '.join(movetext_lines)
+        # Parse movetext (keep line breaks so ; comments end at the line)
+        movetext = '\n'.join(movetext_lines)
         game.moves, game.result = self._parse_movetext(movetext)
         
         # Convert to UCI
@@ -112,40 +152,27 @@ class PGNParser:
     def _parse_movetext(self, movetext):
         """Parse the movetext section and extract moves."""
         moves = []
-        
-        # Remove comments in braces
-        movetext = re.sub(r'\{[^}]*\}', '', movetext)
-        
-        # Remove comments in semicolons
-        movetext = re.sub(r';[^\n]*', '', movetext)
-        
-        # Remove variations (recursive parentheses is complex, so we'll do simple)
-        while '(' in movetext:
-            movetext = re.sub(r'\([^()]*\)', '', movetext)
-        
-        # Extract result
-        result_match = re.search(r'(1-0|0-1|1/2-1/2|\*)\s*$', movetext)
-        result = result_match.group(1) if result_match else "*"
-        
-        # Remove result from movetext
-        movetext = re.sub(r'(1-0|0-1|1/2-1/2|\*)\s*$', '', movetext)
-        
-        # Remove move numbers (e.g., "1.", "23...")
-        movetext = re.sub(r'\d+\.+', '', movetext)
-        
-        # Remove NAGs (Numeric Annotation Glyphs like $1, $2, etc.)
-        movetext = re.sub(r'\$\d+', '', movetext)
-        
-        # Remove annotation symbols (!, ?, !!, ??, !?, ?!)
-        movetext = re.sub(r'[!?]+', '', movetext)
-        
-        # Split into individual moves
-        tokens = movetext.split()
-        
-        for token in tokens:
-            token = token.strip()
-            if token and not token.startswith('(') and not token.endswith(')'):
-                moves.append(token)
+        result = "*"
+        depth = 0  # Variation nesting depth
+        
+        # Single pass over the tokens: comments, NAGs and move numbers
+        # match no named group and are dropped
+        for match in MOVETEXT_TOKEN_RE.finditer(movetext):
+            kind = match.lastgroup
+            if kind == 'open':
+                depth += 1
+            elif kind == 'close':
+                depth = max(depth - 1, 0)
+            elif depth:
+                # Skip everything inside variations
+                continue
+            elif kind == 'result':
+                result = match.group('result')
+            elif kind == 'san':
+                # Remove annotation symbols (!, ?, !!, ??, !?, ?!)
+                token = match.group('san').strip('!?')
+                if token:
+                    moves.append(token)
         
         return moves, result
     
@@ -161,14 +188,12 @@ class PGNParser:
         
         for san_move in game.moves:
             try:
-                uci_move = self._san_to_uci(board, san_move)
-                if uci_move:
-                    uci_moves.append(uci_move)
+                move = self._san_to_move(board, san_move)
+                if move:
+                    uci_moves.append(self._move_to_uci(move))
                     
                     # Make the move on the board
-                    move = self._uci_to_move(board, uci_move)
-                    if move:
-                        board.make_move(move)
+                    board.make_move(move)
                 else:
                     print(f"Warning: Could not convert move '{san_move}'")
                     break
@@ -180,117 +205,62 @@ class PGNParser:
     
     def _san_to_uci(self, board, san):
         """Convert a single SAN move to UCI format."""
-        # Generate all legal moves
-        legal_moves = board.generate_legal_moves()
-        
-        # Store original for debugging
-        original_san = san
-        
-        # Clean up the SAN notation
-        san = san.replace('+', '').replace('#', '')
-        
+        move = self._san_to_move(board, san)
+        return self._move_to_uci(move) if move else None
+
+    def _san_to_move(self, board, san):
+        """
+        Resolve a single SAN move to a legal Move on this board.
+
+        Instead of generating every legal move, the origin squares are
+        found by looking backwards from the destination for pieces of the
+        right type. A full legality check is only made when several pieces
+        fit the SAN or the only one might be pinned.
+        """
         # Handle castling
-        if san in ['O-O', 'O-O-O']:
-            for move in legal_moves:
-                if move.is_castling:
-                    if san == 'O-O' and move.to_col == 6:
-                        return self._move_to_uci(move)
-                    elif san == 'O-O-O' and move.to_col == 2:
-                        return self._move_to_uci(move)
-        
-        # Parse the SAN move
-        piece_type = None
-        from_file = None
-        from_rank = None
-        to_square = None
-        promotion = None
-        is_capture = 'x' in san
-        
-        # Remove capture indicator for parsing
-        san = san.replace('x', '')
-        
-        # Check for promotion
-        if '=' in san:
-            san, promo_char = san.split('=')
-            promotion_map = {'Q': QUEEN, 'R': ROOK, 'B': BISHOP, 'N': KNIGHT}
-            promotion = promotion_map.get(promo_char.upper())
-        
-        # Determine piece type
-        if san[0].isupper():
-            piece_map = {'K': KING, 'Q': QUEEN, 'R': ROOK, 'B': BISHOP, 'N': KNIGHT}
-            piece_type = piece_map.get(san[0])
-            san = san[1:]  # Remove piece character
-        else:
-            piece_type = PAWN
-        
-        # Extract destination square (last 2 characters)
-        if len(san) >= 2:
-            to_square = san[-2:]
-            san = san[:-2]
-        else:
-            return None
-        
-        # Extract disambiguation info (file and/or rank)
-        if san:
-            for char in san:
-                if char.isalpha():
-                    from_file = ord(char) - ord('a')
-                elif char.isdigit():
-                    from_rank = int(char) - 1
-        
-        # Convert destination square to row/col
-        if len(to_square) != 2 or not to_square[0].isalpha() or not to_square[1].isdigit():
+        castle = san.rstrip('+#!?').replace('0', 'O')
+        if castle in ('O-O', 'O-O-O'):
+            row = 0 if board.to_move == WHITE else 7
+            to_col = 6 if castle == 'O-O' else 2
+            return board.find_move(row, 4, row, to_col)
+
+        match = SAN_RE.match(san)
+        if not match:
             return None
-            
+        piece_char, from_file, from_rank, to_square, promo_char = match.groups()
+
+        piece_type = SAN_PIECES[piece_char] if piece_char else PAWN
         to_col = ord(to_square[0]) - ord('a')
         to_row = int(to_square[1]) - 1
-        
-        # Validate coordinates
-        if not (0 <= to_col < 8 and 0 <= to_row < 8):
-            return None
-        
-        # Find matching legal move
+
+        promotion = None
+        if promo_char:
+            promotion = SAN_PIECES[promo_char.upper()]
+        elif piece_type == PAWN and to_row in (0, 7):
+            return None  # Pawn reaching the last rank must promote
+
+        # Pieces that can reach the destination, filtered by disambiguation
         candidates = []
-        for move in legal_moves:
-            # Check if destination matches
-            if move.to_row != to_row or move.to_col != to_col:
+        for from_row, from_col in board.find_origins(to_row, to_col, piece_type):
+            if from_file is not None and from_col != ord(from_file) - ord('a'):
                 continue
-            
-            # Check piece type
-            piece = board.board[move.from_row][move.from_col]
-            if (piece & 7) != piece_type:
+            if from_rank is not None and from_row != int(from_rank) - 1:
                 continue
-            
-            # Check disambiguation
-            if from_file is not None and move.from_col != from_file:
-                continue
-            if from_rank is not None and move.from_row != from_rank:
-                continue
-            
-            # Check promotion
-            if promotion is not None:
-                if move.promotion != promotion:
-                    continue
-            elif move.promotion is not None:
-                # SAN doesn't have promotion but move does
-                continue
-            
-            candidates.append(move)
-        
-        # If we have exactly one candidate, use it
+            candidates.append(Move(from_row, from_col, to_row, to_col,
+                                   promotion=promotion,
+                                   is_en_passant=(piece_type == PAWN and
+                                                  board.en_passant_square == (to_row, to_col))))
+
         if len(candidates) == 1:
-            return self._move_to_uci(candidates[0])
-        elif len(candidates) > 1:
-            # Multiple candidates - shouldn't happen with proper disambiguation
-            # Try to pick the most likely one (capture if it's a capture move)
-            if is_capture:
-                for move in candidates:
-                    target = board.board[move.to_row][move.to_col]
-                    if target != EMPTY:
-                        return self._move_to_uci(move)
-            return self._move_to_uci(candidates[0])
-        
-        return None
+            move = candidates[0]
+            if (piece_type == KING or
+                    not (move.is_en_passant or board.may_be_pinned(move.from_row, move.from_col))):
+                return move
+            return move if board.is_legal_move(move) else None
+
+        # Ambiguous: keep the candidates that don't leave the king in check
+        legal = [move for move in candidates if board.is_legal_move(move)]
+        return legal[0] if legal else None
     
     def _move_to_uci(self, move):
         """Convert a Move object to UCI notation."""
@@ -307,8 +277,12 @@ class PGNParser:
         
         return uci
     
-    def _uci_to_move(self, board, uci):
-        """Convert UCI notation to a Move object."""
+    def uci_to_move(self, board, uci):
+        """
+        Convert UCI notation to a Move object for board. The move is not
+        checked for legality, so it is meant for trusted input such as a
+        parsed game's uci_moves.
+        """
         files = 'abcdefgh'
         
         from_col = files.index(uci[0])
@@ -337,19 +311,126 @@ class PGNParser:
                    is_en_passant=is_en_passant)
 
 
-def pgn_to_uci(pgn_filename, output_filename=None):
+def game_index_path(pgn_filename):
+    """Path of the game offset index stored next to a PGN file."""
+    return pgn_filename + '.idx'
+
+
+def build_game_index(pgn_filename):
+    """
+    Scan a PGN file once and return the byte offset where each game starts.
+    Uses the same game boundaries as PGNParser._iter_game_texts.
+    """
+    offsets = array('Q')
+    in_headers = False
+    in_game = False
+    offset = 0
+
+    with open(pgn_filename, 'rb') as f:
+        for line in f:
+            stripped = line.strip()
+            if stripped.startswith(b'['):
+                # First header after movetext (or at the top) starts a game
+                if not in_headers:
+                    offsets.append(offset)
+                in_headers = True
+                in_game = True
+            elif stripped:
+                if not in_game:
+                    # Game without headers
+                    offsets.append(offset)
+                    in_game = True
+                in_headers = False
+            offset += len(line)
+
+    return offsets
+
+
+def load_game_index(pgn_filename, rebuild=False):
+    """
+    Return the game offsets for a PGN file, reusing the index saved next to
+    it when the PGN hasn't changed since. Otherwise the index is rebuilt
+    and saved.
+    """
+    stat = os.stat(pgn_filename)
+    index_path = game_index_path(pgn_filename)
+
+    if not rebuild and os.path.exists(index_path):
+        with open(index_path, 'rb') as f:
+            header = f.read(INDEX_HEADER.size)
+            if len(header) == INDEX_HEADER.size:
+                magic, size, mtime, count = INDEX_HEADER.unpack(header)
+                if magic == INDEX_MAGIC and size == stat.st_size and mtime == stat.st_mtime_ns:
+                    offsets = array('Q')
+                    offsets.frombytes(f.read(count * offsets.itemsize))
+                    if len(offsets) == count:
+                        return offsets
+
+    offsets = build_game_index(pgn_filename)
+    try:
+        with open(index_path, 'wb') as f:
+            f.write(INDEX_HEADER.pack(INDEX_MAGIC, stat.st_size, stat.st_mtime_ns, len(offsets)))
+            offsets.tofile(f)
+    except OSError as e:
+        print(f"Warning: Could not save game index: {e}")
+
+    return offsets
+
+
+def _process_game_range(pgn_filename, start, end, worker):
+    """Parse the games between two byte offsets and hand them to worker."""
+    with open(pgn_filename, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start if end is not None else -1)
+
+    parser = PGNParser()
+    return worker(parser._iter_parsed(data.decode('utf-8').split('\n')))
+
+
+def process_games(pgn_filename, worker, jobs=None, games_per_task=500):
+    """
+    Run worker over every game of a PGN file using a process pool.
+
+    The file is split into ranges of games_per_task games using the saved
+    game index. Each process parses its range and calls worker with an
+    iterator of PGNGame objects. worker must be picklable (a module-level
+    function or functools.partial of one).
+
+    Yields:
+        worker's result for each range, in file order
+    """
+    offsets = load_game_index(pgn_filename)
+    starts = [offsets[i] for i in range(0, len(offsets), games_per_task)]
+    ends = starts[1:] + [None]
+
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+
+    if jobs <= 1 or len(starts) <= 1:
+        yield from map(_process_game_range, repeat(pgn_filename), starts, ends, repeat(worker))
+        return
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        # map() returns results in submission order
+        yield from executor.map(_process_game_range, repeat(pgn_filename),
+                                starts, ends, repeat(worker))
+
+
+def pgn_to_uci(pgn_filename, output_filename=None, jobs=None):
     """
     Convert a PGN file to UCI format.
     
     Args:
         pgn_filename: Path to the input PGN file
         output_filename: Path to the output file (optional)
+        jobs: Number of worker processes (None = one per CPU)
     
     Returns:
         List of games with UCI moves
     """
-    parser = PGNParser()
-    games = parser.parse_file(pgn_filename)
+    games = []
+    for range_games in process_games(pgn_filename, list, jobs=jobs):
+        games.extend(range_games)
     
     if output_filename:
         with open(output_filename, 'w', encoding='utf-8') as f:
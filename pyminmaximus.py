@@ -10,14 +10,18 @@ from uci import main as uci_main
 if __name__ == "__main__":
     # Check for command line arguments
     if len(sys.argv) > 1:
-        print(sys.argv)
         if sys.argv[1] == '--help' or sys.argv[1] == '-h':
             print("PyMinMaximus Chess Engine")
             print("Usage:")
             print("  python pyminmaximus.py           # Run in UCI mode")
+            print("  python pyminmaximus.py bench     # Run the search benchmark (JSON)")
             print("  python pyminmaximus.py --help    # Show this help")
             print("\nUCI mode is used by chess GUIs and tournament managers.")
+            print("Run 'python pyminmaximus.py bench --help' for benchmark options.")
             sys.exit(0)
+        if sys.argv[1] == 'bench':
+            from bench import main as bench_main
+            sys.exit(bench_main(sys.argv[2:]))
     
     # Run in UCI mode
     uci_main()
@@ -6,22 +6,170 @@ from opening_book import OpeningBook
 import os
 import threading
 import pst
-import zobrist
+from board import material_signature_key
+from move import Move
 
 lock = threading.Lock()
 
+# Move ordering offset that puts captures losing material (by SEE)
+# behind the quiet moves
+LOSING_CAPTURE_PENALTY = 20000
+
+# Pruning near the leaves, indexed by remaining depth (the length sets
+# the deepest depth pruned). SearchEngine copies them so they can be tuned.
+REVERSE_FUTILITY_MARGINS = (0, 120, 240, 360)  # Static eval this far above beta fails high
+FUTILITY_MARGINS = (0, 200, 300, 500)  # Quiet moves can't lift an eval this far below alpha
+RAZOR_MARGINS = (0, 300, 500)  # Eval this far below alpha drops into quiescence
+
+# Nodes without a hash move: from IID_DEPTH on, a search IID_REDUCTION
+# plies shallower finds one (internal iterative deepening); from IIR_DEPTH
+# on, the node is searched one ply less instead (internal iterative
+# reduction). SearchEngine copies these so they can be tuned.
+IID_DEPTH = 5
+IID_REDUCTION = 2
+IIR_DEPTH = 3
+
+# Static evaluations kept by position key before the cache is cleared
+EVAL_CACHE_SIZE = 1 << 18
+
+# Aspiration windows: half width of the first window around the previous
+# iteration's score, and the width past which the window is opened fully
+ASPIRATION_WINDOW = 40
+ASPIRATION_MAX = 1000
+
+# Bound of a fully open window. Finite, so window arithmetic stays exact.
+INFINITE = MATE_SCORE + 1
+
+class SearchStats:
+    """
+    Counters describing how a search spent its nodes.
+    
+    Collection is off by default: the engine and table hold None instead
+    of a SearchStats and only test for None at each counting site.
+    Counters for features the search does not have yet stay at zero.
+    """
+    COUNTERS = (
+        'tt_probes',           # Table lookups
+        'tt_hits',             # Lookups that found the position
+        'tt_cutoffs',          # Hits that returned a score without searching
+        'beta_cutoffs',        # Nodes that failed high
+        'first_move_cutoffs',  # ... on the first legal move searched
+        'qnodes',              # Quiescence nodes
+        'null_move_tries',
+        'null_move_cutoffs',
+        'lmr_reductions',      # Late moves searched at reduced depth
+        'lmr_researches',      # ... that had to be searched again at full depth
+        'pvs_researches',      # Null-window searches repeated with the full window
+        'check_extensions',    # Nodes searched one ply deeper for being in check
+        'reverse_futility_prunes',  # Nodes cut because the static eval beat beta
+        'futility_prunes',     # Quiet moves skipped at nodes far below alpha
+        'razor_prunes',        # Nodes settled by a quiescence search
+        'iid_searches',        # Shallower searches run to find a hash move
+        'iir_reductions',      # Nodes searched one ply less for lack of a hash move
+        'mate_distance_prunes',  # Nodes cut because a shorter mate is already known
+        'aspiration_researches',  # Root searches repeated after leaving the window
+        'eval_cache_hits',
+        'tablebase_hits',
+    )
+    
+    def __init__(self):
+        self.reset()
+    
+    def reset(self):
+        """Zero every counter and forget the iterations."""
+        for name in self.COUNTERS:
+            setattr(self, name, 0)
+        # (depth, nodes, seconds) per completed iteration
+        self.iterations = []
+    
+    def end_iteration(self, depth, nodes, seconds):
+        """Record the node count and time of a completed iteration."""
+        self.iterations.append((depth, nodes, seconds))
+    
+    def branching_factors(self):
+        """
+        Effective branching factor of each iteration: its node count
+        divided by the previous iteration's.
+        
+        Returns:
+            List of (depth, ebf) from the second iteration on
+        """
+        return [(depth, nodes / previous if previous else 0.0)
+                for (_, previous, _), (depth, nodes, _)
+                in zip(self.iterations, self.iterations[1:])]
+    
+    def first_move_cutoff_rate(self):
+        """Fraction of fail-highs on the first move (move ordering quality)."""
+        return self.first_move_cutoffs / self.beta_cutoffs if self.beta_cutoffs else 0.0
+    
+    def tt_hit_rate(self):
+        return self.tt_hits / self.tt_probes if self.tt_probes else 0.0
+    
+    def add(self, other):
+        """
+        Add another search's counters to this one. Iterations of the same
+        depth are summed, so the totals over many positions still give a
+        branching factor per depth.
+        """
+        for name in self.COUNTERS:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        
+        index = {depth: i for i, (depth, _, _) in enumerate(self.iterations)}
+        for depth, nodes, seconds in other.iterations:
+            if depth in index:
+                _, total_nodes, total_seconds = self.iterations[index[depth]]
+                self.iterations[index[depth]] = (depth, total_nodes + nodes, total_seconds + seconds)
+            else:
+                index[depth] = len(self.iterations)
+                self.iterations.append((depth, nodes, seconds))
+    
+    def to_dict(self):
+        """Counters and derived ratios as a JSON-serializable dict."""
+        result = {name: getattr(self, name) for name in self.COUNTERS}
+        result['tt_hit_rate'] = round(self.tt_hit_rate(), 4)
+        result['first_move_cutoff_rate'] = round(self.first_move_cutoff_rate(), 4)
+        result['ebf'] = [[depth, round(ebf, 2)] for depth, ebf in self.branching_factors()]
+        return result
+    
+    def info_string(self):
+        """One-line summary for a UCI 'info string' message."""
+        ebf = self.branching_factors()
+        return (f"tt {self.tt_hits}/{self.tt_probes} hits {self.tt_cutoffs} cutoffs "
+                f"betacuts {self.beta_cutoffs} fmc {self.first_move_cutoff_rate():.1%} "
+                f"qnodes {self.qnodes} "
+                f"null {self.null_move_cutoffs}/{self.null_move_tries} "
+                f"lmr {self.lmr_researches}/{self.lmr_reductions} "
+                f"pvs {self.pvs_researches} aspiration {self.aspiration_researches} "
+                f"checkext {self.check_extensions} mdp {self.mate_distance_prunes} "
+                f"rfp {self.reverse_futility_prunes} fut {self.futility_prunes} "
+                f"razor {self.razor_prunes} iid {self.iid_searches} iir {self.iir_reductions} "
+                f"evalcache {self.eval_cache_hits} tbhits {self.tablebase_hits} "
+                f"ebf {ebf[-1][1] if ebf else 0.0:.2f}")
+
 class TranspositionTable:
     def __init__(self, size_mb=64):
         # Approximate number of entries based on memory
         self.size = (size_mb * 1024 * 1024) // 100  # rough estimate
         self.table = {}
-        self.zobrist_hash = zobrist.ZobristHash()
+        self.stats = None  # SearchStats when collection is on
     
     def get_hash(self, board):
-        return self.zobrist_hash.hash_position(board)
+        # The board keeps its own key up to date move by move. The
+        # opening book's hashing scheme is independent of the table's.
+        return board.hash
     
-    def store(self, board, depth, score, flag):
+    def store(self, board, depth, score, flag, best_move=None, ply=0):
+        """
+        Store a search result. Mate and tablebase win scores are relative
+        to the root, so they are stored relative to this position (ply from
+        the root) and converted back by probe at whatever ply the position
+        recurs.
+        """
         hash_key = self.get_hash(board)
+        if score >= TB_WIN_BOUND:
+            score += ply
+        elif score <= -TB_WIN_BOUND:
+            score -= ply
         
         # Always replace if:
         # 1. Slot is empty, or
@@ -35,7 +183,8 @@ class TranspositionTable:
         self.table[hash_key] = {
             'depth': depth,
             'score': score,
-            'flag': flag
+            'flag': flag,
+            'move': best_move
         }
         
         # Simple size limit - remove 10% when full
@@ -45,17 +194,32 @@ class TranspositionTable:
             # Keep the deepest searches
             self.table = dict(items[len(items)//10:])
     
-    def probe(self, board, depth, alpha, beta):
+    def get_move(self, board):
+        """Return the best move stored for this position, or None."""
+        entry = self.table.get(self.get_hash(board))
+        return entry['move'] if entry else None
+    
+    def hashfull(self):
+        """Table usage in permille, as reported by UCI 'info hashfull'."""
+        return min(1000, len(self.table) * 1000 // self.size)
+    
+    def probe(self, board, depth, alpha, beta, ply=0):
         """
         Check if we've seen this position before.
-        Returns (found, score) tuple.
+        Returns (found, score) tuple, with mate and tablebase win scores
+        relative to the root for a position ply moves from it.
         """
         hash_key = self.get_hash(board)
+        stats = self.stats
+        if stats is not None:
+            stats.tt_probes += 1
         
         if hash_key not in self.table:
             return False, 0
         
         entry = self.table[hash_key]
+        if stats is not None:
+            stats.tt_hits += 1
         
         # Only use if searched to equal or greater depth
         if entry['depth'] < depth:
@@ -63,6 +227,10 @@ class TranspositionTable:
         
         score = entry['score']
         flag = entry['flag']
+        if score >= TB_WIN_BOUND:
+            score -= ply
+        elif score <= -TB_WIN_BOUND:
+            score += ply
         
         if flag == 'exact':
             return True, score
@@ -75,21 +243,65 @@ class TranspositionTable:
         
         return False, 0
 
+def _ignore_report(info):
+    """Search report callback for callers that only want the result."""
+
 class SearchEngine:
-    def __init__(self, board, evaluator=None, book=None):
+    def __init__(self, board, evaluator=None, book=None, collect_stats=False):
         self.board = board
         self.set_stop(False)
         self.evaluator = evaluator if evaluator else Evaluator()
         self.nodes_searched = 0
-        self.tt = TranspositionTable()
+        self.stats = None
+
+        # Progress reporting (see iterative_deepening)
+        self.report = None
+        self.report_interval = 1.0  # seconds between currmove / nps updates
+        self.search_start = time.time()
+        self._last_report = self.search_start
+        self.total_nodes = 0
+        self.seldepth = 0
+
+        # Abort handling: the stop flag and the time manager are only
+        # polled every poll_mask + 1 nodes
+        self.poll_mask = 255
+        self.time_manager = None
+        self.pv = []  # Principal variation of the last result
+        self.multipv = 1  # Number of best root moves to find
+        self.lines = []  # (move, score, pv) per MultiPV line of the last result
+        self.aborted = False
+        self.abortable = True
+        self.root_first_move = None
+
+        # Leaf pruning margins (an empty tuple turns a pruning off) and the
+        # static evaluation cache they use
+        self.reverse_futility_margins = REVERSE_FUTILITY_MARGINS
+        self.futility_margins = FUTILITY_MARGINS
+        self.razor_margins = RAZOR_MARGINS
+        self.eval_cache = {}
+        self.iid_depth = IID_DEPTH
+        self.iid_reduction = IID_REDUCTION
+        self.iir_depth = IIR_DEPTH
 
         # Opening book
         self.book = book if book else OpeningBook('books/kasparov.bin')
 
+        self.tt = TranspositionTable()
+
+        self.enable_stats(collect_stats)
+
         # Add tablebase
         self.krk_tablebase = None
         self.load_tablebases()
 
+    def enable_stats(self, enabled=True):
+        """
+        Turn search statistics on (a fresh SearchStats) or off (None, so
+        the search pays only a None check per counter).
+        """
+        self.stats = SearchStats() if enabled else None
+        self.tt.stats = self.stats
+
     def load_tablebases(self):
         """Load endgame tablebases"""
         try:
@@ -104,122 +316,73 @@ class SearchEngine:
             self.krk_tablebase.generate()
             self.krk_tablebase.save(table_path)
 
+        # Material key -> (tablebase, side that owns the extra material).
+        # Only positions whose material signature matches a loaded table
+        # are ever probed.
+        self.tablebases = {
+            material_signature_key('KRvK'): (self.krk_tablebase, WHITE),
+            material_signature_key('KvKR'): (self.krk_tablebase, BLACK),
+        }
+
     def is_tablebase_position(self, board):
-        """Check if position is in a tablebase"""
-        # Count pieces and material
-        piece_count = 0
-        white_pieces = []
-        black_pieces = []
-        
-        for row in range(8):
-            for col in range(8):
-                piece = board.board[row][col]
-                if piece != EMPTY:
-                    piece_count += 1
-                    if (piece & 24) == WHITE:
-                        white_pieces.append(piece & 7)
-                    else:
-                        black_pieces.append(piece & 7)
-        
-        # Check for KRK
-        if piece_count == 3:
-            white_pieces.sort()
-            black_pieces.sort()
-            
-            # White has K+R, Black has K
-            if white_pieces == [KING, ROOK] and black_pieces == [KING]:
-                return 'KRK_white'
-            
-            # Black has K+R, White has K (flip the board mentally)
-            if white_pieces == [KING] and black_pieces == [KING, ROOK]:
-                return 'KRK_black'
-        
-        return None
+        """Return the (tablebase, strong side) entry for this position, or None."""
+        return self.tablebases.get(board.material_key)
     
-    def probe_tablebase(self, board):
+    def probe_tablebase(self, board, find_move=True, ply=0):
         """
         Probe endgame tablebases.
         Returns (score, best_move) or None if not in tablebase.
+        The score is from the perspective of the side to move, with wins
+        in the TB_WIN_SCORE band ply moves from the root; best_move is only
+        looked up when find_move is set.
         """
-        tb_type = self.is_tablebase_position(board)
+        entry = self.tablebases.get(board.material_key)
+        
+        if entry is None:
+            return None
         
-        if tb_type is None:
+        tablebase, strong_side = entry
+        squares = tablebase.squares_from_board(board, strong_side)
+        if squares is None:
             return None
         
-        if tb_type == 'KRK_white':
-            # Query KRK tablebase
-            result = self.krk_tablebase.probe_from_board(board)
+        best_move = None
+        if find_move:
+            result = tablebase.probe_best_move(*squares)
             if result is None:
                 return None
-            
-            outcome, dtm = result
-            
-            if outcome == self.krk_tablebase.WHITE_WIN:
-                # Convert DTM to score
-                # Use high score that decreases with distance
-                score = 19000 - dtm
-            else:  # DRAW
-                score = 0
-            
-            # Find the best move that maintains this outcome
-            best_move = self.find_tablebase_best_move(board, outcome, dtm)
-            return (score, best_move)
-        
-        elif tb_type == 'KRK_black':
-            # Flip perspective for black
-            result = self.krk_tablebase.probe_from_board(board)
+            outcome, dtm, move_squares = result
+            if move_squares is not None:
+                best_move = self.tablebase_move(move_squares, strong_side)
+        else:
+            result = tablebase.probe(*squares)
             if result is None:
                 return None
-            
             outcome, dtm = result
-            
-            if outcome == self.krk_tablebase.WHITE_WIN:
-                # Black is losing
-                score = -(19000 - dtm)
-            else:
-                score = 0
-            
-            best_move = self.find_tablebase_best_move(board, outcome, dtm)
-            return (score, best_move)
         
-        return None
+        if outcome == tablebase.WHITE_WIN:
+            # The table's depth ranks wins but is no mate distance, so
+            # wins get their own band below the mates
+            score = TB_WIN_SCORE - ply - dtm
+            if board.to_move != strong_side:
+                score = -score
+        else:  # DRAW
+            score = 0
+        
+        return (score, best_move)
 
-    def find_tablebase_best_move(self, board, target_outcome, current_dtm):
+    def tablebase_move(self, move_squares, strong_side):
         """
-        Find the best move according to the tablebase.
-        Looks for moves that maintain winning path or quickest mate.
+        Convert a tablebase (from_sq, to_sq) pair into a Move, undoing the
+        vertical mirror used when Black is the side with the extra material.
         """
-        moves = board.generate_legal_moves()
-        best_move = None
-        best_dtm = float('inf')
-        
-        for move in moves:
-            undo_info = board.make_move(move)
-            
-            # Query position after move
-            result = self.krk_tablebase.probe_from_board(board)
-            
-            board.unmake_move(move, undo_info)
-            
-            if result is None:
-                continue
-            
-            outcome, dtm = result
-            
-            # If we're winning, look for quickest mate
-            if outcome == target_outcome:
-                if outcome == self.krk_tablebase.WHITE_WIN:
-                    # Want smallest DTM (quickest mate)
-                    if dtm < best_dtm:
-                        best_dtm = dtm
-                        best_move = move
-                else:  # DRAW
-                    best_move = move
-                    break  # Any drawing move is fine
-        
-        return best_move
+        from_sq, to_sq = move_squares
+        if strong_side == BLACK:
+            from_sq ^= 56
+            to_sq ^= 56
+        return Move(from_sq // 8, from_sq % 8, to_sq // 8, to_sq % 8)
     
-    def minimax(self, depth, maximizing_player):
+    def minimax(self, depth, maximizing_player, ply=1):
         """
         Basic minimax search algorithm.
         Returns the evaluation score for the current position.
@@ -236,7 +399,7 @@ class SearchEngine:
         if len(moves) == 0:
             if self.board.is_in_check(self.board.to_move):
                 # Checkmate - return a score that's worse the sooner it happens
-                return -20000 + (10 - depth)  # Prefer longer defense
+                return -MATE_SCORE + ply  # Prefer longer defense
             else:
                 # Stalemate
                 return 0
@@ -245,7 +408,7 @@ class SearchEngine:
             max_eval = float('-inf')
             for move in moves:
                 undo_info = self.board.make_move(move)
-                eval_score = self.minimax(depth - 1, False)
+                eval_score = self.minimax(depth - 1, False, ply + 1)
                 self.board.unmake_move(move, undo_info)
                 max_eval = max(max_eval, eval_score)
             return max_eval
@@ -253,7 +416,7 @@ class SearchEngine:
             min_eval = float('inf')
             for move in moves:
                 undo_info = self.board.make_move(move)
-                eval_score = self.minimax(depth - 1, True)
+                eval_score = self.minimax(depth - 1, True, ply + 1)
                 self.board.unmake_move(move, undo_info)
                 min_eval = min(min_eval, eval_score)
             return min_eval
@@ -283,10 +446,11 @@ class SearchEngine:
         
         return best_move, best_eval
     
-    def order_moves(self, moves):
+    def order_moves(self, moves, hash_move=None):
         """
         Order moves to improve alpha-beta pruning.
-        Better moves first = more pruning.
+        Better moves first = more pruning. The hash move, the best move
+        stored for the position, goes first.
         """
         def move_score(move):
             score = 0
@@ -302,6 +466,10 @@ class SearchEngine:
                 
                 # Prioritize capturing valuable pieces with cheap pieces
                 score += captured_value * 10 - attacker_value
+                
+                # Losing captures go after the quiet moves
+                if self.is_losing_capture(move):
+                    score -= LOSING_CAPTURE_PENALTY
             
             # Prioritize promotions
             if move.promotion:
@@ -312,212 +480,697 @@ class SearchEngine:
             
             return score
         
-        return sorted(moves, key=move_score, reverse=True)
+        moves = sorted(moves, key=move_score, reverse=True)
+        if hash_move is not None:
+            # Stable sort, so the rest keep their order
+            moves.sort(key=lambda move: str(move) != str(hash_move))
+        return moves
+    
+    def is_losing_capture(self, move):
+        """
+        True if a capture loses material by SEE. Taking a piece worth at
+        least the attacker never loses, so only the others are evaluated.
+        """
+        board = self.board.board
+        captured = board[move.to_row][move.to_col]
+        if move.promotion or move.is_en_passant:
+            return False
+        attacker = board[move.from_row][move.from_col]
+        if pst.get_piece_value(captured & 7) >= pst.get_piece_value(attacker & 7):
+            return False
+        return self.board.see(move) < 0
     
-    def alphabeta(self, depth, alpha, beta, maximizing_player):
+    def alphabeta(self, depth, alpha, beta, ply=1):
         """
-        Alpha-beta with transposition table.
+        Negamax alpha-beta with transposition table.
+        Scores are from the point of view of the side to move; mates are
+        MATE_SCORE minus the plies from the root. ply is the distance of
+        this node from the root. Positions in check are searched one ply
+        deeper.
+        Returns 0 once the search is aborted; callers must check aborted.
         """
-        # Check if we should stop (for UCI)
-        if self.stop:
+        # Draw by repetition or the fifty-move rule, whatever the tables
+        # say, since they do not know the path to this position
+        if self.board.is_repetition() or self.board.is_fifty_move_draw():
             return 0
         
-        # Check tablebase FIRST (before any search)
-        piece_count = sum(1 for row in self.board.board for p in row if p != EMPTY)
-        if piece_count <= 5:
-            tb_result = self.probe_tablebase(self.board)
+        # Check tablebase before any search
+        if self.board.material_key in self.tablebases:
+            tb_result = self.probe_tablebase(self.board, find_move=False, ply=ply)
             if tb_result is not None:
+                if self.stats is not None:
+                    self.stats.tablebase_hits += 1
                 score, _ = tb_result
-                # Return from current player's perspective
-                if not maximizing_player:
-                    score = -score
                 return score
         
-        alpha_orig = alpha
-        beta_orig = beta
+        # Mate distance pruning: no score here can beat being mated now
+        # or mating with the next move, so a known shorter mate elsewhere
+        # settles the node
+        alpha = max(alpha, -MATE_SCORE + ply)
+        beta = min(beta, MATE_SCORE - ply - 1)
+        if alpha >= beta:
+            if self.stats is not None:
+                self.stats.mate_distance_prunes += 1
+            return alpha
         
         # Check transposition table
-        tt_hit, tt_score = self.tt.probe(self.board, depth, alpha, beta)
+        tt_hit, tt_score = self.tt.probe(self.board, depth, alpha, beta, ply)
         if tt_hit:
+            if self.stats is not None:
+                self.stats.tt_cutoffs += 1
             return tt_score
         
         self.nodes_searched += 1
+        if ply > self.seldepth:
+            self.seldepth = ply
+        if not self.nodes_searched & self.poll_mask:
+            self.poll()
+            if self.aborted:
+                return 0
         
-        if depth == 0:
-            score = self.evaluator.evaluate_relative(self.board)
-            return score
+        # Check extension, so a check at the horizon is resolved
+        in_check = self.board.is_in_check(self.board.to_move)
+        if in_check and ply < MAX_PLY:
+            depth += 1
+            if self.stats is not None:
+                self.stats.check_extensions += 1
         
-        # Generate and order pseudo-legal moves
-        pseudo_moves = self.board.generate_pseudo_legal_moves()
+        if depth <= 0 or ply >= MAX_PLY:
+            return self.quiescence(alpha, beta, ply)
         
-        if len(pseudo_moves) == 0:
-            # Impossible since we are looking at pseudo moves
-            if self.board.is_in_check(self.board.to_move):
-                return -20000 - depth
-            else:
+        # Pruning near the leaves on the static evaluation, never in check.
+        # Reverse futility and razoring would cut the principal variation
+        # short, so they only prune null-window (non-PV) nodes.
+        futility_score = None
+        pv_node = beta - alpha > 1
+        if not in_check:
+            static_eval = self.static_eval()
+            
+            # Reverse futility: so far above beta that one move won't matter
+            margins = self.reverse_futility_margins
+            if (not pv_node and depth < len(margins) and beta < MATE_BOUND
+                    and static_eval - margins[depth] >= beta):
+                if self.stats is not None:
+                    self.stats.reverse_futility_prunes += 1
+                return static_eval
+            
+            # Razoring: so far below alpha that only captures could help
+            margins = self.razor_margins
+            if (not pv_node and depth < len(margins) and alpha > -MATE_BOUND
+                    and static_eval + margins[depth] <= alpha):
+                # Only whether quiescence can reach alpha matters
+                score = self.quiescence(alpha, alpha + 1, ply)
+                if self.aborted:
+                    return 0
+                if score <= alpha:
+                    if self.stats is not None:
+                        self.stats.razor_prunes += 1
+                    return score
+            
+            # Futility: quiet moves are skipped below
+            margins = self.futility_margins
+            if depth < len(margins) and alpha > -MATE_BOUND and static_eval + margins[depth] <= alpha:
+                futility_score = static_eval + margins[depth]
+        
+        # Without a hash move to search first, get one from a shallower
+        # search of this node's moves (IID) or, closer to the leaves,
+        # search one ply less (IIR)
+        hash_move = self.tt.get_move(self.board)
+        if hash_move is None and depth >= self.iid_depth:
+            if self.stats is not None:
+                self.stats.iid_searches += 1
+            self.search_moves(depth - self.iid_reduction, alpha, beta, ply, None, futility_score)
+            if self.aborted:
                 return 0
+            hash_move = self.tt.get_move(self.board)
+        elif hash_move is None and depth >= self.iir_depth:
+            if self.stats is not None:
+                self.stats.iir_reductions += 1
+            depth -= 1
+        
+        return self.search_moves(depth, alpha, beta, ply, hash_move, futility_score)
+    
+    def search_moves(self, depth, alpha, beta, ply, hash_move=None, futility_score=None):
+        """
+        Search the moves of the node alphabeta has entered, hash_move
+        first, and store the result in the transposition table. Quiet
+        moves are skipped in favour of futility_score when it is given.
+        The node itself (draws, table probes, node count, extensions) is
+        left to alphabeta, so IID can call this again on the same node.
+        Returns 0 once the search is aborted; callers must check aborted.
+        """
+        alpha_orig = alpha
         
-        ordered_moves = self.order_moves(pseudo_moves)
+        # Generate and order pseudo-legal moves
+        pseudo_moves = self.board.generate_pseudo_legal_moves()
+        ordered_moves = self.order_moves(pseudo_moves, hash_move)
         
-        if maximizing_player:
-            max_eval = float('-inf')
-            legal_move_found = False
+        best_score = float('-inf')
+        best_move = None
+        legal_moves = 0
+        
+        for move in ordered_moves:
+            if not self.board.is_legal_move(move):
+                continue
             
-            for move in ordered_moves:
-                if not self.board.is_legal_move(move):
-                    continue
-                
-                legal_move_found = True
-                undo_info = self.board.make_move(move)
-                eval_score = self.alphabeta(depth - 1, alpha, beta, False)
-                self.board.unmake_move(move, undo_info)
-                
-                max_eval = max(max_eval, eval_score)
-                alpha = max(alpha, eval_score)
-                
-                if beta <= alpha:
-                    break
+            legal_moves += 1
+            quiet = (futility_score is not None and not move.promotion and not move.is_en_passant
+                     and self.board.board[move.to_row][move.to_col] == EMPTY)
+            undo_info = self.board.make_move(move)
             
-            if not legal_move_found:
-                if self.board.is_in_check(self.board.to_move):
-                    return -20000 - depth
-                else:
-                    return 0
+            # A quiet move that gives no check can't reach alpha. One move
+            # that avoids being mated is searched first, so a lost node is
+            # not mistaken for a merely bad one.
+            if quiet and best_score > -MATE_BOUND and not self.board.is_in_check(self.board.to_move):
+                self.board.unmake_move(move, undo_info)
+                if self.stats is not None:
+                    self.stats.futility_prunes += 1
+                best_score = max(best_score, futility_score)
+                continue
             
-            # Store in transposition table
-            if max_eval >= beta:
-                flag = 'lowerbound'
-            elif max_eval <= alpha_orig:
-                flag = 'upperbound'
+            # Principal variation search: the first move gets the full
+            # window, the rest only have to prove they can't beat alpha and
+            # are re-searched if one does.
+            if best_move is None:
+                score = -self.alphabeta(depth - 1, -beta, -alpha, ply + 1)
             else:
-                flag = 'exact'
-            self.tt.store(self.board, depth, max_eval, flag)
+                score = -self.alphabeta(depth - 1, -alpha - 1, -alpha, ply + 1)
+                if alpha < score < beta and not self.aborted:
+                    if self.stats is not None:
+                        self.stats.pvs_researches += 1
+                    score = -self.alphabeta(depth - 1, -beta, -alpha, ply + 1)
+            self.board.unmake_move(move, undo_info)
             
-            return max_eval
+            # The score of an interrupted subtree is meaningless
+            if self.aborted:
+                return 0
+            
+            if score > best_score:
+                best_score = score
+                best_move = move
+            alpha = max(alpha, score)
+            
+            if alpha >= beta:
+                if self.stats is not None:
+                    self.stats.beta_cutoffs += 1
+                    if legal_moves == 1:
+                        self.stats.first_move_cutoffs += 1
+                break
+        
+        if not legal_moves:
+            if self.board.is_in_check(self.board.to_move):
+                # Checkmate - better for the loser the further from the root
+                return -MATE_SCORE + ply
+            else:
+                return 0
+        
+        # Store in transposition table
+        if best_score <= alpha_orig:
+            flag = 'upperbound'
+        elif best_score >= beta:
+            flag = 'lowerbound'
         else:
-            min_eval = float('inf')
-            legal_move_found = False
+            flag = 'exact'
+        self.tt.store(self.board, depth, best_score, flag, best_move, ply)
+        
+        return best_score
+    
+    def static_eval(self):
+        """Evaluation from the side to move's point of view, cached by position key."""
+        key = self.board.hash
+        score = self.eval_cache.get(key)
+        if score is not None:
+            if self.stats is not None:
+                self.stats.eval_cache_hits += 1
+            return score
+        
+        score = self.evaluator.evaluate_relative(self.board)
+        if len(self.eval_cache) >= EVAL_CACHE_SIZE:
+            self.eval_cache.clear()
+        self.eval_cache[key] = score
+        return score
+    
+    def quiescence(self, alpha, beta, ply):
+        """
+        Search captures only, until the position is quiet, so the static
+        evaluation is never taken in the middle of an exchange. The side
+        to move may stand pat on the static evaluation instead of
+        capturing. Captures that lose material by SEE are not searched.
+        In check there is no standing pat: every evasion is searched.
+        Returns 0 once the search is aborted; callers must check aborted.
+        """
+        self.nodes_searched += 1
+        if self.stats is not None:
+            self.stats.qnodes += 1
+        if ply > self.seldepth:
+            self.seldepth = ply
+        if not self.nodes_searched & self.poll_mask:
+            self.poll()
+            if self.aborted:
+                return 0
+        
+        # Mate distance bounds, as in alphabeta
+        alpha = max(alpha, -MATE_SCORE + ply)
+        beta = min(beta, MATE_SCORE - ply - 1)
+        if alpha >= beta:
+            if self.stats is not None:
+                self.stats.mate_distance_prunes += 1
+            return alpha
+        
+        in_check = self.board.is_in_check(self.board.to_move)
+        if in_check:
+            # The side in check can't ignore it, so it gets no stand pat
+            # and every evasion is searched. A mate is scored by its
+            # distance from the root, which the static evaluation does
+            # not know.
+            evasions = self.board.generate_legal_moves()
+            if not evasions:
+                return -MATE_SCORE + ply
+            if ply >= MAX_PLY:
+                return self.static_eval()
+            best_score = -INFINITE
+            moves = self.order_moves(evasions)
+        else:
+            stand_pat = self.static_eval()
+            if stand_pat >= beta or ply >= MAX_PLY:
+                return stand_pat
+            alpha = max(alpha, stand_pat)
+            best_score = stand_pat
             
-            for move in ordered_moves:
-                if not self.board.is_legal_move(move):
-                    continue
-                
-                legal_move_found = True
-                undo_info = self.board.make_move(move)
-                eval_score = self.alphabeta(depth - 1, alpha, beta, True)
-                self.board.unmake_move(move, undo_info)
-                
-                min_eval = min(min_eval, eval_score)
-                beta = min(beta, eval_score)
-                
-                if beta <= alpha:
-                    break
+            # Losing captures are pruned outright
+            moves = self.order_moves([move for move in self.board.generate_captures()
+                                      if not self.is_losing_capture(move)])
+        
+        for move in moves:
+            if not in_check and not self.board.is_legal_move(move):
+                continue
             
-            if not legal_move_found:
-                if self.board.is_in_check(self.board.to_move):
-                    return 20000 + depth
-                else:
-                    return 0
+            undo_info = self.board.make_move(move)
+            score = -self.quiescence(-beta, -alpha, ply + 1)
+            self.board.unmake_move(move, undo_info)
             
-            # Store in transposition table
-            if min_eval <= alpha:
-                flag = 'upperbound'
-            elif min_eval >= beta_orig:
-                flag = 'lowerbound'
-            else:
-                flag = 'exact'
-            self.tt.store(self.board, depth, min_eval, flag)
+            if self.aborted:
+                return 0
             
-            return min_eval
+            if score > best_score:
+                best_score = score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+        
+        return best_score
     
-    def find_best_move_alphabeta(self, depth):
+    def probe_root(self):
         """
-        Find the best move using alpha-beta pruning.
-        time_remaining: time left in milliseconds (optional)
+        Look up the root position in the opening book and the tablebases.
+        Returns (move, score) or None if the position has to be searched.
         """
         # Check opening book
-        if self.book.is_in_book(self.board):
-            moves = self.board.generate_legal_moves()
-            book_move = self.book.get_book_move(self.board,len(self.board.move_stack))
-            for move in moves:
-                if str(move) == book_move:
-                    return move, 1000
+        book_move = self.book.select_move(self.board, len(self.board.move_stack))
+        if book_move is not None:
+            return book_move, 1000
 
         # Check tablebase
-        piece_count = sum(1 for row in self.board.board for p in row if p != EMPTY)
-        if piece_count <= 5:
+        if self.board.material_key in self.tablebases:
             tb_result = self.probe_tablebase(self.board)
             if tb_result is not None:
                 score, best_move = tb_result
                 if best_move is not None:
-                    print(f"Tablebase: {best_move} (score: {score})")
+                    if self.report is None:
+                        print(f"Tablebase: {best_move} (score: {score})")
+                    else:
+                        self.report({'depth': 0, 'score': score,
+                                     'mate': self.mate_distance(score),
+                                     'tbhits': 1, 'pv': [best_move]})
                     return best_move, score
 
+        return None
+    
+    def find_best_move_alphabeta(self, depth):
+        """
+        Find the best move using alpha-beta pruning.
+        The opening book and tablebases are tried first.
+        """
+        root = self.probe_root()
+        if root is not None:
+            return root
         self.nodes_searched = 0
+        return self.search_root(depth)
+    
+    def search_root(self, depth, excluded=None, first_move=None,
+                    alpha=-INFINITE, beta=INFINITE):
+        """
+        Search every root move to depth. The best move is stored in the
+        transposition table, so the next iteration searches it first.
+        
+        Args:
+            depth: Search depth
+            excluded: UCI strings of root moves to leave out (MultiPV)
+            first_move: Move to search first instead of the table's move
+            alpha, beta: Root window. A score <= alpha is only an upper
+                bound (fail low), a score >= beta a lower bound (fail high).
+        
+        If the search is aborted, the best of the root moves that were
+        searched completely is returned and root_first_move tells which
+        move was searched first. No move is returned if every score so
+        far failed low, since they are only bounds.
+        """
+        self.aborted = self.stop and self.abortable
+        self.root_first_move = None
         best_move = None
         best_eval = float('-inf')
-        alpha = float('-inf')
-        beta = float('inf')
+        alpha_orig = alpha
         
         moves = self.board.generate_legal_moves()
+        if excluded:
+            moves = [move for move in moves if str(move) not in excluded]
         
         if len(moves) == 0:
             return None, 0
         
-        for move in moves:
-            if self.stop:
+        # Previous iteration's best move first
+        if first_move is None:
+            first_move = self.tt.get_move(self.board)
+        if first_move is not None:
+            moves.sort(key=lambda move: str(move) != str(first_move))
+        
+        for move_number, move in enumerate(moves, 1):
+            if self.aborted:
                 break
-
-            if len(self.board.move_stack) > 1:
-                # Skip the last move
-                last_move = self.board.move_stack[-2][0]
-                if move.to_row == last_move.from_row and move.to_col == last_move.from_col:
-                    continue
+            
+            if self.report is not None and time.time() - self.search_start >= self.report_interval:
+                self.report({'depth': depth, 'currmove': move, 'currmovenumber': move_number})
             
             undo_info = self.board.make_move(move)
-            eval_score = self.alphabeta(depth - 1, alpha, beta, False)
+            eval_score = -self.alphabeta(depth - 1, -beta, -alpha)
             self.board.unmake_move(move, undo_info)
             
+            if self.aborted:
+                break
+            if self.root_first_move is None:
+                self.root_first_move = move
+            
             if eval_score > best_eval:
                 best_eval = eval_score
                 best_move = move
             
             alpha = max(alpha, eval_score)
+            if alpha >= beta:
+                break
+        
+        if best_eval <= alpha_orig:
+            # Fail low: keep the previous best move first for the re-search
+            return (None if self.aborted else best_move), best_eval
+        if best_move is not None and not self.aborted:
+            flag = 'lowerbound' if best_eval >= beta else 'exact'
+            self.tt.store(self.board, depth, best_eval, flag, best_move)
         
         return best_move, best_eval
     
-    def iterative_deepening(self, max_depth, time_limit=None):
+    def aspiration_search(self, depth, previous_score, excluded=None, first_move=None):
+        """
+        Root search with a window around the previous iteration's score.
+        A narrow window prunes more; when the score falls outside it the
+        root is searched again with the window widened on that side,
+        doubling each time until it is opened fully. Mate scores and
+        the first iterations use the full window.
+        
+        Returns:
+            (move, score) as search_root
+        """
+        if depth < 3 or previous_score is None or abs(previous_score) >= MATE_BOUND:
+            return self.search_root(depth, excluded, first_move)
+        
+        delta = ASPIRATION_WINDOW
+        alpha = previous_score - delta
+        beta = previous_score + delta
+        
+        while True:
+            move, score = self.search_root(depth, excluded, first_move, alpha, beta)
+            if self.aborted or move is None or alpha < score < beta:
+                return move, score
+            
+            if self.stats is not None:
+                self.stats.aspiration_researches += 1
+            delta *= 2
+            if score <= alpha:
+                # Fail low: the previous best move stays first
+                beta = (alpha + beta) // 2
+                alpha = score - delta
+                if delta > ASPIRATION_MAX or score <= -MATE_BOUND:
+                    alpha = -INFINITE
+            else:
+                # Fail high: the new best move is first from the table
+                first_move = move
+                beta = score + delta
+                if delta > ASPIRATION_MAX or score >= MATE_BOUND:
+                    beta = INFINITE
+    
+    def search_more_lines(self, depth, lines):
+        """
+        MultiPV: search the root again without the moves already found,
+        until there are multipv lines. Each pass is an aspiration search
+        of the remaining moves, so every line has an exact score, and the
+        table makes the later passes cheaper than the first.
+        
+        Args:
+            depth: Search depth
+            lines: [(move, score)] found so far, best first
+        
+        Returns:
+            The new (move, score) lines. Stops early on an abort.
+        """
+        found = list(lines)
+        
+        while len(found) < self.multipv:
+            excluded = {str(move) for move, _ in found}
+            # Search last iteration's next line first, in a window around
+            # its score
+            hint, previous_score = next(((move, score) for move, score, _ in self.lines
+                                         if str(move) not in excluded), (None, None))
+            move, score = self.aspiration_search(depth, previous_score, excluded, hint)
+            if self.aborted or move is None:
+                break
+            found.append((move, score))
+        
+        # Keep the best line's move at the root for ordering and the PV
+        best_move, best_score = lines[0]
+        self.tt.store(self.board, depth, best_score, 'exact', best_move)
+        return found[len(lines):]
+    
+    def analyse(self, max_depth, multipv=3, time_limit=None, callback=None):
+        """
+        MultiPV analysis: the best multipv root moves with their scores
+        and principal variations, from an iterative deepening search.
+        
+        Returns:
+            List of (move, score, pv), best first
+        """
+        saved_multipv = self.multipv
+        self.multipv = multipv
+        try:
+            self.iterative_deepening(max_depth, time_limit,
+                                     callback if callback else _ignore_report)
+        finally:
+            self.multipv = saved_multipv
+        return self.lines
+    
+    def get_pv(self, best_move, max_length):
+        """
+        Principal variation: best_move followed by the moves stored in the
+        transposition table, up to max_length moves. Stops at a missing or
+        illegal move and at a repeated position.
+        """
+        pv = [best_move]
+        undo_stack = [(best_move, self.board.make_move(best_move))]
+        seen = {self.tt.get_hash(self.board)}
+        
+        while len(pv) < max_length:
+            stored = self.tt.get_move(self.board)
+            if stored is None:
+                break
+            move = self.board.find_move(stored.from_row, stored.from_col,
+                                        stored.to_row, stored.to_col, stored.promotion)
+            if move is None:
+                break
+            pv.append(move)
+            undo_stack.append((move, self.board.make_move(move)))
+            
+            position = self.tt.get_hash(self.board)
+            if position in seen:
+                break
+            seen.add(position)
+        
+        for move, undo_info in reversed(undo_stack):
+            self.board.unmake_move(move, undo_info)
+        return pv
+    
+    def mate_distance(self, score):
+        """
+        Moves to mate for a root score (negative when the side to move is
+        mated), or None if score is not a mate.
+        """
+        if abs(score) < MATE_BOUND:
+            return None
+        plies = MATE_SCORE - abs(score)
+        moves = (plies + 1) // 2
+        return moves if score > 0 else -moves
+    
+    def poll(self):
+        """
+        Called every poll_mask + 1 nodes: abort on a stop request or at the
+        time manager's hard limit, otherwise report progress.
+        """
+        if self.abortable and (self.stop or (self.time_manager is not None
+                                             and self.time_manager.hard_limit_reached())):
+            self.aborted = True
+        elif self.report is not None:
+            self.report_progress()
+    
+    def report_progress(self):
+        """Send nodes / nps / hashfull to the reporter, at most every report_interval."""
+        now = time.time()
+        if now - self._last_report < self.report_interval:
+            return
+        self._last_report = now
+        nodes = self.total_nodes + self.nodes_searched
+        elapsed = now - self.search_start
+        self.report({
+            'nodes': nodes,
+            'nps': int(nodes / elapsed) if elapsed > 0 else 0,
+            'hashfull': self.tt.hashfull(),
+            'time': int(elapsed * 1000),
+        })
+    
+    def iterative_deepening(self, max_depth, time_limit=None, callback=None, time_manager=None):
         """
         Iteratively search to increasing depths.
+        
+        Args:
+            max_depth: Deepest iteration
+            time_limit: Seconds after which no new iteration is started
+            callback: Called with a dict of UCI info fields after every
+                completed iteration (depth, seldepth, score, mate, nodes,
+                nps, hashfull, time, pv) and with currmove and nps updates
+                at most every report_interval seconds. Without a callback
+                a summary line is printed per iteration.
+            time_manager: Started TimeManager that decides after each
+                iteration whether to start another one, and whose hard
+                limit aborts the search
+        
+        A stop request or the hard limit aborts the running iteration, but
+        never the first one. An aborted iteration only counts if the
+        previous best move was searched completely; the best completed
+        root move is then used. Otherwise the previous iteration's
+        result is returned.
         """
         
         start_time = time.time()
         best_move = None
         best_score = float('-inf')
+        if self.stats is not None:
+            self.stats.reset()
         
-        for depth in range(1, max_depth + 1):
-            # Check time
-            if time_limit and (time.time() - start_time) > time_limit:
-                break
-            
-            self.nodes_searched = 0
-            move, score = self.find_best_move_alphabeta(depth)
-            
-            elapsed = time.time() - start_time
-            nps = self.nodes_searched / elapsed if elapsed > 0 else 0
-            
-            print(f"Depth {depth}: {move} (score: {score}) "
-                  f"[{self.nodes_searched:,} nodes in {elapsed:.2f}s, "
-                  f"{nps:,.0f} nps]")
-            
-            if move:
-                best_move = move
-                best_score = score
+        self.search_start = start_time
+        self._last_report = start_time
+        self.total_nodes = 0
+        self.report = callback
+        self.time_manager = time_manager
+        self.pv = []
+        self.lines = []
+        
+        try:
+            root = self.probe_root()
+            if root is not None:
+                self.pv = [root[0]]
+                self.lines = [(root[0], root[1], self.pv)]
+                return root
             
-            # Stop if we found a mate
-            if abs(score) > 19000:
-                break
-        print(f"Total Time: {time.time() - start_time}")
+            for depth in range(1, max_depth + 1):
+                # Check time
+                if time_limit and (time.time() - start_time) > time_limit:
+                    break
+                if best_move is not None and (self.stop or (
+                        time_manager is not None and time_manager.hard_limit_reached())):
+                    break
+                
+                self.seldepth = 0
+                self.abortable = best_move is not None
+                self.nodes_searched = 0
+                iteration_start = time.time()
+                move, score = self.aspiration_search(depth, best_score if best_move else None)
+                
+                # Root moves searched before an abort have reliable scores,
+                # but they only beat the last result if that move was
+                # among them (it is always searched first)
+                if self.aborted and (move is None or
+                                     str(self.root_first_move) != str(best_move)):
+                    self.total_nodes += self.nodes_searched
+                    break
+                
+                lines = [(move, score)]
+                if move and not self.aborted and self.multipv > 1:
+                    lines += self.search_more_lines(depth, lines)
+                self.total_nodes += self.nodes_searched
+                
+                if move:
+                    best_move = move
+                    best_score = score
+                self.lines = [(line_move, line_score, self.get_pv(line_move, depth) if line_move else [])
+                              for line_move, line_score in lines]
+                self.pv = self.lines[0][2]
+                
+                elapsed = time.time() - start_time
+                nps = self.total_nodes / elapsed if elapsed > 0 else 0
+                
+                for number, (line_move, line_score, pv) in enumerate(self.lines, 1):
+                    if callback is not None:
+                        info = {
+                            'depth': depth,
+                            'seldepth': self.seldepth,
+                            'score': line_score,
+                            'mate': self.mate_distance(line_score),
+                            'nodes': self.total_nodes,
+                            'nps': int(nps),
+                            'hashfull': self.tt.hashfull(),
+                            'time': int(elapsed * 1000),
+                            'pv': pv,
+                        }
+                        if self.multipv > 1:
+                            info['multipv'] = number
+                        callback(info)
+                    elif number == 1:
+                        print(f"Depth {depth}: {line_move} (score: {line_score}) "
+                              f"[{self.nodes_searched:,} nodes in {elapsed:.2f}s, "
+                              f"{nps:,.0f} nps] pv {' '.join(str(m) for m in pv)}")
+                    else:
+                        print(f"  {number}. {line_move} (score: {line_score}) "
+                              f"pv {' '.join(str(m) for m in pv)}")
+                
+                if self.aborted:
+                    break
+                if self.stats is not None:
+                    self.stats.end_iteration(depth, self.nodes_searched, time.time() - iteration_start)
+                    if callback is None:
+                        print(f"  {self.stats.info_string()}")
+                
+                # Stop once a mate is proven within the full-width depth
+                # (analysis keeps going)
+                if (abs(score) >= MATE_BOUND and MATE_SCORE - abs(score) <= depth
+                        and self.multipv == 1):
+                    break
+                
+                if time_manager is not None and time_manager.should_stop(
+                        move, score, time.time() - iteration_start):
+                    break
+        finally:
+            self.report = None
+            self.time_manager = None
+            self.abortable = True
+        
+        if callback is None:
+            print(f"Total Time: {time.time() - start_time}")
         return best_move, best_score
     
     def set_stop(self, is_stopped=True):
@@ -0,0 +1,58 @@
+import unittest
+import json
+import os
+import shutil
+import tempfile
+import bench
+from bench import BENCH_FENS, run_bench
+from board import Board
+from dataset import DatasetBuilder
+
+class TestBench(unittest.TestCase):
+    def test_positions(self):
+        print("="*60)
+        print("Test 1: Bench positions are valid")
+        self.assertGreaterEqual(len(BENCH_FENS), 30)
+        for fen in BENCH_FENS:
+            board = Board()
+            board.from_fen(fen)
+            self.assertEqual(board.to_fen(), fen)
+            self.assertTrue(board.generate_legal_moves())
+
+    def test_deterministic(self):
+        print("="*60)
+        print("Test 2: Bench node count is deterministic")
+        fens = BENCH_FENS[:3]
+        first = run_bench(fens, depth=2)
+        second = run_bench(fens, depth=2)
+        print(f"Nodes: {first['nodes']}, nps: {first['nps']}")
+
+        self.assertEqual(first['nodes'], second['nodes'])
+        self.assertEqual(first['nodes'], sum(p['nodes'] for p in first['positions']))
+        self.assertEqual([p['bestmove'] for p in first['positions']],
+                         [p['bestmove'] for p in second['positions']])
+        self.assertEqual(first['stats']['beta_cutoffs'],
+                         sum(p['stats']['beta_cutoffs'] for p in first['positions']))
+        self.assertEqual(len(first['stats']['ebf']), 1)  # Depth 2 over depth 1
+        json.dumps(first)  # Must be serializable
+
+    def test_dataset_positions(self):
+        print("="*60)
+        print("Test 3: Bench positions read from a dataset")
+        temp_dir = tempfile.mkdtemp()
+        try:
+            builder = DatasetBuilder()
+            for fen in BENCH_FENS[:2]:
+                board = Board()
+                board.from_fen(fen)
+                builder.add(board)
+            path = os.path.join(temp_dir, 'bench')
+            builder.save(path)
+
+            self.assertEqual(bench.load_dataset_fens(path), BENCH_FENS[:2])
+            self.assertEqual(bench.load_dataset_fens(path, count=1), BENCH_FENS[:1])
+        finally:
+            shutil.rmtree(temp_dir)
+
+if __name__ == "__main__":
+    unittest.main()
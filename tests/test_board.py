@@ -194,5 +194,108 @@ class TestBoard(unittest.TestCase):
         square = (4, 4)  # e4
         self.assertTrue(board.is_square_attacked(square[0], square[1], BLACK))
 
+    def test_material_key(self):
+        """The piece count and material key are updated incrementally
+           and must match a full recount after captures and promotions."""
+        print("="*60)
+        print("Test 10: Material Key")
+        board = Board()
+        board.from_fen("4k3/1P6/8/8/8/8/8/R3K2r w - - 0 1")
+        self.assertEqual(board.piece_count, 5)
+        self.assertEqual(board.material_key, material_signature_key('KRPvKR'))
+
+        board.make_move(Move(0, 0, 0, 7))  # Rxh1
+        self.assertEqual(board.piece_count, 4)
+        self.assertEqual(board.material_key, material_signature_key('KRPvK'))
+
+        board.make_move(Move(7, 4, 6, 4))  # Ke7
+        board.make_move(Move(6, 1, 7, 1, promotion=QUEEN))  # b8=Q
+        self.assertEqual(board.material_key, material_signature_key('KQRvK'))
+
+        board.pop()
+        board.pop()
+        board.pop()
+        self.assertEqual(board.piece_count, 5)
+        self.assertEqual(board.material_key, material_signature_key('KRPvKR'))
+
+    def test_find_move(self):
+        """find_move validates a single move without generating every legal move."""
+        print("="*60)
+        print("Test 11: Find Move")
+        board = Board()
+        board.from_fen('r1bqkb1r/1pp2p2/2n2n2/pBPpp2p/4P1p1/2NPBN2/PP2QPPP/R3K2R w KQkq d6 0 10')
+
+        self.assertEqual(str(board.find_move(1, 1, 3, 1)), 'b2b4')
+        self.assertTrue(board.find_move(0, 4, 0, 6).is_castling)
+        self.assertTrue(board.find_move(4, 2, 5, 3).is_en_passant)
+
+        self.assertIsNone(board.find_move(1, 1, 4, 1))  # Not a pawn move
+        self.assertIsNone(board.find_move(6, 1, 5, 1))  # Black piece, White to move
+
+        # Pinned bishop can't leave the e-file
+        board.from_fen('4k3/4r3/8/8/8/8/4B3/4K3 w - - 0 1')
+        self.assertIsNone(board.find_move(1, 4, 2, 3))
+
+    def test_key_history(self):
+        """The incremental key matches a full hash and detects repetitions."""
+        print("="*60)
+        print("Test 12: Key History and Draw Detection")
+        board = Board()
+        board.from_fen('r1bqkb1r/1pp2p2/2n2n2/pBPpp2p/4P1p1/2NPBN2/PP2QPPP/R3K2R w KQkq d6 0 10')
+        start_hash = board.hash
+        for move in ['c5d6', 'g4f3', 'e1c1', 'f3g2']:
+            board.push_uci(move)
+            self.assertEqual(board.hash, board.zobrist.hash_position(board))
+        for _ in range(4):
+            board.pop()
+        self.assertEqual(board.hash, start_hash)
+        self.assertEqual(board.key_history, [])
+
+        # Knights out and back: the start position occurs again
+        board = Board()
+        for move in ['g1f3', 'g8f6', 'f3g1', 'f6g8']:
+            self.assertFalse(board.is_repetition())
+            board.push_uci(move)
+        self.assertTrue(board.is_repetition())
+        self.assertFalse(board.is_repetition(2))
+        for move in ['g1f3', 'g8f6', 'f3g1', 'f6g8']:
+            board.push_uci(move)
+        self.assertTrue(board.is_repetition(2))
+
+        # A pawn move in between makes the earlier positions unreachable
+        board = Board()
+        for move in ['g1f3', 'g8f6', 'f3g1', 'e7e6', 'b1c3', 'f6g8', 'c3b1', 'g8f6', 'g1f3', 'f6g8']:
+            board.push_uci(move)
+        self.assertFalse(board.is_repetition())
+
+        board.from_fen('4k3/8/8/8/8/8/8/R3K3 w - - 100 80')
+        self.assertTrue(board.is_fifty_move_draw())
+        # Mate on the 100th ply still counts
+        board.from_fen('6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 99 80')
+        board.push_uci('d1d8')
+        self.assertFalse(board.is_fifty_move_draw())
+
+    def test_see(self):
+        """Static exchange evaluation of captures, with x-rays."""
+        print("="*60)
+        print("Test 13: Static Exchange Evaluation")
+        board = Board()
+        cases = [
+            ('4k3/8/8/3p4/4P3/8/8/4K3 w - - 0 1', 'e4d5', 100),         # Free pawn
+            ('4k3/8/2p5/3p4/8/8/3Q4/4K3 w - - 0 1', 'd2d5', -800),      # QxP, PxQ
+            ('4k3/8/2p5/3p4/8/8/3R4/3RK3 w - - 0 1', 'd2d5', -300),     # Second rook x-rays
+            ('4k3/3r4/8/3p4/8/8/3R4/3RK3 w - - 0 1', 'd2d5', 100),      # Black stops recapturing
+            ('4k3/3q4/8/3n4/8/5B2/8/Q3K3 w - - 0 1', 'f3d5', -10),      # BxN, QxB
+            ('4k3/8/4p3/3p4/8/8/8/3QK3 w - - 0 1', 'd1d5', -800),
+            ('4k3/8/8/8/8/8/1p6/2R1K3 b - - 0 1', 'b2c1q', 1300),       # Capture and promote
+            ('4k3/8/8/3p4/2B5/1Q6/8/4K3 w - - 0 1', 'c4d5', 100),       # Queen behind the bishop
+        ]
+        for fen, uci, expected in cases:
+            board.from_fen(fen)
+            move = next(move for move in board.generate_legal_moves() if str(move) == uci)
+            print(f"{uci}: {board.see(move)}")
+            self.assertEqual(board.see(move), expected)
+            self.assertEqual(board.to_fen(), fen)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,98 @@
+import unittest
+import os
+import shutil
+import tempfile
+from unittest import mock
+import book_creator
+from book_creator import BookCreator
+from opening_book import OpeningBook
+from board import Board
+from move import Move
+
+class TestBookCreator(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def _line(self, board, moves):
+        """Convert UCI strings to native moves along a line, then take them back."""
+        line = []
+        for move_uci in moves:
+            line.append(board.convert_uci(move_uci))
+            board.make_move(line[-1])
+        for _ in line:
+            board.pop()
+        return line
+
+    def test_spilled_runs(self):
+        print("="*60)
+        print("Test 1: Spilled runs merge into one sorted book")
+        creator = BookCreator(run_size=2, temp_dir=self.temp_dir)
+        creator.merge_block = 2
+        board = Board()
+
+        for moves in (['e2e4', 'e7e5', 'g1f3'], ['e2e4', 'c7c5'], ['d2d4', 'd7d5'], ['e2e4', 'e7e5']):
+            creator.add_moves(board, self._line(board, moves))
+        self.assertEqual(len(board.move_stack), 0)
+        self.assertGreater(len(creator._runs), 1)
+
+        path = os.path.join(self.temp_dir, 'book.bin')
+        creator.save_book(path)
+        book = OpeningBook(path)
+        self.assertEqual(book.get_book_moves_info(board), [('e2e4', 3), ('d2d4', 1)])
+
+        board.push_uci('e2e4')
+        self.assertEqual(book.get_book_moves_info(board), [('e7e5', 2), ('c7c5', 1)])
+        book.close()
+
+    def test_merge_books(self):
+        print("="*60)
+        print("Test 2: Merging books with a minimum count")
+        paths = []
+        for moves in (['e2e4', 'e7e5'], ['e2e4', 'c7c5']):
+            creator = BookCreator(temp_dir=self.temp_dir)
+            board = Board()
+            creator.add_moves(board, self._line(board, moves))
+            paths.append(os.path.join(self.temp_dir, f'book{len(paths)}.bin'))
+            creator.save_book(paths[-1])
+
+        merged = os.path.join(self.temp_dir, 'merged.bin')
+        BookCreator(temp_dir=self.temp_dir).merge_books(paths, merged, min_count=2)
+
+        book = OpeningBook(merged)
+        board = Board()
+        self.assertEqual(book.get_book_moves_info(board), [('e2e4', 2)])
+        board.push_uci('e2e4')
+        self.assertFalse(book.is_in_book(board))
+        book.close()
+
+    def test_struct_writer(self):
+        print("="*60)
+        print("Test 3: Books written without NumPy match the merged ones")
+        board = Board()
+        lines = (['e2e4', 'e7e5', 'g1f3'], ['e2e4', 'c7c5'], ['d2d4', 'd7d5'], ['e2e4', 'e7e5'])
+        other = os.path.join(self.temp_dir, 'other.bin')
+        creator = BookCreator(temp_dir=self.temp_dir)
+        creator.add_position(board.to_fen(), 'c2c4', 2)
+        creator.save_book(other)
+
+        data = []
+        for numpy in (book_creator.np, None):
+            with mock.patch.object(book_creator, 'np', numpy):
+                creator = BookCreator(run_size=2, temp_dir=self.temp_dir)
+                for moves in lines:
+                    creator.add_moves(board, self._line(board, moves))
+                path = os.path.join(self.temp_dir, f'book{len(data)}.bin')
+                creator.save_book(path, books=[other])
+            with open(path, 'rb') as f:
+                data.append(f.read())
+
+        self.assertEqual(data[0], data[1])
+        # Nothing was spilled, so every entry is still in memory
+        start_hash = creator.zobrist.hash_position(board)
+        self.assertEqual(creator.positions[start_hash], {'e2e4': 3, 'd2d4': 1})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+import os
+import shutil
+import tempfile
+import dataset
+from dataset import PositionDataset
+from board import Board
+from evaluation import Evaluator
+from zobrist import get_zobrist_hash
+from constants import *
+
+PGN = """[Event "Short"]
+
+1. e4 e5 2. Nf3 Nc6 3. Bb5 a6 1-0
+
+[Event "Unfinished"]
+
+1. d4 d5 *
+"""
+
+EPD = """r1bqkb1r/1pp2p2/2n2n2/pBPpp2p/4P1p1/2NPBN2/PP2QPPP/R3K2R w KQkq d6 bm cxd6; c9 "1-0";
+8/P7/8/8/8/8/8/4K2k w - - bm a8=Q; c9 "1/2-1/2";
+"""
+
+CSV = """PuzzleId,FEN,Moves,Rating,Themes
+00001,r6k/pp2r2p/4Rp1Q/3p4/8/1N1P2R1/PqP2bPP/7K b - - 0 24,f2g3 e6e7 b2b1 b3c1,1850,crushing
+00002,8/8/8/8/8/8/8/4K2k w - - 0 1,e1f2,900,short
+"""
+
+class TestDataset(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def _write(self, name, text):
+        path = os.path.join(self.temp_dir, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        return path
+
+    def test_board_array(self):
+        print("="*60)
+        print("Test 1: Board.from_array round trip")
+        board = Board()
+        board.from_fen('r1bqkb1r/1pp2p2/2n2n2/pBPpp2p/4P1p1/2NPBN2/PP2QPPP/R3K2R w KQkq d6 0 10')
+        copy = Board.from_array(*board.to_array(), board.halfmove_clock, board.fullmove_number)
+
+        self.assertEqual(copy.to_fen(), board.to_fen())
+        self.assertEqual((copy.pst, copy.value), (board.pst, board.value))
+        self.assertEqual(copy.material_key, board.material_key)
+        self.assertEqual(copy.hash, board.hash)
+        self.assertEqual(sorted(vars(copy)), sorted(vars(board)))
+
+    def test_pgn_dataset(self):
+        print("="*60)
+        print("Test 2: PGN positions saved as .npz and .npy columns")
+        positions = dataset.from_pgn(self._write('games.pgn', PGN), jobs=1)
+        self.assertEqual(len(positions), 6)  # Unfinished game is skipped
+        self.assertEqual(positions.boards.shape, (6, 64))
+        self.assertTrue((positions.result == 1).all())
+
+        for path in (os.path.join(self.temp_dir, 'games.npz'), os.path.join(self.temp_dir, 'games')):
+            positions.save(path)
+            loaded = PositionDataset.load(path)
+            self.assertTrue((loaded.hash == positions.hash).all())
+
+            board = loaded.board(2)
+            self.assertEqual(board.to_fen(), 'rnbqkbnr/pppp1ppp/8/4p3/4P3/8/PPPP1PPP/RNBQKBNR w KQkq e6 0 2')
+            self.assertEqual(str(loaded.move(2, board)), 'g1f3')
+            self.assertEqual(int(loaded.hash[2]), get_zobrist_hash().hash_position(board))
+
+        scores = loaded.evaluate(Evaluator())
+        self.assertEqual(len(scores), 6)
+
+    def test_epd_and_puzzles(self):
+        print("="*60)
+        print("Test 3: EPD and puzzle CSV conversion")
+        positions = dataset.from_epd(self._write('test.epd', EPD))
+        board = positions.board(0)
+        self.assertTrue(positions.move(0, board).is_en_passant)
+        self.assertEqual(list(positions.result), [1, 0])
+        self.assertEqual(str(positions.move(1, positions.board(1))), 'a7a8q')
+
+        puzzles = dataset.from_puzzle_csv(self._write('puzzles.csv', CSV))
+        self.assertEqual(len(puzzles), 1)  # One-move puzzle is skipped
+        self.assertEqual(int(puzzles.rating[0]), 1850)
+        board = puzzles.board(0)
+        self.assertEqual(board.to_move, WHITE)
+        self.assertEqual(str(puzzles.move(0, board)), 'e6e7')
+
+if __name__ == "__main__":
+    unittest.main()
@@ -115,6 +115,25 @@ class TestKRKTablebase(unittest.TestCase):
         result = self.tb.probe(wk, wr, bk, True)
         self.assertIsNone(result, "Overlapping pieces should be illegal")
     
+    def test_probe_best_move(self):
+        """Test move selection straight from the square triple"""
+        # Mate in 1 along the back rank: Ra8#
+        result = self.tb.probe_best_move(sq('g6'), sq('a1'), sq('g8'), True)
+        self.assertIsNotNone(result)
+        outcome, dtm, move = result
+        self.assertEqual(outcome, self.tb.WHITE_WIN)
+        self.assertEqual(dtm, 1)
+        self.assertEqual(move, (sq('a1'), sq('a8')))
+
+        # Black takes an undefended rook
+        outcome, dtm, move = self.tb.probe_best_move(sq('e1'), sq('d7'), sq('e8'), False)
+        self.assertEqual(move, (sq('e8'), sq('d7')))
+
+        # Stalemate has no move
+        outcome, dtm, move = self.tb.probe_best_move(sq('c2'), sq('b2'), sq('a1'), False)
+        self.assertEqual(outcome, self.tb.DRAW)
+        self.assertIsNone(move)
+
     def test_maximum_dtm(self):
         """Test that maximum DTM is within expected bounds"""
         max_dtm = 0
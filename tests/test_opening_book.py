@@ -1,5 +1,9 @@
 import unittest
+import os
+import struct
+import tempfile
 from opening_book import OpeningBook
+from book_creator import BookCreator
 from board import Board
 
 class TestOpeningBook(unittest.TestCase):
@@ -7,6 +11,9 @@ class TestOpeningBook(unittest.TestCase):
         self.book = OpeningBook('books/kasparov.bin')
         self.board = Board()
 
+    def tearDown(self):
+        self.book.close()
+
     def test_opening_book(self):
         self.assertIsNotNone(self.book)
 
@@ -18,5 +25,66 @@ class TestOpeningBook(unittest.TestCase):
         move = self.book.get_book_move(self.board,1,"best")
         self.assertEqual(move,'e2e4')
 
+    def test_probe(self):
+        candidates = self.book.probe(self.board)
+        self.assertEqual([str(move) for move, weight in candidates], ['e2e4', 'd2d4', 'c2c4'])
+        self.assertEqual(str(self.book.select_move(self.board, 1, "best")), 'e2e4')
+
+        # Candidates are native moves that can be played directly
+        move, weight = candidates[0]
+        self.board.make_move(move)
+        self.assertTrue(self.book.is_in_book(self.board))
+
+    def test_lookup_matches_file(self):
+        """Mapped lookups return the same entries as a plain scan of the file."""
+        with open('books/kasparov.bin', 'rb') as f:
+            data = f.read()
+
+        position_hash = self.book.zobrist.hash_position(self.board)
+        expected = []
+        for offset in range(0, len(data), 16):
+            entry_hash, move_int, weight, learn = struct.unpack_from('>QHHI', data, offset)
+            if entry_hash == position_hash:
+                expected.append((self.book._decode_move(move_int), weight))
+
+        self.assertEqual(self.book._find_entries(position_hash), expected)
+        # Second lookup is served from the cache
+        self.assertIn(position_hash, self.book._cache)
+        self.assertEqual(self.book._find_entries(position_hash), expected)
+
+        self.assertEqual(self.book._find_entries(0), [])
+
+    def test_polyglot_scheme(self):
+        """Books built with Polyglot keys are detected and castle correctly."""
+        self.assertEqual(self.book.hash_scheme, 'random')
+
+        creator = BookCreator(hash_scheme='polyglot')
+        creator.add_position(Board().to_fen(), 'e2e4', 5)
+        castle_fen = 'r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1'
+        creator.add_position(castle_fen, 'e1g1', 3)
+
+        fd, path = tempfile.mkstemp(suffix='.bin')
+        os.close(fd)
+        try:
+            creator.save_book(path)
+            book = OpeningBook(path)
+            self.assertEqual(book.hash_scheme, 'polyglot')
+            self.assertEqual(book.zobrist.hash_position(self.board), 0x463b96181691fc9c)
+            self.assertEqual(str(book.select_move(self.board, 1, "best")), 'e2e4')
+
+            board = Board()
+            board.from_fen(castle_fen)
+            move = book.select_move(board, 1, "best")
+            self.assertTrue(move.is_castling)
+            self.assertEqual(str(move), 'e1g1')
+            book.close()
+        finally:
+            os.remove(path)
+
+    def test_missing_book(self):
+        book = OpeningBook('books/does_not_exist.bin')
+        self.assertFalse(book.book_enabled)
+        self.assertFalse(book.is_in_book(self.board))
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,58 @@
+import unittest
+from board import Board
+from perft import PERFT_SUITE, START_FEN, parallel_divide
+
+class TestPerft(unittest.TestCase):
+    def test_suite(self):
+        print("="*60)
+        print("Test 1: Perft suite (shallow)")
+        for name, fen, counts, default_depth in PERFT_SUITE:
+            board = Board()
+            board.from_fen(fen)
+            for depth in range(1, 3):
+                print(f"{name} depth {depth}: {counts[depth - 1]}")
+                self.assertEqual(board.perft(depth), counts[depth - 1])
+            # Make/unmake must restore the position exactly
+            self.assertEqual(board.to_fen(), fen)
+
+    def test_castling_after_rook_capture(self):
+        print("="*60)
+        print("Test 2: Rook captured on its corner loses castling")
+        # Nxh1 must remove White's kingside castling
+        name, fen, counts, default_depth = PERFT_SUITE[4]
+        board = Board()
+        board.from_fen(fen)
+        self.assertEqual(board.perft(3), counts[2])
+
+    def test_hashed_and_divide(self):
+        print("="*60)
+        print("Test 3: Hashed perft and divide")
+        board = Board()
+        board.from_fen(START_FEN)
+        cache = {}
+        self.assertEqual(board.perft(3, cache), 8902)
+        self.assertTrue(cache)
+        # Second run is answered from the cache
+        self.assertEqual(board.perft(3, cache), 8902)
+
+        divide = board.perft_divide(2)
+        self.assertEqual(len(divide), 20)
+        self.assertEqual(divide['e2e4'], 20)
+        self.assertEqual(sum(divide.values()), 400)
+
+    def test_parallel_divide(self):
+        print("="*60)
+        print("Test 4: Parallel divide matches serial divide")
+        name, fen, counts, default_depth = PERFT_SUITE[2]
+        board = Board()
+        board.from_fen(fen)
+        # 14 root moves < 4 * jobs, so depth 2 subtrees are split out
+        divide = parallel_divide(fen, 3, jobs=4)
+        self.assertEqual(divide, board.perft_divide(3))
+        self.assertEqual(sum(divide.values()), counts[2])
+
+        divide = parallel_divide(START_FEN, 3, jobs=2, hashed=True)
+        self.assertEqual(sum(divide.values()), 8902)
+
+if __name__ == "__main__":
+    unittest.main()
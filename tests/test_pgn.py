@@ -0,0 +1,114 @@
+import unittest
+import os
+import tempfile
+import types
+import pgn
+from pgn import PGNParser
+from board import Board
+
+SAMPLE_PGN = """[Event "Casual Game"]
+[White "Anderssen"]
+[Black "Kieseritzky"]
+
+1. e4 {King's pawn (the usual) 2. d4} e5 (1... c5 2. Nf3 (2. c3) d6) 2. Nf3!? $1
+Nc6 ; line comment 3. d4
+3. Bb5 a6?! 1-0
+
+[Event "Second Game"]
+
+1.d4 d5 2.c4 1/2-1/2
+"""
+
+class TestPGN(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.pgn')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(SAMPLE_PGN)
+
+    def tearDown(self):
+        os.remove(self.path)
+        if os.path.exists(pgn.game_index_path(self.path)):
+            os.remove(pgn.game_index_path(self.path))
+
+    def test_parse_movetext(self):
+        print("="*60)
+        print("Test 1: Movetext with comments, variations and NAGs")
+        games = PGNParser().parse_string(SAMPLE_PGN)
+        self.assertEqual(len(games), 2)
+
+        game = games[0]
+        print(game)
+        self.assertEqual(game.headers['White'], 'Anderssen')
+        self.assertEqual(game.moves, ['e4', 'e5', 'Nf3', 'Nc6', 'Bb5', 'a6'])
+        self.assertEqual(game.uci_moves, ['e2e4', 'e7e5', 'g1f3', 'b8c6', 'f1b5', 'a7a6'])
+        self.assertEqual(game.result, '1-0')
+
+        self.assertEqual(games[1].uci_moves, ['d2d4', 'd7d5', 'c2c4'])
+        self.assertEqual(games[1].result, '1/2-1/2')
+
+    def test_iter_games(self):
+        print("="*60)
+        print("Test 2: Streaming games from a file")
+        parser = PGNParser()
+        games = parser.iter_games(self.path)
+        self.assertIsInstance(games, types.GeneratorType)
+
+        expected = PGNParser().parse_string(SAMPLE_PGN)
+        for game, expected_game in zip(games, expected):
+            self.assertEqual(game.headers, expected_game.headers)
+            self.assertEqual(game.uci_moves, expected_game.uci_moves)
+
+        # Streaming does not accumulate games on the parser
+        self.assertEqual(parser.games, [])
+        self.assertEqual(len(parser.parse_file(self.path)), 2)
+
+    def test_san_to_move(self):
+        print("="*60)
+        print("Test 3: SAN resolution without move generation")
+        parser = PGNParser()
+        board = Board()
+
+        # Knight on c3 is pinned, so plain Ne2 must be the g1 knight
+        board.from_fen('4k3/8/8/b7/8/2N5/8/4K1N1 w - - 0 1')
+        self.assertEqual(str(parser._san_to_move(board, 'Ne2')), 'g1e2')
+
+        # Rank and file disambiguation
+        board.from_fen('4k3/8/8/8/R6R/8/8/R3K3 w - - 0 1')
+        self.assertEqual(str(parser._san_to_move(board, 'R1a2')), 'a1a2')
+        self.assertEqual(str(parser._san_to_move(board, 'Rhd4')), 'h4d4')
+
+        # En passant, promotion and castling come back as native moves
+        board.from_fen('r3k3/1P6/8/3pP3/8/8/8/4K2R w Kq d6 0 1')
+        self.assertTrue(parser._san_to_move(board, 'exd6').is_en_passant)
+        self.assertEqual(str(parser._san_to_move(board, 'bxa8=Q+')), 'b7a8q')
+        self.assertTrue(parser._san_to_move(board, 'O-O').is_castling)
+        self.assertIsNone(parser._san_to_move(board, 'O-O-O'))
+        self.assertIsNone(parser._san_to_move(board, 'Nf3'))
+
+    def test_process_games(self):
+        print("="*60)
+        print("Test 4: Indexed multi-process ingestion")
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for i in range(5):
+                f.write(f'\n[Event "Extra {i}"]\n\n1. Nf3 Nf6 2. g3 *\n')
+
+        offsets = pgn.load_game_index(self.path)
+        self.assertEqual(len(offsets), 7)
+        self.assertTrue(os.path.exists(pgn.game_index_path(self.path)))
+        with open(self.path, 'rb') as f:
+            f.seek(offsets[1])
+            self.assertTrue(f.readline().startswith(b'[Event "Second Game"]'))
+
+        # Saved index is reused while the PGN is unchanged
+        self.assertEqual(list(pgn.load_game_index(self.path)), list(offsets))
+
+        games = pgn.pgn_to_uci(self.path, jobs=2)
+        self.assertEqual([game.headers['Event'] for game in games],
+                         ['Casual Game', 'Second Game'] + [f'Extra {i}' for i in range(5)])
+        self.assertEqual(games[-1].uci_moves, ['g1f3', 'g8f6', 'g2g3'])
+
+        results = list(pgn.process_games(self.path, list, jobs=2, games_per_task=3))
+        self.assertEqual([len(games) for games in results], [3, 3, 1])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,10 @@
 import unittest
 from board import Board
-from search import SearchEngine
+from search import SearchEngine, SearchStats, INFINITE
+from opening_book import OpeningBook
+from time_manager import TimeManager
+from evaluation import Evaluator
+from constants import *
 import time
 
 class TestSearch(unittest.TestCase):
@@ -106,6 +110,446 @@ class TestSearch(unittest.TestCase):
             print(f"Improvement:   {nodes1/nodes3:.1f}x fewer nodes, "
                 f"{time1/time3:.1f}x faster vs basic")
 
+    
+    def test_search_stats(self):
+        """Search statistics are collected only when enabled."""
+        print("="*60)
+        print("Testing search statistics")
+        fen = "r1bq1rk1/ppp2ppp/2np1n2/2b1p3/2B1P3/2NP1N2/PPP2PPP/R1BQ1RK1 w - - 0 8"
+        
+        results = []
+        for collect_stats in (False, True):
+            board = Board()
+            board.from_fen(fen)
+            engine = SearchEngine(board, book=OpeningBook(), collect_stats=collect_stats)
+            nodes = []
+            for depth in range(1, 4):
+                move, score = engine.find_best_move_alphabeta(depth)
+                nodes.append(engine.nodes_searched)
+                if engine.stats is not None:
+                    engine.stats.end_iteration(depth, engine.nodes_searched, 0.0)
+            results.append((str(move), score, nodes))
+            
+            if not collect_stats:
+                self.assertIsNone(engine.stats)
+                self.assertIsNone(engine.tt.stats)
+        
+        # Counting must not change the search
+        self.assertEqual(results[0], results[1])
+        
+        stats = engine.stats
+        print(stats.info_string())
+        # Every alphabeta node probes the table, quiescence nodes do not
+        self.assertEqual(stats.tt_probes, sum(nodes) - stats.qnodes + stats.tt_cutoffs)
+        self.assertGreater(stats.qnodes, 0)
+        self.assertGreater(stats.tt_hits, 0)
+        self.assertLessEqual(stats.tt_cutoffs, stats.tt_hits)
+        self.assertGreater(stats.beta_cutoffs, 0)
+        self.assertLessEqual(stats.first_move_cutoffs, stats.beta_cutoffs)
+        self.assertEqual([depth for depth, _ in stats.branching_factors()], [2, 3])
+        
+        total = SearchStats()
+        total.add(stats)
+        total.add(stats)
+        self.assertEqual(total.beta_cutoffs, 2 * stats.beta_cutoffs)
+        self.assertEqual(total.iterations[0][1], 2 * stats.iterations[0][1])
+
+    
+    def test_iteration_reports(self):
+        """iterative_deepening reports every iteration to the callback."""
+        print("="*60)
+        print("Testing iteration reports")
+        board = Board()
+        board.from_fen("r1bq1rk1/ppp2ppp/2np1n2/2b1p3/2B1P3/2NP1N2/PPP2PPP/R1BQ1RK1 w - - 0 8")
+        engine = SearchEngine(board, book=OpeningBook())
+        
+        reports = []
+        best_move, score = engine.iterative_deepening(3, callback=reports.append)
+        iterations = [info for info in reports if 'pv' in info]
+        for info in iterations:
+            print(info)
+        
+        self.assertEqual([info['depth'] for info in iterations], [1, 2, 3])
+        last = iterations[-1]
+        self.assertEqual(str(last['pv'][0]), str(best_move))
+        self.assertEqual(last['score'], score)
+        self.assertIsNone(last['mate'])
+        self.assertEqual(last['nodes'], engine.total_nodes)
+        self.assertLessEqual(len(last['pv']), 3)
+        
+        # Mate is reported in moves
+        board.from_fen('6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 1')
+        reports = []
+        best_move, score = engine.iterative_deepening(3, callback=reports.append)
+        self.assertEqual(str(best_move), 'd1d8')
+        self.assertEqual(reports[-1]['mate'], 1)
+
+    
+    def test_abort(self):
+        """Aborted searches answer with the last reliable result."""
+        print("="*60)
+        print("Testing search abort")
+        board = Board()
+        board.from_fen("r1bq1rk1/ppp2ppp/2np1n2/2b1p3/2B1P3/2NP1N2/PPP2PPP/R1BQ1RK1 w - - 0 8")
+        engine = SearchEngine(board, book=OpeningBook())
+        
+        # A stop before the search still completes depth 1
+        engine.set_stop(True)
+        reports = []
+        best_move, score = engine.iterative_deepening(5, callback=reports.append)
+        self.assertIsNotNone(best_move)
+        self.assertEqual([info['depth'] for info in reports], [1])
+        engine.set_stop(False)
+        
+        # The hard limit aborts a deep search close to the deadline
+        engine.tt.table.clear()
+        time_manager = TimeManager(move_overhead=0)
+        time_manager.start(movetime=1500)
+        start = time.time()
+        best_move, score = engine.iterative_deepening(20, callback=reports.append,
+                                                      time_manager=time_manager)
+        elapsed = time.time() - start
+        print(f"Stopped after {elapsed:.2f}s with {best_move} ({score})")
+        self.assertLess(elapsed, 2.5)
+        self.assertIsNotNone(best_move)
+        self.assertIsNotNone(board.find_move(best_move.from_row, best_move.from_col,
+                                             best_move.to_row, best_move.to_col,
+                                             best_move.promotion))
+        self.assertEqual(board.to_fen(), "r1bq1rk1/ppp2ppp/2np1n2/2b1p3/2B1P3/2NP1N2/PPP2PPP/R1BQ1RK1 w - - 0 8")
+
+    
+    def test_multipv(self):
+        """analyse returns the best root moves, best first."""
+        print("="*60)
+        print("Testing MultiPV analysis")
+        fen = "r1bq1rk1/ppp2ppp/2np1n2/2b1p3/2B1P3/2NP1N2/PPP2PPP/R1BQ1RK1 w - - 0 8"
+        board = Board()
+        board.from_fen(fen)
+        engine = SearchEngine(board, book=OpeningBook())
+        best_move, score = engine.iterative_deepening(2, callback=lambda info: None)
+        
+        board.from_fen(fen)
+        engine = SearchEngine(board, book=OpeningBook())
+        reports = []
+        lines = engine.analyse(2, multipv=3, callback=reports.append)
+        for line in lines:
+            print(line)
+        
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(len({str(move) for move, _, _ in lines}), 3)
+        self.assertEqual(str(lines[0][0]), str(best_move))
+        self.assertEqual(lines[0][1], score)
+        scores = [line_score for _, line_score, _ in lines]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+        for move, _, pv in lines:
+            self.assertEqual(str(pv[0]), str(move))
+        
+        last = [info for info in reports if info.get('depth') == 2 and 'pv' in info]
+        self.assertEqual([info['multipv'] for info in last], [1, 2, 3])
+        self.assertEqual(engine.multipv, 1)
+        self.assertEqual(board.to_fen(), fen)
+
+    
+    def test_aspiration(self):
+        """Aspiration re-searches find the full-window score."""
+        print("="*60)
+        print("Testing aspiration windows")
+        fen = "r1bq1rk1/ppp2ppp/2np1n2/2b1p3/2B1P3/2NP1N2/PPP2PPP/R1BQ1RK1 w - - 0 8"
+        board = Board()
+        board.from_fen(fen)
+        engine = SearchEngine(board, book=OpeningBook(), collect_stats=True)
+        engine.nodes_searched = 0
+        move, score = engine.search_root(3)
+        print(f"Full window: {move} ({score})")
+        
+        # Windows far below and far above the true score
+        for guess in (score - 500, score + 500):
+            engine.tt.table.clear()
+            engine.stats.reset()
+            aspiration_move, aspiration_score = engine.aspiration_search(3, guess)
+            print(f"Guess {guess}: {aspiration_move} ({aspiration_score}), "
+                  f"{engine.stats.aspiration_researches} re-searches")
+            self.assertEqual(aspiration_score, score)
+            self.assertEqual(str(aspiration_move), str(move))
+            self.assertGreater(engine.stats.aspiration_researches, 0)
+        self.assertEqual(board.to_fen(), fen)
+        
+        # A fail high that opens the window fully, then a fail low: the
+        # window must stay a pair of finite bounds
+        results = iter([(move, MATE_SCORE - 5), (move, -500), (move, 0)])
+        windows = []
+        def scripted_root(depth, excluded=None, first_move=None, alpha=None, beta=None):
+            windows.append((alpha, beta))
+            return next(results)
+        engine.search_root = scripted_root
+        self.assertEqual(engine.aspiration_search(3, 0), (move, 0))
+        print(f"Windows: {windows}")
+        self.assertEqual(len(windows), 3)
+        for alpha, beta in windows:
+            self.assertIsInstance(alpha, int)
+            self.assertIsInstance(beta, int)
+            self.assertLess(alpha, beta)
+        self.assertLess(windows[2][0], -500)
+        self.assertLess(windows[2][1], MATE_SCORE)
+
+    
+    def test_mate_scores(self):
+        """Mates are scored by plies from the root, also through the table."""
+        print("="*60)
+        print("Testing mate scores")
+        board = Board()
+        board.from_fen("k7/8/2K5/8/8/p7/8/7R w - - 0 1")
+        engine = SearchEngine(board, book=OpeningBook(), collect_stats=True)
+        reports = []
+        best_move, score = engine.iterative_deepening(8, callback=reports.append)
+        print(f"{best_move} ({score}) pv {reports[-1]['pv']}")
+        
+        # Kb6 and Rh8 mate. Leaf pruning can hide it from the shallowest
+        # iterations, but once found the search stops.
+        self.assertEqual(str(best_move), 'c6b6')
+        self.assertEqual(score, MATE_SCORE - 3)
+        self.assertEqual(reports[-1]['mate'], 2)
+        self.assertLess(reports[-1]['depth'], 8)
+        self.assertGreater(engine.stats.check_extensions, 0)
+        self.assertEqual(engine.mate_distance(-(MATE_SCORE - 4)), -2)
+        self.assertIsNone(engine.mate_distance(500))
+        
+        # A mate stored 3 plies from the root is 1 ply closer at ply 2
+        engine.tt.table.clear()
+        engine.tt.store(board, 4, MATE_SCORE - 5, 'exact', None, ply=3)
+        self.assertEqual(engine.tt.probe(board, 4, -MATE_SCORE, MATE_SCORE, ply=2),
+                         (True, MATE_SCORE - 4))
+        engine.tt.store(board, 5, -(MATE_SCORE - 5), 'exact', None, ply=3)
+        self.assertEqual(engine.tt.probe(board, 5, -MATE_SCORE, MATE_SCORE, ply=1),
+                         (True, -(MATE_SCORE - 3)))
+        
+        # The static evaluation scores a mate for the side that gave it
+        board.from_fen("3R2k1/5ppp/8/8/8/8/5PPP/6K1 b - - 1 1")
+        self.assertEqual(Evaluator().evaluate(board), MATE_SCORE)
+        self.assertEqual(Evaluator().evaluate_relative(board), -MATE_SCORE)
+
+    
+    def test_table_keys(self):
+        """The transposition table uses the board's key whatever the book's scheme."""
+        print("="*60)
+        print("Testing transposition table keys")
+        board = Board()
+        board.from_fen('r1bqkb1r/pppp1ppp/2n5/4p3/2B1n3/5N2/PPPPQPPP/RNB1K2R w KQkq - 0 1')
+        book = OpeningBook(hash_scheme='polyglot')
+        engine = SearchEngine(board, book=book)
+        self.assertEqual(engine.tt.get_hash(board), board.hash)
+        self.assertNotEqual(book.zobrist.hash_position(board), board.hash)
+        
+        best_move, score = engine.iterative_deepening(2, callback=lambda info: None)
+        self.assertEqual(engine.tt.get_move(board), best_move)
+
+    
+    def test_tablebase_scores(self):
+        """Tablebase wins score in their own band, closer wins higher."""
+        print("="*60)
+        print("Testing tablebase scores")
+        board = Board()
+        board.from_fen('8/8/8/4k3/8/8/8/R3K3 w - - 0 1')
+        engine = SearchEngine(board, book=OpeningBook())
+        
+        score, move = engine.probe_tablebase(board)
+        print(f"{move} ({score})")
+        self.assertTrue(TB_WIN_BOUND < score < MATE_BOUND)
+        self.assertIsNone(engine.mate_distance(score))
+        self.assertEqual(engine.probe_tablebase(board, False, ply=3)[0], score - 3)
+        
+        # The weak side sees the loss
+        board.from_fen('8/8/8/4k3/8/8/8/R3K3 b - - 0 1')
+        self.assertLess(engine.probe_tablebase(board, False)[0], -TB_WIN_BOUND)
+        
+        # Reported at the root as a centipawn score, not a mate
+        board.from_fen('8/8/8/4k3/8/8/8/R3K3 w - - 0 1')
+        reports = []
+        best_move, best_score = engine.iterative_deepening(3, callback=reports.append)
+        self.assertEqual((str(best_move), best_score), (str(move), score))
+        self.assertEqual(reports[-1]['tbhits'], 1)
+        self.assertIsNone(reports[-1]['mate'])
+        
+        # Stored and probed through the table relative to the root
+        engine.tt.table.clear()
+        engine.tt.store(board, 4, score - 3, 'exact', None, ply=3)
+        self.assertEqual(engine.tt.probe(board, 4, -INFINITE, INFINITE, ply=1), (True, score - 1))
+
+    
+    def test_repetition_draw(self):
+        """Repeated positions and the fifty-move rule score as draws."""
+        print("="*60)
+        print("Testing draw detection in search")
+        board = Board()
+        for move in ['g1f3', 'g8f6', 'f3g1', 'f6g8', 'g1f3', 'g8f6']:
+            board.push_uci(move)
+        engine = SearchEngine(board, book=OpeningBook())
+        engine.nodes_searched = 0
+        
+        # Ng1 repeats the position, so it is a draw without searching
+        board.push_uci('f3g1')
+        self.assertEqual(engine.alphabeta(3, float('-inf'), float('inf')), 0)
+        self.assertEqual(engine.nodes_searched, 0)
+        board.pop()
+        
+        # The same move is still searched at the root
+        engine.nodes_searched = 0
+        move, score = engine.search_root(2)
+        self.assertIsNotNone(move)
+        self.assertGreater(engine.nodes_searched, 0)
+        
+        # A rook up, but the fifty-move rule ends the game on the next ply
+        board.from_fen('4k3/8/8/8/8/8/8/R3K3 w - - 99 80')
+        move, score = engine.search_root(3)
+        print(f"Fifty-move rule: {move} ({score})")
+        self.assertEqual(score, 0)
+
+    
+    def test_quiescence(self):
+        """Quiescence resolves captures and skips the losing ones."""
+        print("="*60)
+        print("Testing quiescence search")
+        board = Board()
+        engine = SearchEngine(board, book=OpeningBook(), collect_stats=True)
+        engine.nodes_searched = 0
+        inf = float('inf')
+        
+        # The knight on d5 is hanging: the static evaluation does not see
+        # it, quiescence does
+        board.from_fen('4k3/8/8/3n4/4P3/8/8/4K3 w - - 0 1')
+        static = engine.evaluator.evaluate_relative(board)
+        score = engine.quiescence(-inf, inf, 1)
+        print(f"Static {static}, quiescence {score}")
+        self.assertGreater(score, static + 250)
+        self.assertGreater(engine.stats.qnodes, 1)
+        
+        # QxP defended by a pawn is ordered last and never searched
+        board.from_fen('4k3/8/2p5/3p4/8/8/3Q4/4KN2 w - - 0 1')
+        moves = engine.order_moves(board.generate_legal_moves())
+        self.assertEqual(str(moves[-1]), 'd2d5')
+        engine.stats.reset()
+        self.assertEqual(engine.quiescence(-inf, inf, 1), engine.evaluator.evaluate_relative(board))
+        self.assertEqual(engine.stats.qnodes, 1)
+        
+        # A mate reached in quiescence counts plies from the root
+        board.from_fen('3R2k1/5ppp/8/8/8/8/5PPP/6K1 b - - 1 1')
+        self.assertEqual(engine.quiescence(-inf, inf, 5), -MATE_SCORE + 5)
+        self.assertEqual(engine.quiescence(-inf, inf, 5), engine.alphabeta(0, -inf, inf, 5))
+        
+        # In check there is no standing pat: the knight forks king and
+        # queen, and every evasion loses the queen
+        board.from_fen('3q3k/5N2/8/8/8/8/8/6K1 b - - 0 1')
+        static = engine.static_eval()
+        score = engine.quiescence(-inf, inf, 1)
+        print(f"Static {static}, quiescence {score}")
+        self.assertGreater(static, 0)
+        self.assertLess(score, 0)
+        
+        # Captures are generated directly, the same ones the full move
+        # list holds
+        for fen in ('r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 10',
+                    '1r2k3/P1P5/8/8/8/8/5p2/4K1R1 w - - 0 1',
+                    'rnbqkbnr/ppp1p1pp/8/3pPp2/8/8/PPPP1PPP/RNBQKBNR w KQkq f6 0 3'):
+            board.from_fen(fen)
+            expected = [str(move) for move in board.generate_pseudo_legal_moves()
+                        if board.board[move.to_row][move.to_col] != EMPTY
+                        or move.is_en_passant or move.promotion == QUEEN]
+            self.assertEqual([str(move) for move in board.generate_captures()], expected)
+
+    
+    def test_leaf_pruning(self):
+        """Futility, reverse futility and razoring cut nodes but keep tactics."""
+        print("="*60)
+        print("Testing leaf pruning")
+        fen = 'r1bqkb1r/pppp1ppp/2n5/4p3/2B1n3/5N2/PPPPQPPP/RNB1K2R w KQkq - 0 1'
+        
+        nodes = []
+        for margins in (None, ()):
+            board = Board()
+            board.from_fen(fen)
+            engine = SearchEngine(board, book=OpeningBook(), collect_stats=True)
+            if margins is not None:
+                # Empty margins turn every pruning off
+                engine.reverse_futility_margins = margins
+                engine.futility_margins = margins
+                engine.razor_margins = margins
+            best_move, score = engine.iterative_deepening(3, callback=lambda info: None)
+            print(f"{best_move} ({score}) {engine.total_nodes} nodes, {engine.stats.info_string()}")
+            self.assertEqual(str(best_move), 'e2e4')  # Qxe4 wins the knight
+            nodes.append(engine.total_nodes)
+        
+        # The last search had no pruning
+        stats = engine.stats
+        self.assertEqual(stats.futility_prunes + stats.reverse_futility_prunes + stats.razor_prunes, 0)
+        self.assertLess(nodes[0], nodes[1])
+        
+        # Far above beta, only a null-window node is cut by reverse futility
+        board = Board()
+        board.from_fen('4k3/8/8/8/8/8/8/3QK3 w - - 0 1')
+        engine = SearchEngine(board, book=OpeningBook(), collect_stats=True)
+        engine.nodes_searched = 0
+        engine.alphabeta(1, 0, 100)
+        self.assertEqual(engine.stats.reverse_futility_prunes, 0)
+        engine.tt.table.clear()
+        score = engine.alphabeta(1, 0, 1)
+        self.assertEqual(engine.stats.reverse_futility_prunes, 1)
+        self.assertEqual(score, engine.static_eval())
+
+    
+    def test_internal_iterative_deepening(self):
+        """Nodes without a hash move get one (IID) or are reduced (IIR)."""
+        print("="*60)
+        print("Testing internal iterative deepening / reduction")
+        fen = 'r1bqkb1r/pppp1ppp/2n5/4p3/2B1n3/5N2/PPPPQPPP/RNB1K2R w KQkq - 0 1'
+        board = Board()
+        board.from_fen(fen)
+        engine = SearchEngine(board, book=OpeningBook(), collect_stats=True)
+        engine.nodes_searched = 0
+        inf = float('inf')
+        
+        # The hash move is ordered first
+        moves = board.generate_legal_moves()
+        hash_move = next(move for move in moves if str(move) == 'a2a3')
+        self.assertEqual(str(engine.order_moves(moves, hash_move)[0]), 'a2a3')
+        
+        engine.iid_depth = 4
+        engine.alphabeta(4, -inf, inf)
+        print(engine.stats.info_string())
+        self.assertGreater(engine.stats.iid_searches, 0)
+        self.assertGreater(engine.stats.iir_reductions, 0)
+        self.assertIsNotNone(engine.tt.get_move(board))
+        
+        # With the hash move stored, the node is searched normally
+        engine.stats.reset()
+        engine.alphabeta(4, -inf, inf)
+        self.assertEqual(engine.stats.iid_searches, 0)
+        self.assertEqual(board.to_fen(), fen)
+        
+        # The shallower search runs on the node's moves: the node is
+        # entered, counted and extended for the check only once
+        board.from_fen('4k3/8/8/8/8/8/3q4/R3K3 w - - 0 1')
+        engine.tt.table.clear()
+        engine.stats.reset()
+        engine.iid_depth = 3
+        engine.iid_reduction = 1
+        entered, searched = [], []
+        enter, search_moves = engine.alphabeta, engine.search_moves
+        def recording_enter(depth, alpha, beta, ply=1):
+            if ply == 1:
+                entered.append(depth)
+            return enter(depth, alpha, beta, ply)
+        def recording_search_moves(depth, alpha, beta, ply, *args):
+            if ply == 1:
+                searched.append(depth)
+            return search_moves(depth, alpha, beta, ply, *args)
+        engine.alphabeta = recording_enter
+        engine.search_moves = recording_search_moves
+        engine.nodes_searched = 0
+        recording_enter(3, -inf, inf)
+        self.assertEqual(entered, [3])
+        self.assertEqual(searched, [3, 4])  # Extended to 4, IID one ply less
+        self.assertEqual(engine.stats.iid_searches, 1)
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
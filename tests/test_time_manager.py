@@ -0,0 +1,69 @@
+import unittest
+import time
+from time_manager import TimeManager
+
+class TestTimeManager(unittest.TestCase):
+    def test_limits(self):
+        print("="*60)
+        print("Test 1: Soft and hard limits from the clock")
+        manager = TimeManager(move_overhead=100)
+
+        manager.start(time_left=60000, increment=1000)
+        print(f"60s+1s: soft {manager.soft_limit:.3f}s hard {manager.hard_limit:.3f}s")
+        self.assertAlmostEqual(manager.soft_limit, 59.9 / 30 + 0.75)
+        self.assertAlmostEqual(manager.hard_limit, manager.soft_limit * 3)
+
+        # The budget doesn't grow with the move number and respects movestogo
+        manager.start(time_left=10000, movestogo=1)
+        self.assertLessEqual(manager.hard_limit, 9.9 * 0.75)
+        self.assertLessEqual(manager.soft_limit, manager.hard_limit)
+
+        # Overhead is taken off a fixed move time
+        manager.start(movetime=1000)
+        self.assertAlmostEqual(manager.soft_limit, 0.9)
+        self.assertAlmostEqual(manager.hard_limit, 0.9)
+
+        # Almost no time left still allows a minimal search
+        manager.start(time_left=50)
+        self.assertEqual(manager.hard_limit, TimeManager.MIN_TIME)
+
+        manager.start()
+        self.assertFalse(manager.is_limited())
+        self.assertFalse(manager.should_stop('e2e4', 0, 100.0))
+
+    def test_stability(self):
+        print("="*60)
+        print("Test 2: Stable best move stops early, score drop extends")
+        manager = TimeManager(move_overhead=0)
+        manager.start(time_left=30000)  # soft 1s, hard 3s
+
+        manager.start_time = time.time() - 0.6
+        self.assertFalse(manager.should_stop('e2e4', 20, 0.01))
+        self.assertFalse(manager.should_stop('e2e4', 25, 0.02))
+        self.assertFalse(manager.should_stop('e2e4', 25, 0.04))
+        # Same move three iterations after it was found: soft limit 0.55s
+        self.assertTrue(manager.should_stop('e2e4', 25, 0.08))
+
+        manager.start(time_left=30000)
+        manager.start_time = time.time() - 1.2
+        self.assertTrue(manager.should_stop('e2e4', 20, 0.01))  # Past the soft limit
+        manager.start(time_left=30000)
+        manager.start_time = time.time() - 1.2
+        manager.last_score = 100
+        self.assertFalse(manager.should_stop('e2e4', 20, 0.01))  # Score dropped: 2s
+
+    def test_iteration_prediction(self):
+        print("="*60)
+        print("Test 3: No iteration is started that can't finish")
+        manager = TimeManager(move_overhead=0)
+        manager.start(time_left=30000)  # hard 3s
+        manager.start_time = time.time() - 0.2
+        # 0.2s iteration grows 4x by default: 0.2 + 0.8 fits
+        self.assertFalse(manager.should_stop('e2e4', 0, 0.2))
+        # 0.5s after 0.2s grows 2.5x: 0.2 + 1.25 fits, then 1.0s after 0.5s doesn't
+        self.assertFalse(manager.should_stop('d2d4', 0, 0.5))
+        manager.start_time = time.time() - 1.5
+        self.assertTrue(manager.should_stop('c2c4', 0, 1.0))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -68,6 +68,72 @@ class TestUCIProtocol(unittest.TestCase):
         output = self.send_command('go movetime 1000')
         self.assertIsNotNone('bestmove' in line for line in output), "Missing bestmove"
         
+    def test_info_lines(self):
+        # Test search reports
+        print("\n5. Testing info lines")
+        self.send_command('position fen 6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 1')
+        output = self.send_command('go depth 2')
+        # Engine start-up can delay the reply, wait for bestmove
+        deadline = time.time() + 30
+        while not any(line.startswith('bestmove') for line in output) and time.time() < deadline:
+            output += self.send_command('isready')
+        info = [line for line in output if line.startswith('info depth')]
+        self.assertTrue(info, "Missing info lines")
+        self.assertIn('score mate 1', info[-1])
+        self.assertIn('pv d1d8', info[-1])
+        self.assertTrue(any(line.startswith('bestmove d1d8') for line in output))
+        
+    def test_ponder(self):
+        # Test pondering
+        print("\n6. Testing ponder / ponderhit")
+        self.send_command('setoption name Ponder value true')
+        self.send_command('position fen 6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 1')
+        output = self.send_command('go ponder wtime 10000 btime 10000')
+        output += self.send_command('isready')
+        output += self.send_command('isready')
+        # The mate is found at once, but bestmove waits for ponderhit
+        self.assertTrue(any('readyok' in line for line in output))
+        self.assertFalse(any(line.startswith('bestmove') for line in output))
+        
+        output = self.send_command('ponderhit')
+        deadline = time.time() + 10
+        while not any(line.startswith('bestmove') for line in output) and time.time() < deadline:
+            output += self.send_command('isready')
+        self.assertTrue(any(line.startswith('bestmove d1d8') for line in output))
+        
+    def test_new_search_while_searching(self):
+        # A position / go while the last search still runs stops it first
+        print("\n8. Testing go while a search is running")
+        self.send_command('position fen 6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 1')
+        output = self.send_command('go infinite')
+        self.assertFalse(any(line.startswith('bestmove') for line in output))
+        
+        output = self.send_command('position fen 6k1/5ppp/8/8/8/8/5PPP/3R2K1 b - - 0 1')
+        output += self.send_command('go depth 1')
+        deadline = time.time() + 10
+        while len([line for line in output if line.startswith('bestmove')]) < 2 and time.time() < deadline:
+            output += self.send_command('isready')
+        bestmoves = [line.split()[1] for line in output if line.startswith('bestmove')]
+        self.assertEqual(bestmoves[0], 'd1d8')
+        # The second search is Black's, on its own board
+        self.assertEqual(len(bestmoves), 2)
+        self.assertIn(bestmoves[1][:2], ('g8', 'f7', 'g7', 'h7'))
+        
+    def test_multipv(self):
+        # Test MultiPV option
+        print("\n7. Testing MultiPV")
+        self.send_command('setoption name MultiPV value 2')
+        self.send_command('setoption name Move Overhead value 50')
+        self.send_command('position fen r1bq1rk1/ppp2ppp/2np1n2/2b1p3/2B1P3/2NP1N2/PPP2PPP/R1BQ1RK1 w - - 0 8')
+        output = self.send_command('go depth 2')
+        deadline = time.time() + 30
+        while not any(line.startswith('bestmove') for line in output) and time.time() < deadline:
+            output += self.send_command('isready')
+        info = [line for line in output if line.startswith('info depth 2 ')]
+        self.assertEqual(len(info), 2)
+        self.assertIn('multipv 1', info[0])
+        self.assertIn('multipv 2', info[1])
+        
     def tearDown(self):
         try:
             self.send_command('quit')
@@ -44,6 +44,43 @@ class TestZobrist(unittest.TestCase):
         print(f"  Hash via path 2: {hash5}")
         print(f"  Same: {hash4 == hash5} ✓")
 
+    def test_polyglot_keys(self):
+        """Polyglot scheme reproduces the reference keys from the Polyglot book format."""
+        from board import Board
+
+        zobrist = ZobristHash(scheme='polyglot')
+
+        print("Test 4: Polyglot reference keys")
+        # Positions and keys from the Polyglot book format specification
+        moves_and_keys = [
+            (None, 0x463b96181691fc9c),
+            ('e2e4', 0x823c9b50fd114196),
+            ('d7d5', 0x0756b94461c50fb0),
+            ('e4e5', 0x662fafb965db29d4),
+            ('f7f5', 0x22a48b5a8e47ff78),  # e5 pawn can capture en passant
+            ('e1e2', 0x652a607ca3f242c1),
+            ('e8f7', 0x00fdd303c946bdd9),
+        ]
+        board = Board()
+        for move, key in moves_and_keys:
+            if move:
+                board.push_uci(move)
+            print(f"  {move or 'start'}: {zobrist.hash_position(board):016x}")
+            self.assertEqual(zobrist.hash_position(board), key)
+
+        # b4 pawn can capture c4 en passant, so the file is hashed
+        board = Board()
+        for move in ['a2a4', 'b7b5', 'h2h4', 'b5b4', 'c2c4']:
+            board.push_uci(move)
+        self.assertEqual(zobrist.hash_position(board), 0x3c8123ea7b067637)
+
+        board.push_uci('b4c3')
+        board.push_uci('a1a3')
+        self.assertEqual(zobrist.hash_position(board), 0x5c3f9b829b279560)
+
+        with self.assertRaises(ValueError):
+            ZobristHash(scheme='unknown')
+
 
 if __name__ == "__main__":
     unittest.main()
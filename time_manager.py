@@ -0,0 +1,125 @@
+"""
+Time management for games with a clock.
+
+TimeManager turns the UCI 'go' clock parameters into two limits:
+
+    soft limit  normal time for this move; no iteration is started after
+                it, and it is scaled by how stable the search is
+    hard limit  absolute deadline; the search is stopped when it passes
+
+Iterative deepening asks should_stop() after every iteration. It stops
+early when the best move has stayed the same for several iterations,
+allows extra time when the score drops, and never starts an iteration
+that is predicted to run past the hard limit.
+"""
+
+import time
+
+
+class TimeManager:
+    DEFAULT_MOVES_TO_GO = 30   # Moves left to plan for without movestogo
+    MAX_MOVES_TO_GO = 50
+    INCREMENT_SHARE = 0.75     # Part of the increment spent on this move
+    HARD_FACTOR = 3.0          # Hard limit as a multiple of the soft limit
+    MAX_CLOCK_SHARE = 0.75     # Never plan to use more of the clock than this
+    MIN_TIME = 0.01            # Seconds, so there is always a depth 1 search
+
+    STABLE_SCALE = [1.0, 0.9, 0.7, 0.55, 0.4]  # Soft limit scale by iterations with the same best move
+    SCORE_DROP = 30            # Centipawns lost between iterations that trigger an extension
+    DROP_SCALE = 2.0           # Soft limit scale after a score drop
+    DEFAULT_GROWTH = 4.0       # Predicted time ratio between consecutive iterations
+    
+    def __init__(self, move_overhead=30):
+        """
+        Args:
+            move_overhead: Milliseconds reserved per move for communication lag
+        """
+        self.move_overhead = move_overhead / 1000
+        self.start()
+    
+    def start(self, time_left=None, increment=0, movestogo=None, movetime=None):
+        """
+        Start timing a move. All arguments are in milliseconds, as sent with
+        'go'. Without time_left or movetime the search is not limited.
+        
+        Args:
+            time_left: Remaining clock time of the side to move
+            increment: Increment per move
+            movestogo: Moves until the next time control
+            movetime: Exact time for this move
+        """
+        self.start_time = time.time()
+        self.fixed = movetime is not None
+        
+        if movetime is not None:
+            self.soft_limit = self.hard_limit = max(movetime / 1000 - self.move_overhead, self.MIN_TIME)
+        elif time_left is not None:
+            budget = max(time_left / 1000 - self.move_overhead, 0)
+            moves = min(movestogo, self.MAX_MOVES_TO_GO) if movestogo else self.DEFAULT_MOVES_TO_GO
+            
+            soft = budget / moves + self.INCREMENT_SHARE * increment / 1000
+            hard = min(soft * self.HARD_FACTOR, budget * self.MAX_CLOCK_SHARE)
+            self.hard_limit = max(hard, self.MIN_TIME)
+            self.soft_limit = max(min(soft, self.hard_limit), self.MIN_TIME)
+        else:
+            self.soft_limit = self.hard_limit = None
+        
+        # Search history for should_stop()
+        self.best_move = None
+        self.stable_iterations = 0
+        self.last_score = None
+        self.last_iteration_time = None
+    
+    def is_limited(self):
+        return self.hard_limit is not None
+    
+    def elapsed(self):
+        return time.time() - self.start_time
+    
+    def remaining(self):
+        """Seconds until the hard limit (None when not limited)."""
+        if self.hard_limit is None:
+            return None
+        return max(self.hard_limit - self.elapsed(), 0)
+    
+    def hard_limit_reached(self):
+        return self.hard_limit is not None and self.elapsed() >= self.hard_limit
+    
+    def should_stop(self, best_move, score, iteration_time):
+        """
+        Called after each completed iteration. Returns True if no further
+        iteration should be started.
+        
+        Args:
+            best_move: Best move of the iteration
+            score: Its score
+            iteration_time: Seconds the iteration took
+        """
+        if self.hard_limit is None:
+            return False
+        
+        if self.best_move is not None and str(best_move) == str(self.best_move):
+            self.stable_iterations += 1
+        else:
+            self.stable_iterations = 0
+        self.best_move = best_move
+        
+        score_dropped = self.last_score is not None and score < self.last_score - self.SCORE_DROP
+        self.last_score = score
+        
+        # Predict the next iteration from the growth of the last two
+        growth = self.DEFAULT_GROWTH
+        if self.last_iteration_time and iteration_time > 0:
+            growth = min(max(iteration_time / self.last_iteration_time, 2.0), 8.0)
+        self.last_iteration_time = iteration_time
+        
+        elapsed = self.elapsed()
+        if elapsed + iteration_time * growth > self.hard_limit:
+            return True  # Would not finish in time
+        if self.fixed:
+            return False
+        
+        scale = self.STABLE_SCALE[min(self.stable_iterations, len(self.STABLE_SCALE) - 1)]
+        if score_dropped:
+            scale = self.DROP_SCALE
+        return elapsed >= min(self.soft_limit * scale, self.hard_limit)
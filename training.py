@@ -1,9 +1,23 @@
+import os
+
+import numpy as np
+
 from board import Board
 from search import SearchEngine
 from evaluation import Evaluator
-from tqdm import tqdm
+from dataset import PositionDataset, from_puzzle_csv
+
+PUZZLE_CSV = 'puzzles/chess_puzzles_1.csv'
+PUZZLE_DATASET = 'puzzles/chess_puzzles_1.npz'
 
-import pandas as pd
+def load_puzzles(dataset_path=PUZZLE_DATASET, csv_path=PUZZLE_CSV):
+    """
+    Load the puzzle dataset. The CSV is converted to the columnar format
+    the first time and the .npz is reused after that.
+    """
+    if not os.path.exists(dataset_path):
+        from_puzzle_csv(csv_path).save(dataset_path)
+    return PositionDataset.load(dataset_path)
 
 class EvaluationTuner:
     """
@@ -11,47 +25,44 @@ class EvaluationTuner:
     In a real engine, you'd use automated tuning methods.
     """
     
-    def __init__(self, rating=None):
-        puzzles = pd.read_csv('puzzles/chess_puzzles_1.csv')
+    def __init__(self, rating=None, dataset_path=PUZZLE_DATASET, sample_size=100):
+        puzzles = load_puzzles(dataset_path)
 
         if rating:
-            puzzles = puzzles[puzzles['Rating'] <= rating]
-
-        puzzle_sample = puzzles.sample(n=100, replace=False)
-
-        self.test_positions = []
-        for current_sample in puzzle_sample.itertuples():
-            moves = current_sample.Moves.split()
-            if len(moves) > 1:
-                self.test_positions.append({
-                    'fen': current_sample.FEN,
-                    'next_move': moves[0],
-                    'best_move': moves[1],
-                    'weight': 1.0
-                })
+            puzzles = puzzles.select(puzzles.rating <= rating)
+
+        sample = np.random.choice(len(puzzles), size=min(sample_size, len(puzzles)), replace=False)
+
+        # Positions are stored after the opponent's first puzzle move,
+        # with the expected reply as the best move
+        self.test_positions = puzzles.select(np.sort(sample))
+        self.weight = 1.0
     
     def test_evaluation_weights(self, evaluator, failure_list=False):
         """
         Test how well the evaluation performs on test positions.
+
+        With failure_list set, also returns the FENs of the failed
+        positions. These are the positions searched, after the opponent's
+        first puzzle move, not the puzzle CSV's FEN: the dataset stores no
+        FEN strings, and each one is a puzzle position on its own, to be
+        solved with the expected reply.
         """
         score = 0
-        current_test = 0
         failure_fen = []
         
-        for position in self.test_positions:
+        for current_test in range(len(self.test_positions)):
             print(f'Test {current_test} (score {score})...')
-            current_test += 1
-            board = Board()
-            board.from_fen(position['fen'])
-            board.push_uci(position['next_move'])
+            board = self.test_positions.board(current_test)
+            expected_move = self.test_positions.move(current_test, board)
             
             engine = SearchEngine(board, evaluator)
             best_move, _ = engine.find_best_move_alphabeta(4)
             
-            if str(best_move) == position['best_move']:
-                score += position['weight']
+            if str(best_move) == str(expected_move):
+                score += self.weight
             else:
-                failure_fen.append(position['fen'])
+                failure_fen.append(board.to_fen())
         
         if failure_list:
             return score, failure_fen
@@ -84,7 +95,11 @@ class EvaluationTuner:
         return best_params, best_score
 
 def test_search(rating=None,theme=None,depth=3,max_puzzles=100):
-    puzzles = pd.read_csv('puzzles/chess_puzzles_1.csv')
+    # Themes are only in the CSV, so this still goes through pandas
+    import pandas as pd
+    from tqdm import tqdm
+
+    puzzles = pd.read_csv(PUZZLE_CSV)
 
     if rating:
         puzzles = puzzles[puzzles['Rating'] <= rating]
@@ -118,7 +133,9 @@ def test_search(rating=None,theme=None,depth=3,max_puzzles=100):
     return failures
 
 def test_themes(max_puzzles=10):
-    puzzles = pd.read_csv('puzzles/chess_puzzles_1.csv')
+    import pandas as pd
+
+    puzzles = pd.read_csv(PUZZLE_CSV)
 
     themes = {}
     for index, current_puzzle in puzzles.iterrows():
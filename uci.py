@@ -4,11 +4,37 @@ from board import Board
 from search import SearchEngine
 from evaluation import Evaluator
 from opening_book import OpeningBook
+from time_manager import TimeManager
 from move import Move
 from constants import *
 import os
+import json
 import threading
 
+# Order of the fields in an 'info' line
+INFO_FIELDS = ('depth', 'seldepth', 'multipv', 'score', 'nodes', 'nps', 'hashfull',
+               'tbhits', 'time', 'currmove', 'currmovenumber', 'pv')
+
+def format_info(info):
+    """
+    Format a search report (see SearchEngine.iterative_deepening) as a
+    UCI 'info' line. A 'mate' entry turns the score into 'score mate'.
+    """
+    parts = ['info']
+    for field in INFO_FIELDS:
+        value = info.get(field)
+        if value is None:
+            continue
+        if field == 'score':
+            mate = info.get('mate')
+            parts.append(f"score mate {mate}" if mate is not None else f"score cp {value}")
+        elif field == 'pv':
+            if value:
+                parts.append('pv ' + ' '.join(str(move) for move in value))
+        else:
+            parts.append(f"{field} {value}")
+    return ' '.join(parts)
+
 class UCIHandler:
     """
     Universal Chess Interface protocol handler for PyMinMaximus.
@@ -31,11 +57,23 @@ class UCIHandler:
             'OwnBook': True,  # Use opening book
             'BookFile': bookfile,
             'Move Overhead': 30,  # ms
+            'SearchStats': False,  # Report search statistics as info string
+            'Ponder': False,  # Set by the GUI when it will send 'go ponder'
+            'MultiPV': 1,  # Number of best lines to report
         }
         
         # Initialize components
         self.opening_book = None
         self.engine = None
+        self.search_thread = None
+        self.time_manager = None
+        
+        # Pondering: the clock limits to apply on 'ponderhit', and an event
+        # that holds back bestmove until 'stop' / 'ponderhit'
+        self.pondering = False
+        self.infinite = False
+        self.ponder_limits = None
+        self.release = threading.Event()
         self._init_engine()
     
     def _init_engine(self):
@@ -48,7 +86,8 @@ class UCIHandler:
                 self.opening_book = None
         
         # Create search engine
-        self.engine = SearchEngine(self.board, self.evaluator, self.opening_book)
+        self.engine = SearchEngine(self.board, self.evaluator, self.opening_book,
+                                   collect_stats=self.options['SearchStats'])
     
     def uci(self):
         """Handle 'uci' command - identify engine and options."""
@@ -60,6 +99,9 @@ class UCIHandler:
         print("option name OwnBook type check default true")
         print("option name BookFile type string default books/performance.bin")
         print("option name Move Overhead type spin default 30 min 0 max 1000")
+        print("option name SearchStats type check default false")
+        print("option name Ponder type check default false")
+        print("option name MultiPV type spin default 1 min 1 max 50")
         
         print("uciok")
         sys.stdout.flush()
@@ -71,6 +113,7 @@ class UCIHandler:
     
     def ucinewgame(self):
         """Handle 'ucinewgame' command - reset for new game."""
+        self._finish_search()
         self.board = Board()
         self._init_engine()
         self.engine.tt.table.clear()  # Clear transposition table
@@ -81,6 +124,8 @@ class UCIHandler:
         
         Format: position [fen <fenstring> | startpos] moves <move1> <move2> ...
         """
+        self._finish_search()
+        
         # Reset to starting position or FEN
         if args[0] == 'startpos':
             self.board = Board()
@@ -121,20 +166,27 @@ class UCIHandler:
         - btime <ms> - black's remaining time
         - winc <ms> - white's increment
         - binc <ms> - black's increment
+        - movestogo <n> - moves until the next time control
         - depth <d> - search to this depth
         - infinite - search until 'stop' command
+        - ponder - search the position after the expected reply until
+          'ponderhit' (then the clock applies) or 'stop'
         """
+        self._finish_search()
+        
         # Parse go arguments
         movetime = None
-        depth = 6  # Default depth
+        depth = None
         wtime = btime = None
         winc = binc = 0
-        increment = 500
+        movestogo = None
+        infinite = False
+        ponder = False
         
         i = 0
         while i < len(args):
             if args[i] == 'movetime':
-                movetime = int(args[i + 1]) / 1000  # Convert ms to seconds
+                movetime = int(args[i + 1])
                 i += 2
             elif args[i] == 'depth':
                 depth = int(args[i + 1])
@@ -151,48 +203,69 @@ class UCIHandler:
             elif args[i] == 'binc':
                 binc = int(args[i + 1])
                 i += 2
+            elif args[i] == 'movestogo':
+                movestogo = int(args[i + 1])
+                i += 2
             elif args[i] == 'infinite':
-                movetime = None
-                depth = 100
+                infinite = True
+                i += 1
+            elif args[i] == 'ponder':
+                ponder = True
                 i += 1
             else:
                 i += 1
         
-        # Calculate time allocation if using clock
-        if movetime is None and wtime is not None and btime is not None:
-            # Use simple time management: allocate 1/30 of remaining time + increment
-            if self.board.to_move == WHITE:
-                if winc is not None:
-                    increment = winc
-                movetime = (wtime / 1000) / 30 + (increment / 1000) * self.board.fullmove_number
-            else:
-                if binc is not None:
-                    increment = binc
-                movetime = (btime / 1000) / 30 + (increment / 1000) * self.board.fullmove_number
-            
-            # Ensure minimum time
-            movetime = max(movetime, 0.1)
+        # Soft and hard limits from the clock of the side to move
+        if self.board.to_move == WHITE:
+            time_left, increment = wtime, winc
+        else:
+            time_left, increment = btime, binc
+        self.time_manager = TimeManager(self.options['Move Overhead'])
+        self.ponder_limits = (time_left, increment, movestogo, movetime)
+        self.pondering = ponder
+        self.infinite = infinite
+        self.release.clear()
+        if not infinite and not ponder:
+            self.time_manager.start(*self.ponder_limits)
+        
+        if depth is None:
+            # Without a limit of any kind, use the old fixed depth
+            depth = 100 if infinite or ponder or self.time_manager.is_limited() else 6
         
-        print(f"# Starting search: depth={depth}, movetime={movetime}s")
+        if self.time_manager.is_limited():
+            print(f"info string search depth {depth} "
+                  f"soft {self.time_manager.soft_limit * 1000:.0f}ms "
+                  f"hard {self.time_manager.hard_limit * 1000:.0f}ms")
+        else:
+            print(f"info string search depth {depth}")
         sys.stdout.flush()
         
         # Calculate move number for opening book
         move_number = self.board.fullmove_number
         
-        # Search for best move
+        # Search for best move. The flag is cleared here, not in the
+        # thread, so a 'stop' right after 'go' is not lost.
+        self.engine.set_stop(False)
+        self.engine.multipv = self.options['MultiPV']
         self.search_thread = threading.Thread(target=self._search_with_info, args=(depth, move_number))
         self.search_thread.start()
 
-        self.timer_thread = threading.Timer(movetime, lambda: self.engine.set_stop(True)) if movetime else None
-        self.timer_thread.start() if self.timer_thread else None
-
+    def _finish_search(self):
+        """
+        Stop a search that is still running (or holding back bestmove
+        while pondering) and wait for its thread, so a new search or
+        position never shares the board and flags with it.
+        """
+        if self.search_thread is not None and self.search_thread.is_alive():
+            self.stop()
+            self.search_thread.join()
+    
     def _search_with_info(self, max_depth, move_number):
         """
         Search with UCI info output.
         """
         self.best_move = None
         self.best_score = 0
-        self.engine.set_stop(False)
         
         # Check opening book first
         #if self.opening_book and self.opening_book.book_enabled:
@@ -205,15 +278,23 @@ class UCIHandler:
         #        if book_move:
         #            return book_move, 0
         
-        self.engine.nodes_searched = 0
-        self.best_move, self.best_score = self.engine.find_best_move_alphabeta(max_depth)
-        self.timer_thread.cancel() if self.timer_thread else None
-
-        #self.search_thread.join()
+        self.best_move, self.best_score = self.engine.iterative_deepening(
+            max_depth, callback=self.send_info, time_manager=self.time_manager)
         
-        # Report best move
+        if self.engine.stats is not None:
+            print(f"info string {self.engine.stats.info_string()}")
+        
+        # While pondering or in infinite mode, bestmove waits for the GUI
+        if self.pondering or self.infinite:
+            self.release.wait()
+        
+        # Report best move, with the expected reply to ponder on
         if self.best_move:
-            print(f"bestmove {self.best_move}")
+            pv = self.engine.pv
+            if len(pv) > 1 and str(pv[0]) == str(self.best_move):
+                print(f"bestmove {self.best_move} ponder {pv[1]}")
+            else:
+                print(f"bestmove {self.best_move}")
         else:
             # No legal moves - shouldn't happen, but be safe
             legal_moves = self.board.generate_legal_moves()
@@ -224,25 +305,72 @@ class UCIHandler:
         
         sys.stdout.flush()
     
+    def bench(self, args):
+        """
+        Handle 'bench' command - search the bench positions with a fresh
+        table and print the report as one JSON line.
+        
+        Format: bench [depth]
+        """
+        from bench import BENCH_DEPTH, run_bench
+        
+        depth = int(args[0]) if args else BENCH_DEPTH
+        report = run_bench(depth=depth)
+        print(json.dumps(report))
+        sys.stdout.flush()
+    
+    def ponderhit(self):
+        """
+        Handle 'ponderhit' - the opponent played the expected move. The
+        search keeps running, now under the clock limits from 'go'.
+        """
+        if not self.pondering:
+            return
+        self.time_manager.start(*self.ponder_limits)
+        self.pondering = False
+        self.release.set()
+    
+    def stop(self):
+        """
+        Handle 'stop' - end the search and send bestmove. After a ponder
+        miss the transposition table is kept for the real search.
+        """
+        self.engine.set_stop(True)
+        self.pondering = False
+        self.infinite = False
+        self.release.set()
+    
+    def send_info(self, info):
+        """Search report callback: print it as a UCI 'info' line."""
+        print(format_info(info))
+        sys.stdout.flush()
+    
     def setoption(self, args):
         """Handle 'setoption' command - configure engine options."""
-        # Format: setoption name <name> value <value>
-        if len(args) >= 4 and args[0] == 'name' and args[2] == 'value':
-            option_name = args[1]
-            option_value = ' '.join(args[3:])
+        # Format: setoption name <name> value <value>, where the name
+        # may have spaces ('Move Overhead')
+        if len(args) >= 4 and args[0] == 'name' and 'value' in args[2:]:
+            value_index = args.index('value', 2)
+            option_name = ' '.join(args[1:value_index])
+            option_value = ' '.join(args[value_index + 1:])
             
             if option_name in self.options:
-                # Convert value to appropriate type
-                if isinstance(self.options[option_name], int):
-                    self.options[option_name] = int(option_value)
-                elif isinstance(self.options[option_name], bool):
+                # Convert value to appropriate type (bool before int,
+                # since bool is a subclass of int)
+                if isinstance(self.options[option_name], bool):
                     self.options[option_name] = option_value.lower() == 'true'
+                elif isinstance(self.options[option_name], int):
+                    self.options[option_name] = int(option_value)
+                    if option_name == 'MultiPV':
+                        self.options[option_name] = min(max(self.options[option_name], 1), 50)
                 else:
                     self.options[option_name] = option_value
                 
                 # Reinitialize if needed
                 if option_name in ['OwnBook', 'BookFile']:
                     self._init_engine()
+                elif option_name == 'SearchStats':
+                    self.engine.enable_stats(self.options['SearchStats'])
         print("uciok")
         sys.stdout.flush()
     
@@ -277,15 +405,24 @@ class UCIHandler:
                 elif command == 'setoption':
                     self.setoption(args)
                 
+                elif command == 'bench':
+                    self.bench(args)
+                
                 elif command == 'quit':
+                    self.stop()  # Don't leave a search thread waiting
                     break
                 
                 elif command == 'stop':
-                    self.engine.set_stop(True)
+                    self.stop()
+                
+                elif command == 'ponderhit':
+                    self.ponderhit()
 
                 elif command == 'status':
                     print(f"Currently searching: {self.search_thread.is_alive() if self.search_thread else False}")
-                    print(f"Timer active: {self.timer_thread.is_alive() if self.timer_thread else False}")
+                    if self.time_manager is not None and self.time_manager.is_limited():
+                        print(f"Elapsed: {self.time_manager.elapsed():.2f}s "
+                              f"(hard limit {self.time_manager.hard_limit:.2f}s)")
                     sys.stdout.flush()
                 
             except EOFError:
@@ -2,14 +2,21 @@
 
 import random
 from constants import *
+from polyglot_keys import POLYGLOT_RANDOM_ARRAY
 
 class ZobristHash:
     """
     Zobrist hashing for chess positions.
     Creates unique 64-bit fingerprints for positions.
+
+    Two key schemes are available:
+    - 'random':   our own keys from a seeded random generator. The bundled
+                  books (books/*.bin) were built with these.
+    - 'polyglot': the standard Polyglot Random64 table and hashing rules,
+                  which third-party Polyglot books are built with.
     """
     
-    def __init__(self, seed=42):
+    def __init__(self, seed=42, scheme='random'):
         """
         Initialize random number tables for Zobrist hashing.
         
@@ -18,7 +25,19 @@ class ZobristHash:
         - Castling rights
         - En passant files
         - Side to move
+
+        Args:
+            seed: Seed for the 'random' scheme
+            scheme: 'random' or 'polyglot'
         """
+        self.scheme = scheme
+
+        if scheme == 'polyglot':
+            self._init_polyglot_keys()
+            return
+        if scheme != 'random':
+            raise ValueError(f"Unknown Zobrist scheme: {scheme}")
+
         random.seed(seed)
         
         # Random numbers for each piece on each square
@@ -36,10 +55,131 @@ class ZobristHash:
         
         # Random number for side to move (black)
         self.side_key = self._rand64()
+        self.side_key_color = BLACK
+
+        # Hash the en passant file whenever there is an en passant square
+        self.ep_requires_capture = False
+
+    def _init_polyglot_keys(self):
+        """Load the Polyglot Random64 table into the same key layout."""
+        keys = POLYGLOT_RANDOM_ARRAY
+
+        # Polyglot piece kinds: black pawn = 0, white pawn = 1, black knight = 2, ...
+        self.piece_keys = [[[0] * 64 for _ in range(2)]]
+        for piece_type in range(PAWN, KING + 1):
+            white_kind = (piece_type - 1) * 2 + 1
+            black_kind = (piece_type - 1) * 2
+            self.piece_keys.append([
+                keys[64 * white_kind:64 * white_kind + 64],
+                keys[64 * black_kind:64 * black_kind + 64],
+            ])
+
+        self.castle_keys = keys[768:772]  # K, Q, k, q
+        self.ep_keys = keys[772:780]
+
+        # Polyglot hashes the turn when White is to move
+        self.side_key = keys[780]
+        self.side_key_color = WHITE
+
+        # ...and only hashes en passant when a pawn can actually capture
+        self.ep_requires_capture = True
     
     def _rand64(self):
         """Generate a random 64-bit number."""
         return random.randint(0, (1 << 64) - 1)
+
+    def ep_capture_possible(self, board):
+        """Check if a pawn of the side to move stands next to the en passant pawn."""
+        ep_row, ep_col = board.en_passant_square
+        pawn = board.to_move | PAWN
+        pawn_row = ep_row - 1 if board.to_move == WHITE else ep_row + 1
+
+        for col in (ep_col - 1, ep_col + 1):
+            if 0 <= col < 8 and board.board[pawn_row][col] == pawn:
+                return True
+        return False
+    
+    def ep_hash(self, board):
+        """Return the en passant part of the hash for the current position."""
+        if board.en_passant_square:
+            if not self.ep_requires_capture or self.ep_capture_possible(board):
+                return self.ep_keys[board.en_passant_square[1]]
+        return 0
+
+    def piece_hash(self, piece, row, col):
+        """Return the key for a piece on a square."""
+        color = 1 if (piece & 24) == BLACK else 0
+        return self.piece_keys[piece & 7][color][row * 8 + col]
+
+    def make_move(self, board, hash_value, move):
+        """
+        Make a move on the board and update its hash incrementally.
+        Only the squares and rights the move touches are rehashed, which is
+        much cheaper than calling hash_position after every move.
+
+        Args:
+            board: Board to make the move on
+            hash_value: Hash of the position before the move
+            move: Move to make
+
+        Returns:
+            Tuple of (hash after the move, undo_info from board.make_move)
+        """
+        # The board keeps its own key up to date with its scheme
+        if board.zobrist is self:
+            undo_info = board.make_move(move)
+            return board.hash, undo_info
+
+        # The en passant key depends on the whole position, so swap it out
+        hash_value ^= self.ep_hash(board)
+        piece = board.board[move.from_row][move.from_col]
+
+        undo_info = board.make_move(move)
+        return self.update_hash(board, hash_value, move, piece, undo_info), undo_info
+
+    def update_hash(self, board, hash_value, move, piece, undo_info):
+        """
+        Second half of make_move, once board.make_move has been called:
+        rehash the squares and rights the move changed.
+
+        Args:
+            board: Board after the move
+            hash_value: Hash before the move, without its en passant key
+            move: Move that was made
+            piece: Piece that moved, before any promotion
+            undo_info: undo_info returned by board.make_move
+
+        Returns:
+            Hash after the move
+        """
+        hash_value ^= self.piece_hash(piece, move.from_row, move.from_col)
+        hash_value ^= self.piece_hash(board.board[move.to_row][move.to_col], move.to_row, move.to_col)
+
+        captured = undo_info['captured_piece']
+        if captured != EMPTY:
+            hash_value ^= self.piece_hash(captured, move.to_row, move.to_col)
+
+        if move.is_en_passant:
+            captured_pawn = (BLACK if (piece & 24) == WHITE else WHITE) | PAWN
+            hash_value ^= self.piece_hash(captured_pawn, move.from_row, move.to_col)
+
+        if move.is_castling:
+            rook = (piece & 24) | ROOK
+            rook_from, rook_to = (7, 5) if move.to_col == 6 else (0, 3)
+            hash_value ^= self.piece_hash(rook, move.to_row, rook_from)
+            hash_value ^= self.piece_hash(rook, move.to_row, rook_to)
+
+        old_rights = undo_info['castling_rights']
+        if old_rights != board.castling_rights:
+            for index, right in enumerate('KQkq'):
+                if old_rights[right] != board.castling_rights[right]:
+                    hash_value ^= self.castle_keys[index]
+
+        hash_value ^= self.side_key
+        if board.en_passant_square:
+            hash_value ^= self.ep_hash(board)
+
+        return hash_value
     
     def hash_position(self, board):
         """
@@ -73,12 +213,22 @@ class ZobristHash:
             hash_value ^= self.castle_keys[3]
         
         # Hash en passant square (only the file matters)
-        if board.en_passant_square:
-            file = board.en_passant_square[1]
-            hash_value ^= self.ep_keys[file]
+        hash_value ^= self.ep_hash(board)
         
-        # Hash side to move (only if Black to move)
-        if board.to_move == BLACK:
+        # Hash side to move (Black for 'random', White for 'polyglot')
+        if board.to_move == self.side_key_color:
             hash_value ^= self.side_key
         
         return hash_value
+
+
+_shared_hashes = {}
+
+def get_zobrist_hash(scheme='random'):
+    """
+    Return the shared ZobristHash for a scheme, so the transposition table,
+    opening book and book creator all use the same key table.
+    """
+    if scheme not in _shared_hashes:
+        _shared_hashes[scheme] = ZobristHash(scheme=scheme)
+    return _shared_hashes[scheme]